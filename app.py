@@ -3,11 +3,21 @@ import dash_bootstrap_components as dbc
 from dash import dcc, html, Input, Output, State, ctx # Ensure ctx is imported
 import plotly.graph_objs as go
 from datetime import datetime, timedelta
-from data.fetcher import fetch_historical_data
-# Import necessary items from trainer
-from rl.trainer import train_model, training_progress, training_eta, evaluate_model # Import evaluate_model
-from rl.backtest import backtest_strategy, rsi_strategy
+from data.fetcher import data_generation, fetch_historical_data
+from data.cache import snap_range
+# Training runs in background processes managed by the job manager
+from rl.jobs import TrainingJobManager
+from rl.registry import ModelRegistry
+from rl.results import ResultsStore
+from rl.backtest import backtest_strategy, rsi_signals
 from rl.rl_visualizer import create_rl_chart
+from components.downsample import chart_indices, visible_range
+from components.plots import create_live_chart, live_extend_data
+from components.figure_cache import FigureCache
+from data.live import LiveHub
+from config.settings import LIVE_POLL_SECONDS, PROFILING_ENABLED
+from utils.instrumentation import install_metrics_routes, timed
+from utils.helpers import install_export_routes
 import os
 import numpy as np
 import time # Keep time import if needed elsewhere
@@ -22,11 +32,26 @@ logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s: %(messag
 # Initialize Dash app
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.title = "Stock Trading Visualizer"
+# Timing histograms on /metrics (and single-request profiling when enabled)
+install_metrics_routes(app.server, profiling=PROFILING_ENABLED)
+# Chunked data downloads on /export (streamed by Flask, not built in a callback)
+install_export_routes(app.server)
 
 # Constants
 TICKERS = ["NVDA", "AAPL", "MSFT", "TSLA"]
 DEFAULT_TICKER = "NVDA"
 
+# Background training: bounded worker pool and queue shared by all sessions
+job_manager = TrainingJobManager(max_workers=2, max_queued=8)
+# Index of trained models for the model picker (reading it does not load torch)
+model_registry = ModelRegistry()
+# Backtest/evaluation history behind the leaderboard
+results_store = ResultsStore()
+# Live intraday bars shared by all sessions (one provider poll per ticker per period)
+live_hub = LiveHub()
+# Rendered stock chart figures shared by all sessions, invalidated by new bars
+figure_cache = FigureCache()
+
 # Layout
 app.layout = dbc.Container([
     html.H1("Stock Trading Visualizer", className="text-center my-4"),
@@ -63,6 +88,18 @@ app.layout = dbc.Container([
                 inline=True, # Display inline
                 className="mb-4"
             ),
+            dcc.Checklist(
+                id="live-toggle",
+                options=[{"label": "Live intraday (1m)", "value": "live"}],
+                value=[],
+                inline=True,
+                className="mb-4"
+            ),
+            html.Div([
+                html.Label("Download data:", className="font-semibold mr-2"),
+                html.A("CSV", id="export-csv", href="", className="mr-2"),
+                html.A("Parquet", id="export-parquet", href="")
+            ], className="mb-4"),
             html.Label("Train RL Model:", className="font-semibold mb-2"),
             dcc.Dropdown(
                 id="rl-ticker",
@@ -79,12 +116,23 @@ app.layout = dbc.Container([
                 value="ppo",
                 className="mb-2"
             ),
+            dcc.Dropdown(
+                id="model-select",
+                placeholder="Saved model to evaluate",
+                className="mb-2"
+            ),
             html.Button(
                 "Train Model",
                 id="train-btn",
                 n_clicks=0, # Initialize n_clicks
                 className="px-4 py-2 bg-blue-600 text-white rounded hover:bg-blue-700 mb-2 mr-2" # Added margin
             ),
+            html.Button(
+                "Evaluate Model",
+                id="evaluate-btn",
+                n_clicks=0,
+                className="px-4 py-2 bg-blue-600 text-white rounded hover:bg-blue-700 mb-2 mr-2"
+            ),
             html.Button(
                 "Backtest RSI Strategy",
                 id="backtest-btn",
@@ -101,10 +149,21 @@ app.layout = dbc.Container([
         # Right: Charts and metrics
         dbc.Col([
             dcc.Graph(id="stock-chart", className="mb-4"),
+            dcc.Graph(id="live-chart", className="mb-4", style={"display": "none"}),
             dcc.Graph(id="rl-chart", className="mb-4"),
-            html.Div(id="metrics-output", className="text-center font-semibold") # Make metrics bold
+            html.Div(id="metrics-output", className="text-center font-semibold"), # Make metrics bold
+            html.H5("Leaderboard (Sharpe ratio)", className="mt-4"),
+            html.Div(id="leaderboard")
         ], md=8)
     ]),
+    dcc.Store(id="training-job"), # Id of this session's running training job
+    dcc.Store(id="live-cursor"), # Ticker and newest bar shown in the live chart
+    dcc.Interval(
+        id="live-interval",
+        interval=LIVE_POLL_SECONDS * 1000,
+        n_intervals=0,
+        disabled=True
+    ),
     dcc.Interval(
         id="progress-interval",
         interval=1000,  # Update every 1 second
@@ -118,19 +177,40 @@ app.layout = dbc.Container([
     Output("stock-chart", "figure"),
     Input("ticker", "value"),
     Input("time-slider", "value"),
-    Input("indicator-checklist", "value")
+    Input("indicator-checklist", "value"),
+    Input("stock-chart", "relayoutData")
 )
-def update_stock_chart(ticker, months, indicators):
-    # ... (existing stock chart logic - unchanged) ...
+@timed("callback.update_stock_chart")
+def update_stock_chart(ticker, months, indicators, relayout_data):
+    # Zoom/range-slider events only matter when they change the x range
+    x_range = visible_range(relayout_data)
+    if ctx.triggered_id == "stock-chart" and x_range is None and not (relayout_data or {}).get("xaxis.autorange"):
+        return dash.no_update
     try:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=months * 30)
+        # The full-range view is the same for every session until new bars land; zoomed views are per user
+        cache_key = None
+        if x_range is None:
+            cache_key = ("stock-chart", ticker, months, snap_range(start_date, end_date, "1d"),
+                         tuple(sorted(indicators)), data_generation(ticker, "1d"))
+            cached = figure_cache.get(cache_key)
+            if cached is not None:
+                return cached
         # Ensure context matches data usage if fetcher uses it
         data = fetch_historical_data(ticker, start_date, end_date, interval="1d", context="chart") 
         
         if data.empty:
             return go.Figure().update_layout(title=f"No data available for {ticker}", template="plotly_dark")
         
+        # Send a bounded number of points: an overview plus detail for the zoomed range
+        columns = ["Close"]
+        if "RSI" in indicators:
+            columns.append("RSI")
+        if "MACD" in indicators:
+            columns += ["MACD", "MACD_Signal"]
+        data = data.iloc[chart_indices(data, columns, x_range)]
+        
         fig = go.Figure()
         
         # Add stock price
@@ -165,17 +245,141 @@ def update_stock_chart(ticker, months, indicators):
             xaxis=dict(domain=[0.0, 0.95]), # Make space for RSI axis
             template="plotly_dark", # Use dark theme
             legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-            margin=dict(l=50, r=50, t=50, b=50) # Adjust margins
+            margin=dict(l=50, r=50, t=50, b=50), # Adjust margins
+            uirevision=f"{ticker}-{months}" # Keep the user's zoom while detail is swapped in
         )
         # Add range slider
         fig.update_xaxes(rangeslider_visible=True)
 
+        if cache_key is not None:
+            # Key on the generation after the fetch, which may itself have written new bars
+            figure_cache.put(cache_key[:-1] + (data_generation(ticker, "1d"),), fig)
         return fig
     
     except Exception as e:
         print(f"Stock chart error: {str(e)}")
         return go.Figure().update_layout(title=f"Error loading chart: {str(e)}", template="plotly_dark")
 
+@app.callback(
+    Output("export-csv", "href"),
+    Output("export-parquet", "href"),
+    Input("ticker", "value"),
+    Input("time-slider", "value")
+)
+def update_export_links(ticker, months):
+    """Point the download links at the streaming export of the current view."""
+    query = f"/export?tickers={ticker}&months={months}"
+    return f"{query}&format=csv", f"{query}&format=parquet"
+
+@app.callback(
+    Output("live-chart", "figure"),
+    Output("live-chart", "style"),
+    Output("live-interval", "disabled"),
+    Output("live-cursor", "data"),
+    Input("live-toggle", "value"),
+    Input("ticker", "value"),
+    Input("indicator-checklist", "value")
+)
+@timed("callback.start_live_chart")
+def start_live_chart(live, ticker, indicators):
+    """Render the live chart once; later bars arrive through extendData."""
+    if "live" not in (live or []):
+        return dash.no_update, {"display": "none"}, True, None
+    data = live_hub.updates(ticker)
+    if data.empty:
+        # Empty traces; the first bars are appended by stream_live_chart
+        data = pd.DataFrame(columns=["Close", "RSI", "MACD", "MACD_Signal"], index=pd.DatetimeIndex([]), dtype=float)
+    cursor = {"ticker": ticker, "last": data.index[-1].isoformat() if len(data) else None}
+    return create_live_chart(data, ticker, indicators), {"display": "block"}, False, cursor
+
+@app.callback(
+    Output("live-chart", "extendData"),
+    Output("live-cursor", "data", allow_duplicate=True),
+    Input("live-interval", "n_intervals"),
+    State("live-cursor", "data"),
+    State("indicator-checklist", "value"),
+    prevent_initial_call=True
+)
+@timed("callback.stream_live_chart")
+def stream_live_chart(n_intervals, cursor, indicators):
+    """Push only the bars completed since the client's newest one."""
+    if not cursor:
+        return dash.no_update, dash.no_update
+    rows = live_hub.updates(cursor["ticker"], cursor["last"])
+    if rows.empty:
+        return dash.no_update, dash.no_update
+    return live_extend_data(rows, indicators), {"ticker": cursor["ticker"], "last": rows.index[-1].isoformat()}
+
+
+@app.callback(
+    Output("model-select", "options"),
+    Output("model-select", "value"),
+    Input("rl-ticker", "value"),
+    Input("rl-algo", "value"),
+    Input("training-job", "data")
+)
+@timed("callback.update_model_options")
+def update_model_options(ticker, algo, job):
+    """List registered models for the selected ticker/algorithm, newest first."""
+    models = model_registry.list_models(ticker=ticker, algo=algo)
+    options = [
+        {"label": f"{m['created']} - Sharpe {m['metrics'].get('sharpe_ratio', 0):.2f}", "value": m["id"]}
+        for m in models
+    ]
+    return options, (options[0]["value"] if options else None)
+
+
+@app.callback(
+    Output("leaderboard", "children"),
+    Input("ticker", "value"),
+    Input("metrics-output", "children")
+)
+@timed("callback.update_leaderboard")
+def update_leaderboard(ticker, metrics_text):
+    """Best stored runs for the selected ticker, refreshed after every backtest or evaluation."""
+    board = results_store.leaderboard("sharpe_ratio", ticker=ticker, limit=10)
+    if board.empty:
+        return html.Div("No runs recorded yet.", className="text-muted")
+    table = pd.DataFrame({
+        "Run": board["created"],
+        "Strategy": board["strategy"],
+        "Window": board["start_date"].fillna("") + " - " + board["end_date"].fillna(""),
+        "Sharpe": board["sharpe_ratio"].map("{:.2f}".format),
+        "Max Drawdown": board["max_drawdown"].map("{:.2%}".format),
+        "Return": board["total_return"].map("{:.2%}".format),
+    })
+    return dbc.Table.from_dataframe(table, striped=True, bordered=False, hover=True, size="sm")
+
+
+def render_policy_result(actions, net_worths, ticker, months, algo, result, indicator_options):
+    """Chart and metrics text for a policy's evaluation on ``ticker``."""
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=months * 30)
+    # Fetch data again for plotting
+    data = fetch_historical_data(ticker, start_date, end_date, interval="1d", context="rl_chart")
+
+    if data.empty:
+         raise ValueError(f"Failed to fetch data for chart for {ticker}")
+
+    # Align lengths - crucial for plotting
+    min_len = min(len(data), len(net_worths), len(actions))
+    if len(data) > min_len: data = data.iloc[:min_len]
+    if len(net_worths) > min_len: net_worths = net_worths[:min_len]
+    if len(actions) > min_len: actions = actions[:min_len]
+
+    if min_len == 0:
+         raise ValueError("No consistent data points after alignment.")
+
+    print(f"Creating RL chart with {min_len} points.")
+    fig = create_rl_chart(actions, net_worths, data, ticker, indicator_options)
+    results_store.record(ticker, algo.upper(), net_worths, actions, start_date=data.index[0],
+                         end_date=data.index[-1], months=months, metrics=result)
+    metrics = (
+        f"{algo.upper()} Results - Sharpe: {result['sharpe_ratio']:.2f}, "
+        f"Max Drawdown: {result['max_drawdown']:.2%}, Total Reward: {result['total_reward']:.2f}"
+    )
+    return fig, metrics
+
 
 @app.callback(
     [Output("rl-chart", "figure"),
@@ -183,20 +387,27 @@ def update_stock_chart(ticker, months, indicators):
      Output("progress-container", "style"),
      Output("progress-interval", "disabled"),
      Output("training-progress", "value"),
-     Output("progress-text", "children")],
+     Output("progress-text", "children"),
+     Output("training-job", "data")],
     [Input("train-btn", "n_clicks"),
      Input("backtest-btn", "n_clicks"),
+     Input("evaluate-btn", "n_clicks"),
      Input("progress-interval", "n_intervals")], # Keep interval as input
     [State("rl-ticker", "value"),
      State("time-slider", "value"), # Use the main time slider for RL training period
      State("indicator-checklist", "value"), # Pass indicators to chart
-     State("rl-algo", "value")],
+     State("rl-algo", "value"),
+     State("training-job", "data"),
+     State("model-select", "value")],
     prevent_initial_call=True
 )
-def train_and_visualize_rl(n_train, n_backtest, n_intervals, ticker, months, indicator_options, algo):
+@timed("callback.train_and_visualize_rl")
+def train_and_visualize_rl(n_train, n_backtest, n_evaluate, n_intervals, ticker, months, indicator_options, algo, job,
+                           model_id):
     """
     Handles training, backtesting, and progress updates.
-    Note: Synchronous training blocks UI. Progress updates via interval check global state.
+    Training is submitted to the background job manager; the interval polls
+    the job's progress and renders the results once it finishes.
     """
     triggered_id = ctx.triggered_id
     print(f"Callback triggered by: {triggered_id}")
@@ -210,6 +421,7 @@ def train_and_visualize_rl(n_train, n_backtest, n_intervals, ticker, months, ind
         "interval_disabled": no_update,
         "progress_value": no_update,
         "progress_text": no_update,
+        "job": no_update,
     }
 
     # --- Handle Train Button Click ---
@@ -217,117 +429,99 @@ def train_and_visualize_rl(n_train, n_backtest, n_intervals, ticker, months, ind
         if not n_train or n_train == 0:
             return list(outputs.values()) # No action if n_clicks is 0 or None
 
-        print(f"Train button clicked (n_clicks={n_train}). Starting training process...")
-        # Show progress bar immediately and enable interval
-        # This happens before the blocking call, but UI won't update until call finishes
+        print(f"Train button clicked (n_clicks={n_train}). Submitting training job...")
+        try:
+            job_id = job_manager.submit(ticker, months=months, algo=algo, total_timesteps=50000) # Reduced for faster testing
+        except RuntimeError as e:
+            outputs["metrics"] = f"Error: {str(e)}"
+            return list(outputs.values())
+
+        # Show progress bar and let the interval poll the job
         outputs["progress_style"] = {"display": "block"}
         outputs["progress_value"] = 0
-        outputs["progress_text"] = "Initializing..."
+        outputs["progress_text"] = "Queued..."
         outputs["interval_disabled"] = False # Enable interval timer
+        outputs["job"] = {"id": job_id, "ticker": ticker, "months": months, "algo": algo}
+        return list(outputs.values())
 
-        # Return these initial updates? No, Dash waits for the full callback.
-        # The UI will likely show the *previous* state until training finishes.
-
-        try:
-            model_path = f"models/{algo}_{ticker}.zip"
-            print(f"Calling train_model synchronously for {ticker} ({months} months)...")
-            # This call blocks the server process
-            actions, net_worths, total_reward, sharpe_ratio, max_drawdown = train_model(
-                ticker, months=months, save_path=model_path, algo=algo, total_timesteps=50000 # Reduced for faster testing
-            )
-            print(f"train_model completed for {ticker}.")
-
-            # --- Process results after training ---
-            actions = [int(a.item()) if hasattr(a, 'item') else int(a) for a in actions]
+    # --- Handle Progress Interval Tick ---
+    elif triggered_id == "progress-interval":
+        if not job:
+            outputs["progress_style"] = {"display": "none"}
+            outputs["interval_disabled"] = True
+            return list(outputs.values())
 
-            if not net_worths or not actions:
-                 raise ValueError("Training returned empty actions or net_worths.")
+        status = job_manager.status(job["id"])
+        state = status["state"]
 
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=months * 30)
-            # Fetch data again for plotting
-            data = fetch_historical_data(ticker, start_date, end_date, interval="1d", context="rl_chart")
+        if state in ("queued", "running"):
+            if state == "queued":
+                progress_text = f"Queued (position {status.get('position') or '?'})..."
+            else:
+                current_eta = status.get("eta") or "Calculating..."
+                progress_text = f"Training... {status.get('progress', 0)}% (ETA: {current_eta})"
+            outputs["progress_style"] = {"display": "block"}
+            outputs["interval_disabled"] = False
+            outputs["progress_value"] = status.get("progress", 0)
+            outputs["progress_text"] = progress_text
+            return list(outputs.values())
 
-            if data.empty:
-                 raise ValueError(f"Failed to fetch data for chart for {ticker}")
+        # Job finished (or is unknown): stop polling either way
+        outputs["progress_style"] = {"display": "none"}
+        outputs["interval_disabled"] = True
+        outputs["job"] = None
 
-            # Align lengths - crucial for plotting
-            min_len = min(len(data), len(net_worths), len(actions))
-            if len(data) > min_len: data = data.iloc[:min_len]
-            if len(net_worths) > min_len: net_worths = net_worths[:min_len]
-            if len(actions) > min_len: actions = actions[:min_len]
+        try:
+            if state != "done":
+                raise ValueError(status.get("error", "Training job was lost"))
+            result = status["result"]
+            actions = result["actions"]
+            net_worths = result["net_worths"]
+            ticker, months, algo = job["ticker"], job["months"], job["algo"]
+            print(f"Training job {job['id']} completed for {ticker}.")
 
-            if min_len == 0:
-                 raise ValueError("No consistent data points after alignment.")
+            if not net_worths or not actions:
+                 raise ValueError("Training returned empty actions or net_worths.")
 
-            print(f"Creating RL chart with {min_len} points.")
-            fig = create_rl_chart(actions, net_worths, data, ticker, indicator_options)
-            metrics = f"{algo.upper()} Results - Sharpe: {sharpe_ratio:.2f}, Max Drawdown: {max_drawdown:.2%}, Total Reward: {total_reward:.2f}"
+            fig, metrics = render_policy_result(actions, net_worths, ticker, months, algo, result, indicator_options)
             print(f"Returning final results. Metrics: {metrics}")
 
-            # Update outputs for final state
             outputs["figure"] = fig
             outputs["metrics"] = metrics
-            outputs["progress_style"] = {"display": "none"} # Hide progress bar
-            outputs["interval_disabled"] = True # Disable interval
-            outputs["progress_value"] = 100 # Show 100 briefly if needed
+            outputs["progress_value"] = 100
             outputs["progress_text"] = "Training completed!"
-
             return list(outputs.values())
 
         except Exception as e:
             print(f"Error during training or result processing: {str(e)}")
             error_fig = go.Figure().update_layout(title=f"Training Error: {str(e)}", template="plotly_dark")
-            # Update outputs for error state
             outputs["figure"] = error_fig
             outputs["metrics"] = f"Error: {str(e)}"
-            outputs["progress_style"] = {"display": "none"} # Hide progress bar
-            outputs["interval_disabled"] = True # Disable interval
             outputs["progress_value"] = 0
             outputs["progress_text"] = "Training failed"
             return list(outputs.values())
 
-    # --- Handle Progress Interval Tick ---
-    elif triggered_id == "progress-interval":
-        # This part updates the display based on global state from the trainer
-        current_progress = training_progress # Read global variable
-        current_eta = training_eta if training_eta is not None else "Calculating..." # Read global variable
-
-        if 0 <= current_progress < 100:
-            # Training is actively in progress (or just started)
-            progress_text = f"Training... {current_progress}% (ETA: {current_eta})"
-            # Keep progress bar visible, keep interval running, update values
-            outputs["progress_style"] = {"display": "block"}
-            outputs["interval_disabled"] = False
-            outputs["progress_value"] = current_progress
-            outputs["progress_text"] = progress_text
-            # Don't update figure or metrics
-            outputs["figure"] = no_update
-            outputs["metrics"] = no_update
-            return list(outputs.values())
-        elif current_progress >= 100:
-             # Training finished, interval should stop, hide progress bar
-             # This state is mainly handled by the train-btn logic return,
-             # but the interval might tick one last time.
-             print("Interval detected completion (progress>=100). Disabling interval.")
-             outputs["progress_style"] = {"display": "none"}
-             outputs["interval_disabled"] = True
-             outputs["progress_value"] = 100
-             outputs["progress_text"] = "Finalizing..." # Or "Training completed!"
-             # Don't update figure or metrics here
-             outputs["figure"] = no_update
-             outputs["metrics"] = no_update
-             return list(outputs.values())
-        else: # Progress is < 0 or invalid state? Should not happen.
-             print("Interval update: Invalid progress state. Hiding progress.")
-             outputs["progress_style"] = {"display": "none"}
-             outputs["interval_disabled"] = True
-             outputs["progress_value"] = 0
-             outputs["progress_text"] = ""
-             outputs["figure"] = no_update
-             outputs["metrics"] = no_update
-             return list(outputs.values())
 
+    # --- Handle Evaluate Button Click ---
+    elif triggered_id == "evaluate-btn":
+        if not n_evaluate:
+            return list(outputs.values())
+        try:
+            entry = model_registry.get(model_id) if model_id else None
+            if entry is None:
+                raise ValueError("Select a saved model to evaluate")
+            # Imported here so torch is only loaded once a model is evaluated
+            from rl.trainer import evaluate_model
+            actions, net_worths, total_reward, sharpe_ratio, max_drawdown = evaluate_model(
+                ticker, months, model_path=entry["path"], algo=entry["algo"])
+            result = {"sharpe_ratio": sharpe_ratio, "max_drawdown": max_drawdown, "total_reward": total_reward}
+            outputs["figure"], outputs["metrics"] = render_policy_result(
+                actions, net_worths, ticker, months, entry["algo"], result, indicator_options)
+        except Exception as e:
+            print(f"Evaluation error: {str(e)}")
+            outputs["figure"] = go.Figure().update_layout(title=f"Evaluation Error: {str(e)}", template="plotly_dark")
+            outputs["metrics"] = f"Error: {str(e)}"
+        return list(outputs.values())
 
     # --- Handle Backtest Button Click ---
     elif triggered_id == "backtest-btn":
@@ -335,7 +529,7 @@ def train_and_visualize_rl(n_train, n_backtest, n_intervals, ticker, months, ind
              return list(outputs.values())
         print(f"Backtest button clicked (n_clicks={n_backtest}). Running backtest...")
         try:
-            result = backtest_strategy(ticker, months, rsi_strategy) # Assuming rsi_strategy is defined/imported
+            result = backtest_strategy(ticker, months, rsi_signals, vectorized=True) # Whole-array RSI signals
             if "error" in result:
                 raise ValueError(result["error"])
             print(f"Backtest result: {result}")
@@ -347,8 +541,8 @@ def train_and_visualize_rl(n_train, n_backtest, n_intervals, ticker, months, ind
             if data.empty:
                  raise ValueError(f"No data for backtest chart for {ticker}")
 
-            # Generate actions based on strategy for plotting
-            actions = [rsi_strategy(data.iloc[:i+1]) for i in range(len(data))] # Assumes rsi_strategy takes data slice
+            # Actions taken by the strategy, for plotting
+            actions = result["actions"]
 
             # Align lengths
             min_len = min(len(data), len(result["net_worths"]), len(actions))
@@ -367,35 +561,19 @@ def train_and_visualize_rl(n_train, n_backtest, n_intervals, ticker, months, ind
             )
             print("Backtest visualization complete.")
 
-            # --- Save results to CSV ---
-            csv_dir = "CSV" # Defines the folder name
-            os.makedirs(csv_dir, exist_ok=True) # Creates the folder if it doesn't exist
-            timestamp = datetime.now().strftime("%H_%M_%S") # Format HH_MM_SS
-            filename = f"Backtest Result {timestamp}.csv"
-            filepath = os.path.join(csv_dir, filename) # Creates the full path
-
-            # Create DataFrame with backtest results
-            import pandas as pd
-            metrics_df = pd.DataFrame({
-                'Ticker': [ticker],
-                'Strategy': ['RSI'],
-                'Sharpe Ratio': [result['sharpe_ratio']],
-                'Max Drawdown': [result['max_drawdown']],
-                'Final Portfolio Value': [net_worths[-1] if len(net_worths) > 0 else 0],
-                'Test Period (Months)': [months],
-                'Timestamp': [datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
-            })
-            metrics_df.to_csv(filepath, index=False)
-            print(f"Backtest results saved to: {filepath}")
-            # --- End Save results to CSV ---
+            # Append the run (metrics and equity curve) to the results store
+            results_store.record(ticker, "RSI", net_worths, actions, params={"lower": 30, "upper": 70},
+                                 start_date=data.index[0], end_date=data.index[-1], months=months,
+                                 metrics=result)
 
             # Update outputs for backtest results
             outputs["figure"] = fig
             outputs["metrics"] = metrics
-            outputs["progress_style"] = {"display": "none"} # Hide progress
-            outputs["interval_disabled"] = True # Ensure interval is off
-            outputs["progress_value"] = 0
-            outputs["progress_text"] = ""
+            if not job: # Leave the progress display alone while a training job is polled
+                outputs["progress_style"] = {"display": "none"} # Hide progress
+                outputs["interval_disabled"] = True # Ensure interval is off
+                outputs["progress_value"] = 0
+                outputs["progress_text"] = ""
             return list(outputs.values())
 
         except Exception as e:
@@ -404,10 +582,11 @@ def train_and_visualize_rl(n_train, n_backtest, n_intervals, ticker, months, ind
             # Update outputs for error state
             outputs["figure"] = error_fig
             outputs["metrics"] = f"Error: {str(e)}"
-            outputs["progress_style"] = {"display": "none"}
-            outputs["interval_disabled"] = True
-            outputs["progress_value"] = 0
-            outputs["progress_text"] = ""
+            if not job:
+                outputs["progress_style"] = {"display": "none"}
+                outputs["interval_disabled"] = True
+                outputs["progress_value"] = 0
+                outputs["progress_text"] = ""
             return list(outputs.values())
 
     # --- Default case or other triggers ---
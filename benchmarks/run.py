@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from unittest import mock
+import numpy as np
+import pandas as pd
+from data import fetcher
+from data.barframe import BarFrame
+from data.indicators import add_indicators
+from data.providers import SyntheticProvider
+import components.plots as plots
+import rl.backtest as backtest
+from rl.environment import StockTradingEnv
+from rl.rl_visualizer import create_rl_chart
+from rl.trainer import calculate_metrics
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+# Regressions beyond this fraction of the baseline time fail the run
+DEFAULT_TOLERANCE = 0.25
+# The per-row backtest slices the frame once per row, so it is only run up to this size
+PER_ROW_LIMIT = 100_000
+# Env steps timed per size (the episode is restarted if the data is shorter)
+ENV_STEPS = 100_000
+BENCHMARK_GROUPS = ["fetch", "env", "backtest", "charts"]
+
+# Synthetic minute bars ending here, so every run sees the same data
+END_DATE = datetime(2024, 1, 2, 16)
+BARS_PER_DAY = 390
+TICKER = "BENCH"
+
+
+def timed(func, repeat=3):
+    """Best wall time of ``repeat`` calls and the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def window_for(size):
+    """Start date giving roughly ``size`` minute bars before END_DATE."""
+    days = int(np.ceil(size / BARS_PER_DAY)) + 1
+    return (pd.Timestamp(END_DATE).normalize() - pd.offsets.BDay(days)).to_pydatetime()
+
+
+def bench_fetch(size, repeat):
+    """Cold (generate, enrich, write), warm (store read) and hot (range cache) fetches."""
+    results = {}
+    root = tempfile.mkdtemp()
+    previous = fetcher.set_provider(SyntheticProvider(), store_dir=root)
+    start = window_for(size)
+    fetch = lambda: fetcher.fetch_historical_data(TICKER, start, END_DATE, interval="1m")
+    try:
+        cold = float("inf")
+        for i in range(repeat):
+            fetcher.set_provider(fetcher.get_provider(), store_dir=os.path.join(root, str(i)))
+            seconds, data = timed(fetch, repeat=1)
+            cold = min(cold, seconds)
+        rows = len(data)
+        results["fetch_cold"] = cold
+
+        def warm():
+            fetcher.clear_fetch_cache()
+            return fetch()
+        results["fetch_warm"] = timed(warm, repeat)[0]
+        results["fetch_hot"] = timed(fetch, repeat)[0]
+    finally:
+        fetcher.set_provider(previous)
+        shutil.rmtree(root)
+    # Downstream benchmarks run on exactly ``size`` enriched bars
+    data = data.iloc[-size:]
+    bars = data[['Open', 'High', 'Low', 'Close', 'Volume']]
+    results = {name: {"seconds": seconds, "rows": rows} for name, seconds in results.items()}
+    results["add_indicators"] = {"seconds": timed(lambda: add_indicators(bars), repeat)[0], "rows": len(bars)}
+    return results, data
+
+
+def bench_env(data, repeat):
+    """Env construction and step throughput with random discrete actions."""
+    seconds, env = timed(lambda: StockTradingEnv(TICKER, data=data), repeat)
+    actions = np.random.default_rng(0).integers(0, 3, ENV_STEPS).tolist()
+
+    def run():
+        env.reset()
+        for action in actions:
+            _, _, done, _, _ = env.step(action)
+            if done:
+                env.reset()
+    step_seconds = timed(run, repeat)[0]
+    return {
+        "env_build": {"seconds": seconds, "rows": len(data)},
+        "env_step": {"seconds": step_seconds, "rows": ENV_STEPS},
+    }
+
+
+def bench_backtest(data, repeat):
+    """backtest_strategy with the per-row rsi_strategy and the vectorized rsi_signals."""
+    results = {}
+    with mock.patch.object(backtest, "fetch_historical_data", lambda *args, **kwargs: data):
+        seconds, result = timed(lambda: backtest.backtest_strategy(TICKER, 12, backtest.rsi_signals, vectorized=True),
+                                repeat)
+        results["backtest_vectorized"] = {"seconds": seconds, "rows": len(data)}
+        if len(data) <= PER_ROW_LIMIT:
+            seconds = timed(lambda: backtest.backtest_strategy(TICKER, 12, backtest.rsi_strategy), 1)[0]
+            results["backtest_rsi_strategy"] = {"seconds": seconds, "rows": len(data)}
+    net_worths = result["net_worths"]
+    results["calculate_metrics"] = {"seconds": timed(lambda: calculate_metrics(net_worths), repeat)[0],
+                                    "rows": len(net_worths)}
+    return results, result
+
+
+def bench_charts(data, backtest_result, repeat):
+    """Figure construction for the RL chart and the multi-ticker stock chart."""
+    actions, net_worths = backtest_result["actions"], backtest_result["net_worths"]
+    seconds = timed(lambda: create_rl_chart(actions, net_worths, data, TICKER, ["RSI", "MACD"]), repeat)[0]
+    results = {"create_rl_chart": {"seconds": seconds, "rows": len(data)}}
+
+    bars = BarFrame.from_frame(data)
+    with mock.patch.object(plots, "fetch_many_bars", lambda *args, **kwargs: {t: bars for t in plots.TICKERS[:2]}):
+        seconds = timed(lambda: plots.create_stock_chart(plots.TICKERS[:2], 12, "Line", ["20", "50"],
+                                                         ["RSI", "MACD"]), repeat)[0]
+    results["create_stock_chart"] = {"seconds": seconds, "rows": 2 * len(data)}
+    return results
+
+
+def run_benchmarks(sizes=None, repeat=3, groups=None):
+    """
+    Time the core data, environment, backtest and chart paths on synthetic bars.
+
+    Args:
+        sizes (list): Numbers of bars per run.
+        repeat (int): Repetitions per measurement; the best time is kept.
+        groups (list): Subset of BENCHMARK_GROUPS to run (data is always fetched).
+
+    Returns:
+        dict: 'meta' (environment info) and 'results' mapping
+        "{benchmark}@{size}" to seconds, rows and rows per second.
+    """
+    groups = groups or BENCHMARK_GROUPS
+    results = {}
+    for size in sizes or DEFAULT_SIZES:
+        print(f"Benchmarks: {size} bars")
+        timings, data = bench_fetch(size, repeat)
+        if "env" in groups:
+            timings.update(bench_env(data, repeat))
+        if "backtest" in groups or "charts" in groups:
+            backtest_timings, backtest_result = bench_backtest(data, repeat)
+            if "backtest" in groups:
+                timings.update(backtest_timings)
+            if "charts" in groups:
+                timings.update(bench_charts(data, backtest_result, repeat))
+        for name, timing in timings.items():
+            timing["rows_per_second"] = timing["rows"] / timing["seconds"] if timing["seconds"] > 0 else None
+            results[f"{name}@{size}"] = timing
+            print(f"  {name:<24}{timing['seconds'] * 1000:>12.2f} ms{timing['rows']:>10} rows")
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare benchmark results with a baseline.
+
+    Args:
+        current (dict): Output of ``run_benchmarks``.
+        baseline (dict): Earlier output of ``run_benchmarks``.
+        tolerance (float): Allowed slowdown as a fraction of the baseline time.
+
+    Returns:
+        tuple: (regressions, missing): (name, baseline seconds, current
+        seconds, ratio) for every benchmark slower than the tolerance allows,
+        and the names of benchmarks the baseline has no time for.
+    """
+    regressions, missing = [], []
+    for name, timing in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None or not reference["seconds"]:
+            print(f"  {name:<34}{'not in baseline':>15}")
+            missing.append(name)
+            continue
+        ratio = timing["seconds"] / reference["seconds"]
+        print(f"  {name:<34}{reference['seconds'] * 1000:>12.2f} ms ->{timing['seconds'] * 1000:>12.2f} ms"
+              f"  x{ratio:.2f}{'  REGRESSION' if ratio > 1 + tolerance else ''}")
+        if ratio > 1 + tolerance:
+            regressions.append((name, reference["seconds"], timing["seconds"], ratio))
+    return regressions, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the core paths on synthetic data.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="Bars per run")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per measurement (best is kept)")
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARK_GROUPS, default=BENCHMARK_GROUPS,
+                        help="Benchmark groups to run")
+    parser.add_argument("--output", default="benchmarks/results.json", help="Where to save the results")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown vs the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.repeat, args.benchmarks)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmarks: results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Benchmarks: comparing with {args.baseline}")
+        regressions, missing = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"Benchmarks: {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for name, before, after, ratio in regressions:
+                print(f"  {name}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms (x{ratio:.2f})")
+        if missing:
+            # An unchecked benchmark could regress unnoticed: the baseline must cover the run
+            print(f"Benchmarks: {len(missing)} benchmark(s) missing from the baseline, regenerate it: "
+                  f"{', '.join(missing)}")
+        if regressions or missing:
+            return 1
+        print("Benchmarks: no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+from config.settings import CHART_MAX_POINTS
+from data.store import localize_like, to_naive
+
+def _as_float(values):
+    """Numeric view of an index/array (datetimes as nanoseconds)."""
+    if isinstance(values, pd.DatetimeIndex):
+        return values.as_unit("ns").asi8.astype(np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets selection of ``n_out`` points.
+
+    Keeps the first and last point and, from each bucket in between, the point
+    forming the largest triangle with the previously kept point and the
+    average of the next bucket, which preserves the visual shape of a line.
+
+    Args:
+        x (array-like): X values (a DatetimeIndex is fine).
+        y (array-like): Y values.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_float(x)
+    # NaNs (e.g. indicator warm-up rows) would poison the areas
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_start, next_end = end, (edges[i + 2] if i + 2 < len(edges) else n)
+        next_end = max(next_end, next_start + 1)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return np.unique(kept)
+
+def minmax_indices(y, n_out):
+    """
+    Keep the minimum and maximum of each of ``n_out // 2`` equal buckets.
+
+    Cheaper than LTTB (fully vectorized) and never drops a spike, which suits
+    bar charts and noisy intraday data.
+
+    Args:
+        y (array-like): Y values.
+        n_out (int): Approximate number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    buckets = max(1, n_out // 2)
+    if n_out >= n:
+        return np.arange(n)
+    size = int(np.ceil(n / buckets))
+    rows = int(np.ceil(n / size))
+    low = np.full(rows * size, np.inf)
+    high = np.full(rows * size, -np.inf)
+    finite = np.isfinite(y)
+    low[:n] = np.where(finite, y, np.inf)
+    high[:n] = np.where(finite, y, -np.inf)
+    offsets = np.arange(rows) * size
+    kept = np.concatenate([
+        offsets + low.reshape(rows, size).argmin(axis=1),
+        offsets + high.reshape(rows, size).argmax(axis=1),
+        [0, n - 1],
+    ])
+    return np.unique(kept[kept < n])
+
+def downsample_indices(x, y, n_out, method="lttb"):
+    """Indices kept by ``method`` ("lttb" or "minmax")."""
+    if method == "minmax":
+        return minmax_indices(y, n_out)
+    if method == "lttb":
+        return lttb_indices(x, y, n_out)
+    raise ValueError(f"Unknown downsampling method: {method}")
+
+def visible_range(relayout_data):
+    """
+    X-axis range a user zoomed to, from a dcc.Graph ``relayoutData``.
+
+    Args:
+        relayout_data (dict): Relayout event (range slider drag, zoom, reset).
+
+    Returns:
+        tuple: (start, end) timestamps, or None for the full range.
+    """
+    if not relayout_data or relayout_data.get("xaxis.autorange"):
+        return None
+    if "xaxis.range[0]" in relayout_data and "xaxis.range[1]" in relayout_data:
+        bounds = relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]
+    elif "xaxis.range" in relayout_data:
+        bounds = relayout_data["xaxis.range"]
+    else:
+        return None
+    try:
+        return pd.Timestamp(bounds[0]), pd.Timestamp(bounds[1])
+    except (TypeError, ValueError):
+        return None
+
+def chart_indices(data, columns, x_range=None, max_points=CHART_MAX_POINTS, method="lttb"):
+    """
+    Rows of ``data`` to plot so every trace stays within ``max_points``.
+
+    Each column gets an equal share of the budget and the kept rows are
+    merged, so all traces share x values (and hover data stays aligned).
+    When the user has zoomed to ``x_range``, a coarse overview of the whole
+    history (for the range slider) is combined with full-budget detail of
+    the visible window.
+
+    Args:
+        data (pd.DataFrame or BarFrame): Time-indexed data.
+        columns (list): Columns that will be plotted.
+        x_range (tuple): Visible (start, end), or None for the full history.
+        max_points (int): Point budget per trace.
+        method (str): "lttb" or "minmax".
+
+    Returns:
+        np.ndarray: Sorted row positions.
+    """
+    n = len(data)
+    columns = [c for c in columns if c in data] or [data.columns[0]]
+    if n <= max_points:
+        return np.arange(n)
+    share = max(3, max_points // len(columns))
+
+    def select(rows, budget):
+        index = data.index[rows]
+        return np.unique(np.concatenate([
+            rows[downsample_indices(index, np.asarray(data[c])[rows], budget, method)] for c in columns
+        ]))
+
+    everything = np.arange(n)
+    if x_range is None:
+        return select(everything, share)
+    start = localize_like(to_naive(x_range[0]), data.index)
+    end = localize_like(to_naive(x_range[1]), data.index)
+    lo, hi = data.index.searchsorted(start), data.index.searchsorted(end, side="right")
+    # One extra row on each side so lines run to the edges of the view
+    window = everything[max(0, lo - 1):min(n, hi + 1)]
+    overview = select(everything, max(3, share // 4))
+    if len(window) == 0:
+        return overview
+    return np.union1d(overview[(overview < window[0]) | (overview > window[-1])], select(window, share))
@@ -0,0 +1,81 @@
+import json
+import threading
+import cachetools
+from config.settings import FIGURE_CACHE_BYTES, FIGURE_CACHE_TTL
+
+class FigureCache:
+    """
+    Rendered figures stored as plain, JSON-compatible dicts.
+
+    Entries expire after ``ttl`` seconds and the least recently used are
+    evicted once their serialized size exceeds ``max_bytes``. Keys should
+    include the data generation (see ``data.fetcher.data_generation``) so
+    figures built from bars that have since been updated are never served.
+    Figures are converted once when stored, so a hit returns the stored dict
+    as is: no pandas, Plotly figure construction or JSON parsing. Dash still
+    encodes the dict into the callback response.
+    """
+
+    def __init__(self, max_bytes=FIGURE_CACHE_BYTES, ttl=FIGURE_CACHE_TTL):
+        """
+        Args:
+            max_bytes (int): Serialized size of the figures kept across all entries.
+            ttl (float): Seconds an entry stays valid.
+        """
+        # Entries are (figure dict, serialized size)
+        self._entries = cachetools.TTLCache(maxsize=max_bytes, ttl=ttl, getsizeof=lambda entry: entry[1])
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Return the cached figure for ``key``.
+
+        Args:
+            key (tuple): Hashable view key.
+
+        Returns:
+            dict: Figure (data and layout), shared by every hit so it must not
+            be modified, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, figure):
+        """
+        Convert and store a figure.
+
+        Args:
+            key (tuple): Hashable view key.
+            figure (go.Figure): Figure to cache.
+        """
+        payload = figure.to_json()
+        with self._lock:
+            try:
+                self._entries[key] = (json.loads(payload), len(payload))
+            except ValueError:
+                pass  # Larger than the whole cache
+
+    def clear(self):
+        """Drop all entries and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict: Hits, misses, cached figures and their serialized size in bytes.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._entries), "bytes": self._entries.currsize}
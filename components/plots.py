@@ -1,25 +1,32 @@
+import numpy as np
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from data.fetcher import fetch_historical_data
-from config.settings import TICKERS, COLORS
-from ta.momentum import RSIIndicator
-from ta.trend import MACD
+from data.fetcher import fetch_many_bars
+from config.settings import CHART_MAX_POINTS, LIVE_WINDOW_BARS, TICKERS, COLORS
+from components.downsample import chart_indices
 
-def create_stock_chart(selected_stocks, months, chart_type, ma_options, indicator_options):
+def create_stock_chart(selected_stocks, months, chart_type, ma_options, indicator_options, x_range=None,
+                       max_points=CHART_MAX_POINTS):
     end_date = datetime.now()
     start_date = end_date - timedelta(days=months * 30)
     interval = "1m" if months <= 1 else "1d"
     fig = go.Figure()
+    # Load every selected ticker concurrently as read-only views of the cached bars
+    bars = fetch_many_bars([t for t in selected_stocks if t in TICKERS], start_date, end_date,
+                           interval=interval, context="chart")
     
     for i, ticker in enumerate(selected_stocks):
-        if ticker in TICKERS:
-            data = fetch_historical_data(ticker, start_date, end_date, interval=interval, context="chart")
+        if ticker in bars:
+            data = bars[ticker]
             if not data.empty:
-                data['RSI'] = RSIIndicator(data['Close']).rsi()
-                macd = MACD(data['Close'])
-                data['MACD'] = macd.macd()
-                data['MACD_Signal'] = macd.macd_signal()
-                
+                # Bound the points per trace; min/max buckets keep every spike visible in bar charts
+                columns = ['Close'] + [f"MA{ma}" for ma in ('20', '50') if ma in ma_options]
+                if 'RSI' in indicator_options:
+                    columns.append('RSI')
+                if 'MACD' in indicator_options:
+                    columns += ['MACD', 'MACD_Signal']
+                data = data.take(chart_indices(data, columns, x_range, max_points,
+                                               method="minmax" if chart_type == 'Bar' else "lttb"))
                 trace = go.Bar if chart_type == 'Bar' else go.Scatter
                 fig.add_trace(trace(
                     x=data.index,
@@ -36,7 +43,7 @@ def create_stock_chart(selected_stocks, months, chart_type, ma_options, indicato
                         "Low: $%{customdata[2]:.2f}<br>" +
                         "Volume: %{customdata[3]:,}<extra></extra>"
                     ),
-                    customdata=data[['Open', 'High', 'Low', 'Volume']].values
+                    customdata=np.column_stack([data['Open'], data['High'], data['Low'], data['Volume']])
                 ))
                 
                 if '20' in ma_options and 'MA20' in data:
@@ -97,4 +104,76 @@ def create_stock_chart(selected_stocks, months, chart_type, ma_options, indicato
         font=dict(color='#1f2937')
     )
     
-    return fig
\ No newline at end of file
+    return fig
+
+
+# Live chart traces in order: (column, name, color, y axis)
+LIVE_TRACES = [
+    ('Close', "Close", "#1f77b4", "y"),
+    ('RSI', "RSI", "#2ca02c", "y2"),
+    ('MACD', "MACD", "#d62728", "y3"),
+    ('MACD_Signal', "MACD Signal", "#9467bd", "y3"),
+]
+
+def live_columns(indicator_options):
+    """Columns plotted by the live chart, in trace order."""
+    return [t[0] for t in LIVE_TRACES
+            if t[0] == 'Close' or t[0] in indicator_options or (t[0] == 'MACD_Signal' and 'MACD' in indicator_options)]
+
+def _live_x(index):
+    # Exchange wall-clock time, so the initial figure and extendData agree
+    if getattr(index, "tz", None) is not None:
+        index = index.tz_localize(None)
+    return index.strftime("%Y-%m-%d %H:%M:%S").tolist()
+
+def create_live_chart(data, ticker, indicator_options, window=LIVE_WINDOW_BARS):
+    """
+    Create the live intraday chart from the bars held for ``ticker``.
+
+    Args:
+        data (pd.DataFrame): Bars with indicator columns (see data.live.LiveSeries).
+        ticker (str): Stock ticker.
+        indicator_options (list): Selected indicators ("RSI", "MACD").
+        window (int): Most recent bars to show.
+
+    Returns:
+        go.Figure: Figure whose traces follow ``live_columns`` order.
+    """
+    data = data.iloc[-window:]
+    x = _live_x(data.index)
+    fig = go.Figure()
+    for column, name, color, yaxis in LIVE_TRACES:
+        if column in live_columns(indicator_options):
+            fig.add_trace(go.Scatter(x=x, y=data[column].to_numpy(), mode="lines", name=name,
+                                     line=dict(color=color), yaxis=yaxis))
+    fig.update_layout(
+        title=f"{ticker} Live",
+        yaxis=dict(title="Price (USD)", domain=[0.3, 1]),
+        yaxis2=dict(title="RSI", overlaying="y", side="right", range=[0, 100], showgrid=False),
+        yaxis3=dict(title="MACD", overlaying="y", side="left", anchor="free", position=0.0, showgrid=False),
+        template="plotly_dark",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(l=50, r=50, t=50, b=50),
+        uirevision=ticker
+    )
+    return fig
+
+def live_extend_data(rows, indicator_options, window=LIVE_WINDOW_BARS):
+    """
+    ``extendData`` payload appending ``rows`` to a chart from ``create_live_chart``.
+
+    Args:
+        rows (pd.DataFrame): New bars with indicator columns.
+        indicator_options (list): Selected indicators (must match the figure).
+        window (int): Points kept per trace in the browser.
+
+    Returns:
+        list: [update, trace indices, max points] for dcc.Graph.extendData.
+    """
+    columns = live_columns(indicator_options)
+    x = _live_x(rows.index)
+    update = {
+        'x': [x for _ in columns],
+        'y': [rows[column].tolist() for column in columns],
+    }
+    return [update, list(range(len(columns))), window]
@@ -1,3 +1,5 @@
+import os
+
 # Stock tickers to display
 TICKERS = ["NVDA", "AAPL", "MSFT", "GOOGL", "AMZN"]
 
@@ -21,4 +23,49 @@ RL_HYPERPARAMS = {
     'n_epochs': 10,
     'gamma': 0.99,
     'gae_lambda': 0.95
-}
\ No newline at end of file
+}
+
+# Local on-disk bar store used by data.fetcher (one subdirectory per provider)
+DATA_STORE_DIR = 'cache/bars'
+# Memory-mapped observation matrices written by rl.feature_store
+FEATURE_STORE_DIR = 'cache/features'
+
+# Market-data provider used by data.fetcher: "yfinance", "replay" or "synthetic".
+# Read from the environment so background workers pick up the same choice.
+DATA_PROVIDER = os.environ.get('STOCK_DATA_PROVIDER', 'yfinance')
+# Recorded bars served by the replay provider
+REPLAY_DATA_DIR = 'cache/replay'
+
+# Opt-in cProfile capture of single Dash requests via /metrics/profile (utils.instrumentation)
+PROFILING_ENABLED = os.environ.get('STOCK_PROFILING') == '1'
+
+# Trained models and their registry index (rl.registry)
+MODELS_DIR = 'models'
+# Backtest and evaluation runs with their equity curves (rl.results)
+RESULTS_DB_PATH = 'results/results.db'
+
+# Bulk loading (data.fetcher.fetch_many): concurrent fetches and retry policy
+FETCH_MAX_WORKERS = 8
+FETCH_RETRIES = 2
+FETCH_BACKOFF = 0.5  # Seconds before the first retry, doubled on each further retry
+
+# Points per chart trace sent to the browser; longer series are downsampled (components.downsample)
+CHART_MAX_POINTS = 2000
+
+# Live intraday streaming (data.live): bar interval, poll period per ticker,
+# history loaded when a ticker is first followed and bars kept in memory
+LIVE_INTERVAL = '1m'
+LIVE_POLL_SECONDS = 5
+LIVE_HISTORY_DAYS = 5
+LIVE_MAX_BARS = 2000
+LIVE_WINDOW_BARS = 390  # Bars shown in the live chart (one regular session of 1m bars)
+# Replay a past session as if it were live: simulated start time and clock speed-up
+LIVE_REPLAY_START = os.environ.get('STOCK_LIVE_REPLAY_START')
+LIVE_REPLAY_SPEED = float(os.environ.get('STOCK_LIVE_REPLAY_SPEED', '60'))
+
+# Rendered figure cache (components.figure_cache): entry lifetime and memory bound (serialized bytes)
+FIGURE_CACHE_TTL = 300
+FIGURE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Data exports (utils.helpers): rows encoded per chunk (one Parquet row group each)
+EXPORT_CHUNK_ROWS = 50_000
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from data.indicators import INDICATOR_COLUMNS
+from data.store import localize_like, to_naive
+
+# Columns kept per bar; provider extras (Dividends, Stock Splits, ...) are dropped
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume'] + INDICATOR_COLUMNS
+# Columns kept as separate float64 arrays (share counts overflow float32's 24-bit mantissa)
+FLOAT64_COLUMNS = ['Volume']
+
+
+class BarFrame:
+    """
+    Compact, read-only columnar bars.
+
+    Prices and indicators live in one C-contiguous float32 block (one row per
+    column), volumes in their own float64 arrays so share counts stay exact.
+    Rows are indexed by a DatetimeIndex whose int64 nanosecond timestamps are
+    available as ``timestamps``. All arrays are marked read-only, so a frame
+    can be handed to any number of consumers (range cache, environments,
+    charts) without defensive copies: ``slice`` and ``between`` return views,
+    and only ``take`` and ``to_frame`` allocate.
+    """
+
+    def __init__(self, index, columns, block, wide=None):
+        """
+        Args:
+            index (pd.DatetimeIndex): Bar timestamps.
+            columns (list): Column names in frame order.
+            block (np.ndarray): float32 array of shape (n, len(index)) holding
+                the columns that are not in ``wide``, in order.
+            wide (dict): Column name -> float64 array of length len(index).
+        """
+        wide = wide or {}
+        block.flags.writeable = False
+        for values in wide.values():
+            values.flags.writeable = False
+        self.index = index
+        self.columns = list(columns)
+        self._block = block
+        self._wide = wide
+        self._positions = {name: i for i, name in enumerate(c for c in self.columns if c not in wide)}
+
+    @classmethod
+    def from_frame(cls, data, columns=BAR_COLUMNS, dropna=True):
+        """
+        Build a frame from a pandas DataFrame.
+
+        Args:
+            data (pd.DataFrame): Time-indexed bars.
+            columns (list): Columns to keep (those missing from ``data`` are skipped).
+            dropna (bool): Drop rows with a missing value in a kept column
+                (e.g. indicator warm-up rows).
+
+        Returns:
+            BarFrame: Frame with a copy of the kept columns (float32, FLOAT64_COLUMNS as float64).
+        """
+        if data.empty:
+            return cls(pd.DatetimeIndex([]), [], np.empty((0, 0), dtype=np.float32))
+        columns = [c for c in columns if c in data]
+        narrow = [c for c in columns if c not in FLOAT64_COLUMNS]
+        values = data[narrow].to_numpy(dtype=np.float32)
+        wide = {c: data[c].to_numpy(dtype=np.float64) for c in columns if c in FLOAT64_COLUMNS}
+        index = data.index
+        if dropna:
+            keep = np.isfinite(values).all(axis=1)
+            for column in wide.values():
+                keep &= np.isfinite(column)
+            if not keep.all():
+                values, index = values[keep], index[keep]
+                wide = {c: column[keep] for c, column in wide.items()}
+        wide = {c: np.ascontiguousarray(column) for c, column in wide.items()}
+        return cls(pd.DatetimeIndex(index), columns, np.ascontiguousarray(values.T), wide)
+
+    @property
+    def timestamps(self):
+        """Bar times as int64 nanoseconds (UTC for timezone-aware bars)."""
+        return self.index.asi8
+
+    @property
+    def empty(self):
+        return len(self.index) == 0 or not self.columns
+
+    @property
+    def nbytes(self):
+        """Memory held by the values and timestamps."""
+        return self._block.nbytes + sum(c.nbytes for c in self._wide.values()) + self.timestamps.nbytes
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, name):
+        """Read-only view of one column (float32, or float64 for FLOAT64_COLUMNS)."""
+        if name in self._wide:
+            return self._wide[name]
+        return self._block[self._positions[name]]
+
+    def slice(self, start, stop):
+        """Rows [start, stop) as a view of this frame."""
+        wide = {c: column[start:stop] for c, column in self._wide.items()}
+        return BarFrame(self.index[start:stop], self.columns, self._block[:, start:stop], wide)
+
+    def between(self, start, end):
+        """
+        Bars in [start, end) as a view of this frame.
+
+        Args:
+            start: Inclusive start time (naive times are taken in the index timezone).
+            end: Exclusive end time.
+
+        Returns:
+            BarFrame: View of the matching rows.
+        """
+        lo = self.index.searchsorted(localize_like(to_naive(start), self.index))
+        hi = self.index.searchsorted(localize_like(to_naive(end), self.index))
+        return self.slice(lo, hi)
+
+    def take(self, positions):
+        """Rows at ``positions`` (a copy), e.g. the points kept by downsampling."""
+        wide = {c: column[positions] for c, column in self._wide.items()}
+        return BarFrame(self.index[positions], self.columns, self._block[:, positions], wide)
+
+    def to_frame(self, columns=None, dtype=np.float64):
+        """
+        Copy into a pandas DataFrame for code that needs one.
+
+        Args:
+            columns (list): Columns to include (defaults to all).
+            dtype: Value dtype of the result; None keeps each column's stored dtype.
+
+        Returns:
+            pd.DataFrame: Bars indexed by timestamp.
+        """
+        columns = self.columns if columns is None else columns
+        values = {c: np.array(self[c], dtype=dtype) for c in columns}
+        return pd.DataFrame(values, index=self.index.copy(), columns=columns)
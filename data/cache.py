@@ -0,0 +1,92 @@
+import threading
+import pandas as pd
+import cachetools
+from data.barframe import BarFrame
+from data.store import interval_to_timedelta, to_naive
+
+
+def snap_range(start_date, end_date, interval="1d"):
+    """
+    Snap a requested date range to bar boundaries.
+
+    Daily requests start on the first weekday at or after ``start_date`` and end
+    at the midnight after ``end_date``, so every ``datetime.now()``-derived
+    request made on the same day maps to the same range. Intraday requests are
+    floored/ceiled to the bar length.
+
+    Args:
+        start_date (datetime): Start date.
+        end_date (datetime): End date.
+        interval (str): Data interval (e.g., "1d").
+
+    Returns:
+        tuple: (start, end) as timezone-naive pandas Timestamps, end exclusive.
+    """
+    start = to_naive(start_date)
+    end = to_naive(end_date)
+    step = interval_to_timedelta(interval)
+    if step >= pd.Timedelta(days=1):
+        start = start.normalize()
+        while start.weekday() >= 5:  # Saturday/Sunday have no bars
+            start += pd.Timedelta(days=1)
+        end = end.normalize() + pd.Timedelta(days=1)
+    else:
+        start = start.floor(step)
+        end = end.ceil(step)
+    return start, end
+
+
+class RangeCache:
+    """
+    In-memory cache of bar frames keyed by (ticker, interval) and date range.
+
+    Each entry holds the widest range loaded so far for a ticker/interval, so a
+    narrower request (e.g. 3 months after 12 months) is served by slicing the
+    cached frame instead of going back to the store or the provider. Entries
+    are read-only ``BarFrame``s and hits are views of them, never copies.
+    """
+
+    def __init__(self, maxsize=32, ttl=900):
+        self._entries = cachetools.TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, ticker, interval, start, end):
+        """Return the cached bars for [start, end) or None on a miss."""
+        with self._lock:
+            entry = self._entries.get((ticker.upper(), interval))
+            if entry is None or start < entry[0] or end > entry[1]:
+                self.misses += 1
+                return None
+            self.hits += 1
+            bars = entry[2]
+        return bars.between(start, end)
+
+    def put(self, ticker, interval, start, end, bars):
+        """Store a BarFrame for [start, end), merging with an overlapping cached range."""
+        key = (ticker.upper(), interval)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and start <= entry[1] and end >= entry[0]:
+                merged = pd.concat([entry[2].to_frame(dtype=None), bars.to_frame(dtype=None)])
+                bars = BarFrame.from_frame(merged[~merged.index.duplicated(keep="last")].sort_index())
+                start, end = min(start, entry[0]), max(end, entry[1])
+            self._entries[key] = (start, end, bars)
+
+    def clear(self):
+        """Drop all entries and reset the hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict: Hits, misses and the number of cached ticker/interval entries.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
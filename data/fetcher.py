@@ -1,60 +1,262 @@
-import yfinance as yf
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from ta.momentum import RSIIndicator
-from ta.trend import MACD
 from datetime import datetime, timedelta
-import cachetools
+from config.settings import DATA_PROVIDER, DATA_STORE_DIR, FETCH_BACKOFF, FETCH_MAX_WORKERS, FETCH_RETRIES
+from data.barframe import BAR_COLUMNS, BarFrame
+from data.store import BarStore
+from data.cache import RangeCache, snap_range
+from data.providers import make_provider
+from utils.instrumentation import span, timed
 
-# Cache to avoid repeated downloads
-@cachetools.cached(cache=cachetools.LRUCache(maxsize=10))
-def fetch_historical_data(ticker, start_date, end_date, interval="1d", context=None):
+# Source of raw bars (see data.providers)
+_provider = make_provider(DATA_PROVIDER)
+# Persistent bar store, only ranges not on disk yet are downloaded
+_store = BarStore(os.path.join(DATA_STORE_DIR, _provider.name))
+# In-memory cache of compact BarFrames in front of the store, keyed on snapped date ranges
+_cache = RangeCache()
+# Bumped whenever the store is swapped or the cache cleared (see data_generation)
+_epoch = 0
+
+def _download(ticker, start_date, end_date, interval):
+    """Download raw OHLCV bars from the active provider."""
+    with span(f"provider.{_provider.name}"):
+        return _provider.history(ticker, start_date, end_date, interval)
+
+def get_provider():
+    """Return the active market-data provider."""
+    return _provider
+
+def set_provider(provider, store_dir=None):
     """
-    Fetch historical stock data with technical indicators.
+    Route all fetches through another market-data provider.
+    
+    Each provider gets its own bar store so bars from different sources are
+    never merged, and the in-memory cache is cleared.
     
+    Args:
+        provider: Provider instance (see data.providers).
+        store_dir (str): Bar store directory (defaults to a per-provider
+            directory under DATA_STORE_DIR).
+    
+    Returns:
+        The previously active provider.
+    """
+    global _provider, _store, _epoch
+    previous = _provider
+    _provider = provider
+    _store = BarStore(store_dir or os.path.join(DATA_STORE_DIR, provider.name))
+    _cache.clear()
+    _epoch += 1
+    return previous
+
+def fetch_cache_info():
+    """
+    Return hit/miss statistics of the in-memory range cache.
+
+    Returns:
+        dict: Hits, misses and number of cached ticker/interval entries.
+    """
+    return _cache.info()
+
+def clear_fetch_cache():
+    """Empty the in-memory range cache (the on-disk store is kept)."""
+    global _epoch
+    _cache.clear()
+    _epoch += 1
+
+def data_generation(ticker, interval="1d"):
+    """
+    Version of the bars served for a ticker and interval.
+
+    Changes whenever new bars are written to the store (or the provider or
+    cache is reset), so results derived from the bars can be cached under it.
+
+    Args:
+        ticker (str): Stock ticker.
+        interval (str): Data interval.
+
+    Returns:
+        tuple: Opaque, hashable generation.
+    """
+    return (_epoch, _store.generation(ticker, interval))
+
+def indicator_state(ticker, through, interval="1d"):
+    """
+    Running indicator state matching the stored bars up to ``through``.
+
+    Args:
+        ticker (str): Stock ticker.
+        through: Time of the last bar the state should include.
+        interval (str): Data interval.
+
+    Returns:
+        IndicatorState: See ``BarStore.indicator_state``; None when nothing is stored.
+    """
+    return _store.indicator_state(ticker, interval, through)
+
+@timed("fetch_bars")
+def fetch_bars(ticker, start_date, end_date, interval="1d", context=None):
+    """
+    Fetch bars with technical indicators as a shared, read-only BarFrame.
+
+    The result is a view of the frame held by the in-memory cache (float32
+    values, OHLCV and indicator columns only), so callers that only read the
+    bars share one copy instead of each holding its own DataFrame.
+
     Args:
         ticker (str): Stock ticker.
         start_date (datetime): Start date.
         end_date (datetime): End date.
         interval (str): Data interval (e.g., "1d").
-        context (str): Context for caching (e.g., "rl", "chart").
-    
+        context (str): Caller context (e.g., "rl", "chart"). Not part of the cache key.
+
     Returns:
-        pd.DataFrame: Data with price and indicators.
+        BarFrame: Bars without missing values; empty when nothing is available.
     """
     try:
-        # Fetch data from yfinance
-        stock = yf.Ticker(ticker)
-        data = stock.history(start=start_date, end=end_date, interval=interval)
-        if data.empty:
+        # Snap to bar boundaries so now()-derived ranges share cache entries
+        start, end = snap_range(start_date, end_date, interval)
+        bars = _cache.get(ticker, interval, start, end)
+        if bars is None:
+            # Load from the local store, fetching missing bars from the provider
+            # (the store also keeps the indicator columns up to date). MA20/MA50/
+            # RSI/MACD are maintained over the whole stored history, so only
+            # warm-up rows at its very start are NaN; those are dropped here.
+            bars = BarFrame.from_frame(_store.load(ticker, start, end, interval, _download))
+            if not bars.empty:
+                _cache.put(ticker, interval, start, end, bars)
+        if bars.empty:
             raise ValueError(f"No data available for {ticker}")
-        
-        # Compute moving averages
-        data['MA20'] = data['Close'].rolling(window=20).mean()
-        data['MA50'] = data['Close'].rolling(window=50).mean()
-        
-        # Compute RSI
-        rsi = RSIIndicator(data['Close'], window=14)
-        data['RSI'] = rsi.rsi()
-        
-        # Compute MACD
-        macd = MACD(data['Close'], window_slow=26, window_fast=12, window_sign=9)
-        data['MACD'] = macd.macd()
-        data['MACD_Signal'] = macd.macd_signal()
-        
-        # Handle NaN values
-        data = data.dropna()
-        
-        # Add context-specific handling if needed
-        if context == "rl":
-            pass  # Already normalized in environment.py
-        elif context == "chart":
-            pass  # Used as-is for plotting
-        
-        return data
-    
+        return bars
+
     except Exception as e:
         print(f"Error fetching data for {ticker}: {str(e)}")
+        return BarFrame.from_frame(pd.DataFrame())
+
+@timed("fetch_historical_data")
+def fetch_historical_data(ticker, start_date, end_date, interval="1d", context=None, exact=False):
+    """
+    Fetch historical stock data with technical indicators.
+    
+    Args:
+        ticker (str): Stock ticker.
+        start_date (datetime): Start date.
+        end_date (datetime): End date.
+        interval (str): Data interval (e.g., "1d").
+        context (str): Caller context (e.g., "rl", "chart"). Not part of the cache key.
+        exact (bool): Read the bars from the store instead of the in-memory
+            cache, for exports and other callers that need the provider's values.
+    
+    Returns:
+        pd.DataFrame: Data with price and indicators as a private float64 copy.
+        By default it is made from the cached ``fetch_bars`` frame, so prices
+        and indicators are rounded to float32 (about seven significant
+        digits); volumes are exact either way.
+    """
+    if exact:
+        try:
+            start, end = snap_range(start_date, end_date, interval)
+            data = _store.load(ticker, start, end, interval, _download)
+            data = data[[c for c in BAR_COLUMNS if c in data]].dropna().astype("float64")
+            if data.empty:
+                raise ValueError(f"No data available for {ticker}")
+            return data
+        except Exception as e:
+            print(f"Error fetching data for {ticker}: {str(e)}")
+            return pd.DataFrame()
+    bars = fetch_bars(ticker, start_date, end_date, interval=interval, context=context)
+    if bars.empty:
         return pd.DataFrame()
+    return bars.to_frame()
+
+def _fetch_with_retry(fetch_func, ticker, start_date, end_date, interval, context, retries, backoff):
+    """Call ``fetch_func`` until it returns bars, sleeping backoff * 2**attempt between tries."""
+    for attempt in range(retries + 1):
+        try:
+            data = fetch_func(ticker, start_date, end_date, interval=interval, context=context)
+        except Exception as e:
+            print(f"Error fetching data for {ticker} (attempt {attempt + 1}): {str(e)}")
+            data = pd.DataFrame()
+        if not data.empty:
+            return data
+        if attempt < retries:
+            time.sleep(backoff * 2 ** attempt)
+    return data
+
+@timed("fetch_many")
+def fetch_many(tickers, start_date, end_date, interval="1d", context=None, max_workers=FETCH_MAX_WORKERS,
+               retries=FETCH_RETRIES, backoff=FETCH_BACKOFF, fetch_func=None):
+    """
+    Fetch several tickers concurrently and align them into one panel.
+    
+    At most ``max_workers`` tickers are loaded at a time; a ticker that comes
+    back empty is retried with exponential backoff before being left out.
+    
+    Args:
+        tickers (list): Stock tickers.
+        start_date (datetime): Start date.
+        end_date (datetime): End date.
+        interval (str): Data interval (e.g., "1d").
+        context (str): Caller context passed to the fetch function.
+        max_workers (int): Concurrent fetches.
+        retries (int): Extra attempts per ticker after an empty result.
+        backoff (float): Seconds before the first retry, doubled each time.
+        fetch_func: Function with the signature of ``fetch_historical_data``
+            (the default), e.g. a fake in tests.
+    
+    Returns:
+        pd.DataFrame: Columns are a (ticker, field) MultiIndex over the union
+        of all tickers' timestamps; tickers without data are omitted.
+    """
+    frames = _fetch_all(fetch_func or fetch_historical_data, tickers, start_date, end_date, interval, context,
+                        max_workers, retries, backoff)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=1, names=["Ticker", "Field"]).sort_index()
+
+@timed("fetch_many_bars")
+def fetch_many_bars(tickers, start_date, end_date, interval="1d", context=None, max_workers=FETCH_MAX_WORKERS,
+                    retries=FETCH_RETRIES, backoff=FETCH_BACKOFF):
+    """
+    Fetch several tickers concurrently as shared BarFrames (see ``fetch_bars``).
+
+    Unlike ``fetch_many`` nothing is aligned or copied: each ticker keeps its
+    own timestamps and its frame is a view of the cached bars.
+
+    Args:
+        tickers (list): Stock tickers.
+        start_date (datetime): Start date.
+        end_date (datetime): End date.
+        interval (str): Data interval (e.g., "1d").
+        context (str): Caller context.
+        max_workers (int): Concurrent fetches.
+        retries (int): Extra attempts per ticker after an empty result.
+        backoff (float): Seconds before the first retry, doubled each time.
+
+    Returns:
+        dict: Ticker -> BarFrame, in request order; tickers without data are omitted.
+    """
+    return _fetch_all(fetch_bars, tickers, start_date, end_date, interval, context, max_workers, retries, backoff)
+
+def _fetch_all(fetch_func, tickers, start_date, end_date, interval, context, max_workers, retries, backoff):
+    """Run ``fetch_func`` for every ticker on a bounded pool; returns ticker -> non-empty result."""
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as pool:
+        futures = [
+            pool.submit(_fetch_with_retry, fetch_func, ticker, start_date, end_date, interval, context, retries, backoff)
+            for ticker in tickers
+        ]
+        frames = {ticker: future.result() for ticker, future in zip(tickers, futures)}
+
+    frames = {ticker: data for ticker, data in frames.items() if not data.empty}
+    missing = [ticker for ticker in tickers if ticker not in frames]
+    if missing:
+        print(f"No data available for {', '.join(missing)}")
+    return frames
 
 # Example usage (for testing)
 if __name__ == "__main__":
@@ -0,0 +1,202 @@
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+from ta.momentum import RSIIndicator
+from ta.trend import MACD
+
+# Indicator columns maintained for every bar series
+INDICATOR_COLUMNS = ['MA20', 'MA50', 'RSI', 'MACD', 'MACD_Signal']
+
+MA_FAST, MA_SLOW = 20, 50
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+
+
+def add_indicators(data):
+    """
+    Compute all indicator columns over the full frame in one vectorized pass.
+
+    Args:
+        data (pd.DataFrame): Bars with a 'Close' column. Modified in place.
+
+    Returns:
+        pd.DataFrame: The same frame with MA20, MA50, RSI, MACD and MACD_Signal.
+    """
+    close = data['Close']
+    data['MA20'] = close.rolling(window=MA_FAST).mean()
+    data['MA50'] = close.rolling(window=MA_SLOW).mean()
+    data['RSI'] = RSIIndicator(close, window=RSI_WINDOW).rsi()
+    macd = MACD(close, window_slow=MACD_SLOW, window_fast=MACD_FAST, window_sign=MACD_SIGNAL)
+    data['MACD'] = macd.macd()
+    data['MACD_Signal'] = macd.macd_signal()
+    return data
+
+
+class IndicatorState:
+    """
+    Running state for MA20/MA50/RSI/MACD of one bar series.
+
+    Holds the rolling sums and EMA states so that each new bar is an O(1)
+    update producing the same values as ``add_indicators`` over the whole
+    history. The state can be serialized with ``to_dict`` and resumed later.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.window = deque(maxlen=MA_SLOW)
+        self.sum_fast = 0.0
+        self.sum_slow = 0.0
+        self.prev_close = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.ema_fast = None
+        self.ema_slow = None
+        self.ema_signal = None
+        self.signal_count = 0
+
+    def update(self, close):
+        """
+        Advance the state by one bar.
+
+        Args:
+            close (float): Close price of the new bar.
+
+        Returns:
+            tuple: (MA20, MA50, RSI, MACD, MACD_Signal), NaN while warming up.
+        """
+        close = float(close)
+        self.count += 1
+
+        # Moving averages: add the new close, drop the one leaving each window
+        if len(self.window) >= MA_FAST:
+            self.sum_fast -= self.window[-MA_FAST]
+        if len(self.window) == MA_SLOW:
+            self.sum_slow -= self.window[0]
+        self.window.append(close)
+        self.sum_fast += close
+        self.sum_slow += close
+        ma_fast = self.sum_fast / MA_FAST if self.count >= MA_FAST else math.nan
+        ma_slow = self.sum_slow / MA_SLOW if self.count >= MA_SLOW else math.nan
+
+        # RSI with Wilder smoothing (first bar has no change, like ta)
+        diff = 0.0 if self.prev_close is None else close - self.prev_close
+        gain, loss = max(diff, 0.0), max(-diff, 0.0)
+        if self.prev_close is None:
+            self.avg_gain, self.avg_loss = gain, loss
+        else:
+            alpha = 1.0 / RSI_WINDOW
+            self.avg_gain += alpha * (gain - self.avg_gain)
+            self.avg_loss += alpha * (loss - self.avg_loss)
+        self.prev_close = close
+        if self.count < RSI_WINDOW:
+            rsi = math.nan
+        elif self.avg_loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+        # MACD: fast/slow EMAs of close, signal EMA of MACD once it is defined
+        self.ema_fast = close if self.ema_fast is None else self.ema_fast + 2.0 / (MACD_FAST + 1) * (close - self.ema_fast)
+        self.ema_slow = close if self.ema_slow is None else self.ema_slow + 2.0 / (MACD_SLOW + 1) * (close - self.ema_slow)
+        macd = signal = math.nan
+        if self.count >= MACD_SLOW:
+            macd = self.ema_fast - self.ema_slow
+            if self.ema_signal is None:
+                self.ema_signal = macd
+            else:
+                self.ema_signal += 2.0 / (MACD_SIGNAL + 1) * (macd - self.ema_signal)
+            self.signal_count += 1
+            if self.signal_count >= MACD_SIGNAL:
+                signal = self.ema_signal
+
+        return ma_fast, ma_slow, rsi, macd, signal
+
+    @classmethod
+    def from_closes(cls, closes):
+        """
+        Build the state reached after a full history of closes (vectorized).
+
+        Args:
+            closes (array-like): Close prices, oldest first.
+
+        Returns:
+            IndicatorState: State ready to ``update`` with the next bar.
+        """
+        state = cls()
+        closes = pd.Series(np.asarray(closes, dtype=float))
+        n = len(closes)
+        if n == 0:
+            return state
+        state.count = n
+        state.window.extend(closes.iloc[-MA_SLOW:].tolist())
+        state.sum_fast = float(closes.iloc[-MA_FAST:].sum())
+        state.sum_slow = float(closes.iloc[-MA_SLOW:].sum())
+        state.prev_close = float(closes.iloc[-1])
+
+        diff = closes.diff().fillna(0.0)
+        alpha = 1.0 / RSI_WINDOW
+        state.avg_gain = float(diff.clip(lower=0).ewm(alpha=alpha, adjust=False).mean().iloc[-1])
+        state.avg_loss = float((-diff).clip(lower=0).ewm(alpha=alpha, adjust=False).mean().iloc[-1])
+
+        ema_fast = closes.ewm(span=MACD_FAST, adjust=False).mean()
+        ema_slow = closes.ewm(span=MACD_SLOW, adjust=False).mean()
+        state.ema_fast = float(ema_fast.iloc[-1])
+        state.ema_slow = float(ema_slow.iloc[-1])
+        if n >= MACD_SLOW:
+            macd = (ema_fast - ema_slow).iloc[MACD_SLOW - 1:]
+            state.ema_signal = float(macd.ewm(span=MACD_SIGNAL, adjust=False).mean().iloc[-1])
+            state.signal_count = len(macd)
+        return state
+
+    def to_dict(self):
+        """Serialize the state to a JSON-compatible dict."""
+        return {
+            'count': self.count,
+            'window': list(self.window),
+            'sum_fast': self.sum_fast,
+            'sum_slow': self.sum_slow,
+            'prev_close': self.prev_close,
+            'avg_gain': self.avg_gain,
+            'avg_loss': self.avg_loss,
+            'ema_fast': self.ema_fast,
+            'ema_slow': self.ema_slow,
+            'ema_signal': self.ema_signal,
+            'signal_count': self.signal_count,
+        }
+
+    @classmethod
+    def from_dict(cls, values):
+        """Restore a state produced by ``to_dict``."""
+        state = cls()
+        for key, value in values.items():
+            if key == 'window':
+                state.window.extend(value)
+            else:
+                setattr(state, key, value)
+        return state
+
+
+def update_indicators(data, state, start):
+    """
+    Fill indicator columns for ``data.iloc[start:]`` by resuming ``state``.
+
+    Args:
+        data (pd.DataFrame): Bars with a 'Close' column; rows before ``start``
+            must already carry indicator values.
+        state (IndicatorState): State after row ``start - 1``. Advanced in place.
+        start (int): First row to update.
+
+    Returns:
+        pd.DataFrame: The frame with indicator columns filled.
+    """
+    closes = data['Close'].to_numpy(dtype=float)
+    values = np.full((len(data), len(INDICATOR_COLUMNS)), np.nan)
+    for column, name in enumerate(INDICATOR_COLUMNS):
+        if name in data:
+            values[:start, column] = data[name].to_numpy(dtype=float)[:start]
+    for i in range(start, len(data)):
+        values[i] = state.update(closes[i])
+    for column, name in enumerate(INDICATOR_COLUMNS):
+        data[name] = values[:, column]
+    return data
@@ -0,0 +1,221 @@
+import threading
+import time
+from datetime import datetime
+from functools import partial
+import pandas as pd
+from config.settings import (LIVE_HISTORY_DAYS, LIVE_INTERVAL, LIVE_MAX_BARS, LIVE_POLL_SECONDS, LIVE_REPLAY_SPEED,
+                             LIVE_REPLAY_START)
+from data import fetcher
+from data.indicators import INDICATOR_COLUMNS, IndicatorState, update_indicators
+from data.providers import OHLCV_COLUMNS
+from data.store import interval_to_timedelta, localize_like, to_naive
+from utils.instrumentation import span
+
+
+class ReplayClock:
+    """
+    Simulated wall clock for replaying a past session as if it were live.
+
+    Starts at ``start`` and runs ``speed`` times faster than real time, so with
+    the replay or synthetic provider the live view walks through recorded bars.
+    """
+
+    def __init__(self, start, speed=1.0):
+        self.start = to_naive(start)
+        self.speed = speed
+        self._origin = time.monotonic()
+
+    def __call__(self):
+        return self.start + pd.Timedelta(seconds=(time.monotonic() - self._origin) * self.speed)
+
+
+def make_clock():
+    """Wall clock, or a ReplayClock when LIVE_REPLAY_START is set."""
+    if LIVE_REPLAY_START:
+        return ReplayClock(LIVE_REPLAY_START, LIVE_REPLAY_SPEED)
+    return datetime.now
+
+
+def completed_bars(bars, now, step):
+    """Bars that have closed by ``now`` (the bar still forming is left out)."""
+    if bars.empty:
+        return bars
+    return bars[bars.index + step <= localize_like(to_naive(now), bars.index)]
+
+
+class LiveSeries:
+    """
+    In-memory bars of one ticker, extended as new bars complete.
+
+    Indicator columns of appended bars come from a running ``IndicatorState``,
+    so each new bar costs O(1) instead of recomputing the window. Only the
+    last ``max_bars`` bars are kept.
+    """
+
+    def __init__(self, ticker, interval=LIVE_INTERVAL, max_bars=LIVE_MAX_BARS):
+        self.ticker = ticker
+        self.interval = interval
+        self.step = interval_to_timedelta(interval)
+        self.max_bars = max_bars
+        self.data = None
+        self.state = IndicatorState()
+        self.last_poll = None
+        self.lock = threading.Lock()
+
+    @property
+    def last_timestamp(self):
+        """Timestamp of the newest bar, or None before any bars arrived."""
+        if self.data is None or self.data.empty:
+            return None
+        return self.data.index[-1]
+
+    def seed(self, history, state=None):
+        """
+        Start from a block of historical bars that already carry indicators.
+
+        Args:
+            history (pd.DataFrame): Bars with OHLCV and indicator columns.
+            state (IndicatorState): Indicator state after the last bar of
+                ``history`` over the full history its indicator columns were
+                computed on. Rebuilt from ``history`` alone when None, in which
+                case MA50/RSI/MACD only match it if ``history`` is long enough.
+        """
+        columns = [c for c in OHLCV_COLUMNS + INDICATOR_COLUMNS if c in history]
+        self.data = history[columns].iloc[-self.max_bars:].copy()
+        self.state = state if state is not None else IndicatorState.from_closes(history['Close'])
+
+    def append(self, bars):
+        """
+        Append bars newer than the last one held.
+
+        Args:
+            bars (pd.DataFrame): OHLCV bars (older or duplicate bars are ignored).
+
+        Returns:
+            pd.DataFrame: The appended bars with indicator columns.
+        """
+        last = self.last_timestamp
+        if last is not None:
+            bars = bars[bars.index > last]
+        if bars.empty:
+            return bars
+        new = update_indicators(bars[OHLCV_COLUMNS].astype(float), self.state, 0)
+        self.data = new if self.data is None else pd.concat([self.data, new]).iloc[-self.max_bars:]
+        return new
+
+    def since(self, cursor=None):
+        """
+        Bars after ``cursor``.
+
+        Args:
+            cursor (str): Timestamp of the last bar a client has (None for all).
+
+        Returns:
+            pd.DataFrame: Newer bars.
+        """
+        if self.data is None or cursor is None:
+            return self.data if self.data is not None else pd.DataFrame()
+        return self.data[self.data.index > localize_like(to_naive(cursor), self.data.index)]
+
+
+class LiveHub:
+    """
+    Live series shared by every dashboard session.
+
+    Each ticker is seeded once from the fetcher (bar store + range cache) and
+    then extended by asking the provider only for bars after the newest one
+    held. Polls are throttled per ticker, so any number of browser sessions
+    following the same tickers cost one provider request per ``poll_seconds``.
+    """
+
+    def __init__(self, interval=LIVE_INTERVAL, clock=None, poll_seconds=LIVE_POLL_SECONDS,
+                 history_days=LIVE_HISTORY_DAYS, max_bars=LIVE_MAX_BARS, load_history=None, download=None,
+                 load_state=None):
+        """
+        Args:
+            interval (str): Bar interval (e.g. "1m").
+            clock (callable): Returns the current (possibly simulated) time.
+            poll_seconds (float): Minimum real time between provider polls per ticker.
+            history_days (int): History loaded when a ticker is first followed.
+            max_bars (int): Bars kept per ticker.
+            load_history (callable): (ticker, start, end, interval) -> bars with
+                indicators; defaults to the exact bars of ``fetcher.fetch_historical_data``.
+            download (callable): (ticker, start, end, interval) -> raw bars;
+                defaults to the fetcher's active provider.
+            load_state (callable): (ticker, through, interval) -> IndicatorState
+                continuing the history's indicators (or None); defaults to
+                ``fetcher.indicator_state``, the bar store's checkpoint.
+        """
+        self.interval = interval
+        self.step = interval_to_timedelta(interval)
+        self.clock = clock or make_clock()
+        self.poll_seconds = poll_seconds
+        self.history_days = history_days
+        self.max_bars = max_bars
+        self._load_history = load_history or partial(fetcher.fetch_historical_data, exact=True)
+        self._download = download or (lambda *args: fetcher.get_provider().history(*args))
+        self._load_state = load_state or fetcher.indicator_state
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def series(self, ticker):
+        """The (possibly not yet seeded) LiveSeries of ``ticker``."""
+        with self._lock:
+            series = self._series.get(ticker)
+            if series is None:
+                series = self._series[ticker] = LiveSeries(ticker, self.interval, self.max_bars)
+            return series
+
+    def tickers(self):
+        """Tickers followed so far."""
+        with self._lock:
+            return list(self._series)
+
+    def poll(self, ticker, force=False):
+        """
+        Bring a ticker up to date with the provider.
+
+        Args:
+            ticker (str): Stock ticker.
+            force (bool): Ignore the poll throttle.
+
+        Returns:
+            LiveSeries: The updated series.
+        """
+        series = self.series(ticker)
+        with series.lock:
+            if not force and series.last_poll is not None and time.monotonic() - series.last_poll < self.poll_seconds:
+                return series
+            series.last_poll = time.monotonic()
+            now = to_naive(self.clock())
+            last = series.last_timestamp
+            try:
+                with span("live.poll"):
+                    if last is None:
+                        history = self._load_history(ticker, now - pd.Timedelta(days=self.history_days), now,
+                                                     self.interval)
+                        history = completed_bars(history, now, self.step)
+                        if not history.empty:
+                            # Continue the stored indicators instead of restarting them on this window
+                            series.seed(history, self._load_state(ticker, history.index[-1], self.interval))
+                    else:
+                        bars = self._download(ticker, to_naive(last) + self.step, now + self.step, self.interval)
+                        series.append(completed_bars(bars, now, self.step))
+            except Exception as e:
+                print(f"Live: error polling {ticker}: {str(e)}")
+        return series
+
+    def updates(self, ticker, cursor=None):
+        """
+        Poll ``ticker`` and return the bars a client holding ``cursor`` is missing.
+
+        Args:
+            ticker (str): Stock ticker.
+            cursor (str): Timestamp of the client's newest bar.
+
+        Returns:
+            pd.DataFrame: Bars after ``cursor``.
+        """
+        series = self.poll(ticker)
+        with series.lock:
+            return series.since(cursor)
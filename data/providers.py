@@ -0,0 +1,251 @@
+import os
+import threading
+import zlib
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from config.settings import REPLAY_DATA_DIR
+from data.store import interval_to_timedelta, localize_like, to_naive
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Regular US session, used to lay out synthetic intraday bars
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+SESSION_LENGTH = pd.Timedelta(hours=6, minutes=30)
+TRADING_DAYS = 252
+
+
+def _empty_bars(tz):
+    return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], tz=tz), dtype=np.float64)
+
+
+class YFinanceProvider:
+    """Bars downloaded from Yahoo Finance through yfinance."""
+
+    name = "yfinance"
+
+    def history(self, ticker, start_date, end_date, interval="1d"):
+        """
+        Download raw OHLCV bars.
+
+        Args:
+            ticker (str): Stock ticker.
+            start_date (datetime): Start date.
+            end_date (datetime): End date (exclusive).
+            interval (str): Data interval (e.g., "1d").
+
+        Returns:
+            pd.DataFrame: OHLCV bars indexed by timestamp.
+        """
+        stock = yf.Ticker(ticker)
+        return stock.history(start=start_date, end=end_date, interval=interval)
+
+
+class ReplayProvider:
+    """
+    Bars replayed from local files.
+
+    Files live under ``{root}/{interval}/{TICKER}.parquet`` (or ``.csv`` with
+    the timestamp in the first column), e.g. captured earlier with ``record``.
+    Requests are answered by slicing the file, so no network is needed.
+    """
+
+    name = "replay"
+
+    def __init__(self, root=REPLAY_DATA_DIR, tz="America/New_York"):
+        """
+        Args:
+            root (str): Directory holding the recorded bars.
+            tz (str): Timezone for CSV timestamps.
+        """
+        self.root = root
+        self.tz = tz
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def _path(self, ticker, interval, ext):
+        return os.path.join(self.root, interval, f"{ticker.upper()}{ext}")
+
+    def _read(self, ticker, interval):
+        for ext in (".parquet", ".csv"):
+            path = self._path(ticker, interval, ext)
+            if os.path.exists(path):
+                break
+        else:
+            return None
+        # Keep parsed files in memory until they change on disk
+        key = (path, os.stat(path).st_mtime_ns)
+        with self._lock:
+            data = self._files.get(path)
+            if data is not None and data[0] == key:
+                return data[1]
+        if ext == ".parquet":
+            data = pd.read_parquet(path)
+        else:
+            data = pd.read_csv(path, index_col=0)
+            data.index = pd.to_datetime(data.index, utc=True).tz_convert(self.tz)
+        data = data.sort_index()
+        with self._lock:
+            self._files[path] = (key, data)
+        return data
+
+    def history(self, ticker, start_date, end_date, interval="1d"):
+        """
+        Recorded bars in [start_date, end_date).
+
+        Args:
+            ticker (str): Stock ticker.
+            start_date (datetime): Start date.
+            end_date (datetime): End date (exclusive).
+            interval (str): Data interval (e.g., "1d").
+
+        Returns:
+            pd.DataFrame: OHLCV bars, empty if nothing was recorded.
+        """
+        data = self._read(ticker, interval)
+        if data is None:
+            print(f"Replay: no recorded {interval} bars for {ticker} in {self.root}")
+            return _empty_bars(self.tz)
+        index = data.index
+        start = localize_like(to_naive(start_date), index)
+        end = localize_like(to_naive(end_date), index)
+        return data[(index >= start) & (index < end)]
+
+    def record(self, ticker, data, interval="1d"):
+        """
+        Save bars for later replay (e.g. a yfinance download).
+
+        Args:
+            ticker (str): Stock ticker.
+            data (pd.DataFrame): OHLCV bars indexed by timestamp.
+            interval (str): Data interval of the bars.
+
+        Returns:
+            str: Path of the written file.
+        """
+        path = self._path(ticker, interval, ".parquet")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data.to_parquet(path)
+        return path
+
+
+class SyntheticProvider:
+    """
+    Deterministic geometric Brownian motion bars, for network-free tests and benchmarks.
+
+    Every ticker gets its own seeded path on a business-day calendar starting
+    at ``origin``, so a bar's value depends only on its position and any two
+    requests agree on the bars they share (which the bar store relies on when
+    merging ranges). Intraday bars are a Brownian bridge between consecutive
+    daily closes, seeded per day, so they end on the daily close. Longer
+    windows simply mean more bars, which makes it easy to load-test the
+    pipeline at any data size.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, volatility=0.3, drift=0.05, start_price=100.0, seed=0, origin="2000-01-03",
+                 tz="America/New_York"):
+        """
+        Args:
+            volatility (float): Annualized volatility of log returns.
+            drift (float): Annualized drift.
+            start_price (float): Price before the first bar.
+            seed (int): Base seed; each ticker derives its own stream from it.
+            origin (str): First business day with bars.
+            tz (str): Timezone of the returned index.
+        """
+        self.volatility = volatility
+        self.drift = drift
+        self.start_price = start_price
+        self.seed = seed
+        self.origin = pd.Timestamp(origin).normalize()
+        self.tz = tz
+
+    def _rng(self, ticker, *stream):
+        return np.random.default_rng([self.seed, zlib.crc32(ticker.upper().encode()), *stream])
+
+    def _daily_path(self, ticker, count):
+        """Closes and per-bar noise for the first ``count`` business days."""
+        dt = 1 / TRADING_DAYS
+        z = self._rng(ticker, 0).standard_normal(count)
+        log_returns = (self.drift - 0.5 * self.volatility ** 2) * dt + self.volatility * np.sqrt(dt) * z
+        closes = self.start_price * np.exp(np.cumsum(log_returns))
+        opens = np.concatenate([[self.start_price], closes[:-1]])
+        return opens, closes, self._rng(ticker, 1).standard_normal((count, 3))
+
+    def _bars(self, index, opens, closes, noise, sigma, volume_scale):
+        wicks = np.abs(noise[:, :2]) * sigma * 0.5
+        return pd.DataFrame({
+            'Open': opens,
+            'High': np.maximum(opens, closes) * (1 + wicks[:, 0]),
+            'Low': np.minimum(opens, closes) * (1 - wicks[:, 1]),
+            'Close': closes,
+            'Volume': np.round(volume_scale * np.exp(0.3 * noise[:, 2])).astype(np.int64),
+        }, index=index)
+
+    def history(self, ticker, start_date, end_date, interval="1d"):
+        """
+        Generate bars in [start_date, end_date).
+
+        Args:
+            ticker (str): Stock ticker (selects the random stream).
+            start_date (datetime): Start date.
+            end_date (datetime): End date (exclusive).
+            interval (str): Data interval; daily and longer use one bar per business day.
+
+        Returns:
+            pd.DataFrame: OHLCV bars indexed by timestamp.
+        """
+        start, end = to_naive(start_date), to_naive(end_date)
+        days = pd.bdate_range(max(start.normalize(), self.origin), end.normalize())
+        if len(days) == 0:
+            return _empty_bars(self.tz)
+        positions = np.busday_count(self.origin.date(), days.values.astype("datetime64[D]"))
+        opens, closes, noise = self._daily_path(ticker, int(positions[-1]) + 1)
+        daily_sigma = self.volatility / np.sqrt(TRADING_DAYS)
+
+        step = interval_to_timedelta(interval)
+        if step >= pd.Timedelta(days=1):
+            bars = self._bars(days, opens[positions], closes[positions], noise[positions], daily_sigma, 1e6)
+        else:
+            n = int(np.ceil(SESSION_LENGTH / step))
+            offsets = SESSION_OPEN + step * np.arange(n)
+            k = np.arange(1, n + 1) / n
+            frames = []
+            for day, pos in zip(days, positions):
+                day_noise = self._rng(ticker, 2, int(step.total_seconds()), int(pos)).standard_normal((n, 3))
+                walk = np.cumsum(day_noise[:, 0]) * daily_sigma / np.sqrt(n)
+                log_open, log_close = np.log(opens[pos]), np.log(closes[pos])
+                bar_closes = np.exp(log_open + k * (log_close - log_open) + walk - k * walk[-1])
+                bar_opens = np.concatenate([[opens[pos]], bar_closes[:-1]])
+                frames.append(self._bars(day + offsets, bar_opens, bar_closes, day_noise, daily_sigma / np.sqrt(n),
+                                         1e6 / n))
+            bars = pd.concat(frames)
+
+        bars = bars[(bars.index >= start) & (bars.index < end)]
+        bars.index = bars.index.tz_localize(self.tz)
+        return bars
+
+
+PROVIDERS = {
+    YFinanceProvider.name: YFinanceProvider,
+    ReplayProvider.name: ReplayProvider,
+    SyntheticProvider.name: SyntheticProvider,
+}
+
+
+def make_provider(name, **kwargs):
+    """
+    Create a market-data provider by name.
+
+    Args:
+        name (str): "yfinance", "replay" or "synthetic".
+        **kwargs: Provider constructor arguments.
+
+    Returns:
+        Provider instance with a ``history(ticker, start_date, end_date, interval)`` method.
+    """
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown data provider: {name}")
+    return PROVIDERS[name](**kwargs)
@@ -0,0 +1,264 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from data.indicators import INDICATOR_COLUMNS, IndicatorState, add_indicators, update_indicators
+from utils.instrumentation import span
+
+# Empty downloads shorter than this are taken as weekends/holidays, longer ones as failures
+MIN_EMPTY_GAP = pd.Timedelta(days=4)
+
+
+class BarStore:
+    """
+    Persistent on-disk OHLCV store, one Parquet file per ticker and interval.
+
+    Bars are kept under ``{root}/{interval}/{TICKER}.parquet`` with a small JSON
+    sidecar recording the date range that has already been requested from the
+    provider. Queries inside that range are answered from disk; only the
+    missing head/tail of a request is downloaded and merged into the file.
+
+    Indicator columns are stored with the bars. The sidecar also persists the
+    ``IndicatorState`` as of the second-to-last bar, so appending new bars (and
+    replacing a partial last bar) only updates the tail instead of recomputing
+    the whole history.
+
+    Every write bumps a per ticker/interval generation counter, which lets
+    caches of derived results (e.g. rendered figures) notice new bars.
+
+    Loads of one ticker/interval are serialized so a gap is downloaded once;
+    different tickers download concurrently.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._generations = {}
+
+    def _key_lock(self, ticker, interval):
+        with self._lock:
+            return self._locks.setdefault((ticker.upper(), interval), threading.Lock())
+
+    def generation(self, ticker, interval):
+        """Number of writes of ``ticker``/``interval`` bars by this store."""
+        return self._generations.get((ticker.upper(), interval), 0)
+
+    def _paths(self, ticker, interval):
+        directory = os.path.join(self.root, interval)
+        name = ticker.upper()
+        return (os.path.join(directory, f"{name}.parquet"),
+                os.path.join(directory, f"{name}.json"))
+
+    def _read(self, ticker, interval):
+        data_path, meta_path = self._paths(ticker, interval)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None, None, None
+        try:
+            data = pd.read_parquet(data_path)
+            with open(meta_path) as f:
+                meta = json.load(f)
+            coverage = (pd.Timestamp(meta["start"]), pd.Timestamp(meta["end"]))
+            return data, coverage, meta.get("indicators")
+        except Exception as e:
+            print(f"Bar store: ignoring unreadable cache for {ticker} ({interval}): {str(e)}")
+            return None, None, None
+
+    def _write(self, ticker, interval, data, coverage, indicators):
+        data_path, meta_path = self._paths(ticker, interval)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        # Write to temp files first so a crash never leaves a half-written store
+        data.to_parquet(data_path + ".tmp")
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"start": coverage[0].isoformat(), "end": coverage[1].isoformat(),
+                       "indicators": indicators}, f)
+        os.replace(data_path + ".tmp", data_path)
+        os.replace(meta_path + ".tmp", meta_path)
+        key = (ticker.upper(), interval)
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def load(self, ticker, start_date, end_date, interval, download):
+        """
+        Return bars for [start_date, end_date), downloading only what is missing.
+
+        Args:
+            ticker (str): Stock ticker.
+            start_date (datetime): Start date (inclusive).
+            end_date (datetime): End date (exclusive).
+            interval (str): Data interval (e.g., "1d").
+            download: Callable ``(ticker, start, end, interval) -> pd.DataFrame``
+                used to fetch missing ranges from the provider.
+
+        Returns:
+            pd.DataFrame: OHLCV bars with indicator columns for the requested range.
+        """
+        start = to_naive(start_date)
+        # Never claim coverage for bars that cannot exist yet
+        end = min(to_naive(end_date), pd.Timestamp(datetime.now()))
+        if start >= end:
+            return pd.DataFrame()
+
+        with self._key_lock(ticker, interval):
+            data, coverage, indicators = self._read(ticker, interval)
+            # Download extra history before a new head so indicators are warm at ``start``
+            warmup = warmup_period(interval)
+            if coverage is None:
+                gaps = [(start - warmup, end)]
+            else:
+                gaps = []
+                if start < coverage[0]:
+                    gaps.append((start - warmup, coverage[0]))
+                if end > coverage[1]:
+                    # Re-download from the last stored bar so a partial bar (e.g. today's
+                    # daily bar fetched before the close) is replaced by the final one
+                    last_bar = to_naive(data.index[-1]) if not data.empty else coverage[1]
+                    gaps.append((min(coverage[1], last_bar), end))
+
+            stale = data is not None and not all(c in data for c in INDICATOR_COLUMNS)
+            if gaps or stale:
+                frames = [] if data is None else [data]
+                cov_start, cov_end = coverage if coverage is not None else (None, None)
+                resume = not stale
+                for gap_start, gap_end in gaps:
+                    try:
+                        fetched = download(ticker, gap_start, gap_end, interval)
+                    except Exception as e:
+                        # Serve what is on disk; the gap stays uncovered and is retried next time
+                        print(f"Bar store: download failed for {ticker} ({interval}): {str(e)}")
+                        continue
+                    if fetched.empty and gap_end - gap_start >= MIN_EMPTY_GAP:
+                        # Likely a provider failure, leave the gap uncovered so it is retried
+                        continue
+                    frames.append(fetched)
+                    if cov_start is not None and gap_start < cov_start:
+                        resume = False  # New head bars change every indicator after them
+                    cov_start = gap_start if cov_start is None else min(cov_start, gap_start)
+                    cov_end = gap_end if cov_end is None else max(cov_end, gap_end)
+
+                frames = [f for f in frames if not f.empty]
+                if cov_start is not None and frames:
+                    data = pd.concat(frames)
+                    data = data[~data.index.duplicated(keep="last")].sort_index()
+                    with span("store.indicators"):
+                        data, indicators = _refresh_indicators(data, indicators if resume else None)
+                    self._write(ticker, interval, data, (cov_start, cov_end), indicators)
+
+        if data is None or data.empty:
+            return pd.DataFrame()
+        index = data.index
+        return data[(index >= localize_like(start, index)) & (index < localize_like(end, index))]
+
+    def indicator_state(self, ticker, interval, through):
+        """
+        Indicator state after the last stored bar at or before ``through``.
+
+        The state continues the stored indicator columns, which run over the
+        whole stored history: the persisted checkpoint is resumed when it is
+        not newer than that bar, otherwise the state is rebuilt from every
+        stored close.
+
+        Args:
+            ticker (str): Stock ticker.
+            interval (str): Data interval.
+            through: Time of the last bar to include.
+
+        Returns:
+            IndicatorState: State ready to ``update`` with the next bar, or None
+            when no such bar is stored.
+        """
+        with self._key_lock(ticker, interval):
+            data, _, indicators = self._read(ticker, interval)
+        if data is None or data.empty:
+            return None
+        last = int(data.index.searchsorted(localize_like(to_naive(through), data.index), side="right"))
+        if last == 0:
+            return None
+        closes = data['Close'].to_numpy(dtype=float)[:last]
+        if indicators is not None:
+            stamps = data.index.as_unit("ns").asi8
+            position = int(np.searchsorted(stamps, indicators["as_of"]))
+            if position < last and stamps[position] == indicators["as_of"]:
+                state = IndicatorState.from_dict(indicators["state"])
+                for close in closes[position + 1:]:
+                    state.update(close)
+                return state
+        return IndicatorState.from_closes(closes)
+
+
+def _refresh_indicators(data, indicators):
+    """
+    Fill indicator columns, resuming from a persisted state when possible.
+
+    Args:
+        data (pd.DataFrame): Merged bars, sorted by time.
+        indicators (dict): Sidecar entry with the state as of ``as_of`` (UTC ns
+            of the bar it was taken after), or None to force a full recompute.
+
+    Returns:
+        tuple: (data, indicators entry for the new second-to-last bar).
+    """
+    closes = data['Close'].to_numpy(dtype=float)
+    stamps = data.index.as_unit("ns").asi8
+    position = -1
+    if indicators is not None:
+        position = int(np.searchsorted(stamps, indicators["as_of"]))
+        if position >= len(data) or stamps[position] != indicators["as_of"]:
+            position = -1
+
+    if position < 0:
+        add_indicators(data)
+        checkpoint = IndicatorState.from_closes(closes[:-1])
+    else:
+        # Only the bars after the checkpoint are computed, not the whole history
+        checkpoint = IndicatorState.from_dict(indicators["state"])
+        data = update_indicators(data, IndicatorState.from_dict(indicators["state"]), position + 1)
+        for close in closes[position + 1:-1]:
+            checkpoint.update(close)
+
+    if len(data) < 2:
+        return data, None
+    return data, {"as_of": int(stamps[-2]), "state": checkpoint.to_dict()}
+
+
+def interval_to_timedelta(interval):
+    """
+    Convert a yfinance interval string to a pandas Timedelta.
+
+    Args:
+        interval (str): Data interval (e.g., "1m", "1h", "1d", "1wk").
+
+    Returns:
+        pd.Timedelta: Length of one bar (one day for daily and longer intervals).
+    """
+    if interval.endswith("mo") or interval.endswith("wk") or interval.endswith("d"):
+        return pd.Timedelta(days=1)
+    if interval.endswith("m"):
+        return pd.Timedelta(minutes=int(interval[:-1]))
+    if interval.endswith("h"):
+        return pd.Timedelta(hours=int(interval[:-1]))
+    raise ValueError(f"Unsupported interval: {interval}")
+
+
+def warmup_period(interval):
+    """Extra history loaded before a new head so MA50/MACD are defined at the start."""
+    step = interval_to_timedelta(interval)
+    if step >= pd.Timedelta(days=1):
+        return pd.Timedelta(days=100)
+    # Intraday bars only cover market hours, so reach back across a weekend at least
+    return max(pd.Timedelta(days=4), step * 250)
+
+
+def to_naive(value):
+    """Convert a date-like value to a timezone-naive pandas Timestamp."""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize(None) if ts.tzinfo is not None else ts
+
+
+def localize_like(ts, index):
+    """Express a naive timestamp in the timezone of ``index`` for comparisons."""
+    tz = getattr(index, "tz", None)
+    return ts.tz_localize(tz) if tz is not None else ts
+
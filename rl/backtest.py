@@ -1,8 +1,15 @@
-import pandas as pd
 import numpy as np
 from data.fetcher import fetch_historical_data
 from datetime import datetime, timedelta
 from ta.momentum import RSIIndicator
+from rl.feature_store import open_feature_set
+from rl.metrics import compute_metrics, exposure_from_signals
+from utils.instrumentation import timed
+
+try:  # Optional: compile the trade loop when numba is available
+    from numba import njit
+except ImportError:
+    njit = None
 
 def rsi_strategy(data):
     """
@@ -14,14 +21,103 @@ def rsi_strategy(data):
     Returns:
         int: 1 (buy), 2 (sell), 0 (hold).
     """
-    rsi = RSIIndicator(data['Close']).rsi().iloc[-1]
+    # Use the precomputed column when present instead of rebuilding RSI per row
+    if 'RSI' in data:
+        rsi = data['RSI'].iloc[-1]
+    else:
+        rsi = RSIIndicator(data['Close']).rsi().iloc[-1]
     if rsi < 30:
         return 1  # Buy
     elif rsi > 70:
         return 2  # Sell
     return 0  # Hold
 
-def backtest_strategy(ticker, months, strategy_func):
+def rsi_signals(data, lower=30, upper=70):
+    """
+    Vectorized RSI strategy: one action per row from the precomputed RSI column.
+    
+    Args:
+        data: Stock data with an 'RSI' column (DataFrame, BarFrame or dict of arrays).
+        lower (float): Buy below this RSI.
+        upper (float): Sell above this RSI.
+    
+    Returns:
+        np.ndarray: Actions per row, 1 (buy), 2 (sell), 0 (hold).
+    """
+    rsi = np.asarray(data['RSI'], dtype=float)
+    signals = np.zeros(len(rsi), dtype=np.int8)
+    signals[rsi < lower] = 1
+    signals[rsi > upper] = 2
+    return signals
+
+def _apply_trades(prices, signals, initial_balance):
+    """
+    Run the all-in/all-out trade rules over the rows that carry a signal.
+    
+    Sizing depends on the cash left by earlier trades, so this part stays a
+    loop, but only over signal rows (and compiled with numba when installed).
+    
+    Returns:
+        tuple: Balance and shares held after each signal row.
+    """
+    balances = np.empty(len(signals))
+    shares = np.empty(len(signals))
+    balance = initial_balance
+    shares_held = 0.0
+    for i in range(len(signals)):
+        price = prices[i]
+        if signals[i] == 1:  # Buy
+            shares_to_buy = balance // price
+            balance -= shares_to_buy * price
+            shares_held += shares_to_buy
+        elif signals[i] == 2:  # Sell
+            balance += shares_held * price
+            shares_held = 0.0
+        balances[i] = balance
+        shares[i] = shares_held
+    return balances, shares
+
+if njit is not None:
+    _apply_trades = njit(cache=True)(_apply_trades)
+
+def simulate_signals(prices, signals, initial_balance=10000):
+    """
+    Simulate cash and position for a whole signal array.
+    
+    Args:
+        prices (array-like): Close price per row.
+        signals (array-like): Action per row, 1 (buy), 2 (sell), 0 (hold).
+        initial_balance (float): Starting cash.
+    
+    Returns:
+        np.ndarray: Net worth per row.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    signals = np.asarray(signals, dtype=np.int64)
+    active = np.flatnonzero(signals)
+    if len(active) == 0:
+        return np.full(len(prices), float(initial_balance))
+    balances, shares = _apply_trades(prices[active], signals[active], float(initial_balance))
+    # Carry the state of the last signal row forward to every row after it
+    last = np.cumsum(signals != 0) - 1
+    position = np.maximum(last, 0)
+    balance = np.where(last >= 0, balances[position], initial_balance)
+    held = np.where(last >= 0, shares[position], 0.0)
+    return balance + held * prices
+
+def summarize_backtest(net_worths, actions):
+    """Build the backtest result dict (metrics from rl.metrics) from net worths and actions."""
+    net_worths = list(net_worths)
+    result = compute_metrics(net_worths, exposure=exposure_from_signals(actions))
+    result.update({
+        'final_net_worth': net_worths[-1],
+        'net_worths': net_worths,
+        'actions': [int(a) for a in actions]
+    })
+    return result
+
+@timed("backtest_strategy")
+def backtest_strategy(ticker, months, strategy_func, vectorized=False):
     """
     Backtest a trading strategy.
     
@@ -29,9 +125,13 @@ def backtest_strategy(ticker, months, strategy_func):
         ticker (str): Stock ticker.
         months (int): Data range in months.
         strategy_func: Function mapping data to actions (buy, sell, hold).
+            Per-row strategies get the data up to the current row and return
+            one action; vectorized strategies (e.g. ``rsi_signals``) get the
+            whole frame once and return an array of actions.
+        vectorized (bool): Whether ``strategy_func`` is a vectorized strategy.
     
     Returns:
-        dict: Performance metrics.
+        dict: Performance metrics, net worths and actions.
     """
     end_date = datetime.now()
     start_date = end_date - timedelta(days=months * 30)
@@ -39,12 +139,19 @@ def backtest_strategy(ticker, months, strategy_func):
     if data.empty:
         return {"error": f"No data for {ticker}"}
     
+    if vectorized:
+        actions = np.asarray(strategy_func(data))
+        net_worths = simulate_signals(data['Close'].to_numpy(), actions, initial_balance=10000)
+        return summarize_backtest(net_worths.tolist(), actions)
+    
     balance = 10000
     shares_held = 0
     net_worths = []
+    actions = []
     
     for i in range(len(data)):
         action = strategy_func(data.iloc[:i+1])
+        actions.append(action)
         price = data['Close'].iloc[i]
         if action == 1:  # Buy
             shares_to_buy = balance // price
@@ -55,13 +162,26 @@ def backtest_strategy(ticker, months, strategy_func):
             shares_held = 0
         net_worths.append(balance + shares_held * price)
     
-    returns = pd.Series(net_worths).pct_change().dropna()
-    sharpe_ratio = np.mean(returns) / np.std(returns) * np.sqrt(252) if np.std(returns) > 0 else 0
-    max_drawdown = (max(net_worths) - min(net_worths)) / max(net_worths) if max(net_worths) > 0 else 0
-    
-    return {
-        'final_net_worth': net_worths[-1],
-        'sharpe_ratio': sharpe_ratio,
-        'max_drawdown': max_drawdown,
-        'net_worths': net_worths
-    }
\ No newline at end of file
+    return summarize_backtest(net_worths, actions)
+
+@timed("backtest_features")
+def backtest_features(features, ticker, lower=30, upper=70, initial_balance=10000):
+    """
+    RSI backtest over a memory-mapped feature set, without building a DataFrame.
+
+    Args:
+        features: FeatureSet from rl.feature_store, or its path.
+        ticker (str): Ticker in the set.
+        lower (float): Buy below this RSI.
+        upper (float): Sell above this RSI.
+        initial_balance (float): Starting cash.
+
+    Returns:
+        dict: Performance metrics, net worths and actions.
+    """
+    features = open_feature_set(features)
+    rows = features.rows(ticker)
+    # Raw float64 RSI: the float32 RSI/100 feature could flip a signal at a threshold
+    actions = rsi_signals({'RSI': features.rsi[rows]}, lower, upper)
+    net_worths = simulate_signals(features.prices[rows], actions, initial_balance=initial_balance)
+    return summarize_backtest(net_worths.tolist(), actions)
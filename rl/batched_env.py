@@ -0,0 +1,221 @@
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+from rl.environment import REWARD_WINDOW
+from rl.feature_store import FeatureSet
+from rl.features import (BALANCE_COL, MIN_ROWS, OBSERVATION_SIZE, SHARES_COL, build_feature_matrix,
+                         clean_frame, compute_scales)
+
+class BatchedTradingEnv(VecEnv):
+    """
+    B independent single-ticker portfolios stepped together as NumPy arrays.
+
+    Mirrors ``StockTradingEnv`` (same observations, trade rules and reward) but
+    keeps balance, shares held, net worth and step index as arrays of shape
+    (B,), so one ``step`` advances every portfolio without per-env Python
+    code. It is a Stable-Baselines3 ``VecEnv`` and can be passed to PPO/SAC
+    directly; finished episodes are reset automatically.
+    """
+
+    def __init__(self, datasets, n_envs, initial_balance=5000, continuous=False, random_start=False, seed=None,
+                 auto_reset=True, scales=None):
+        """
+        Args:
+            datasets (list): Price/indicator frames, one per ticker. Portfolio
+                ``i`` trades ``datasets[i % len(datasets)]``. A FeatureSet
+                (rl.feature_store) is used in place, memory-mapped, with one
+                series per ticker in the set.
+            n_envs (int): Number of portfolios B.
+            initial_balance (float): Starting cash of every portfolio.
+            continuous (bool): Continuous position actions (SAC) instead of hold/buy/sell.
+            random_start (bool): Start episodes at random steps.
+            seed (int): Seed for random starts.
+            auto_reset (bool): Reset finished portfolios automatically (training).
+                When False they stay on their last bar, which evaluation uses to
+                run series of different lengths in lockstep.
+            scales (list): Normalization scales (``compute_scales`` output) per
+                dataset, e.g. those of the training window when evaluating out
+                of sample. By default each dataset is scaled by its own range,
+                which for a test window uses its future prices. Frames only.
+        """
+        self.initial_balance = initial_balance
+        self.auto_reset = auto_reset
+        self.continuous = continuous
+        self.random_start = random_start
+        self.render_mode = None
+        self._rng = np.random.default_rng(seed)
+
+        if isinstance(datasets, FeatureSet):
+            # Already laid out as one array addressed by offset; read from the maps
+            entries = [datasets.entries[ticker] for ticker in datasets.tickers]
+            self._features, self._prices = datasets.features, datasets.prices
+            offsets = [entry['offset'] for entry in entries]
+            lengths = [entry['length'] for entry in entries]
+            shares_max = [datasets.scales(ticker, initial_balance)['shares_max'] for ticker in datasets.tickers]
+        else:
+            # Stack every ticker's feature matrix into one array addressed by offset
+            features, prices, offsets, lengths, shares_max = [], [], [], [], []
+            offset = 0
+            for i, data in enumerate(datasets):
+                data = clean_frame(data)
+                if len(data) < MIN_ROWS:
+                    raise ValueError(f"Insufficient valid data after cleaning: {len(data)} rows")
+                data_scales = compute_scales(data, initial_balance) if scales is None else scales[i]
+                features.append(build_feature_matrix(data, data_scales))
+                prices.append(np.asarray(data['Close'], dtype=np.float64))
+                offsets.append(offset)
+                lengths.append(len(data))
+                shares_max.append(data_scales['shares_max'])
+                offset += len(data)
+            self._features = np.concatenate(features)
+            self._prices = np.concatenate(prices)
+        pick = np.arange(n_envs) % len(offsets)
+        self._offsets = np.asarray(offsets)[pick]
+        self.max_steps = np.asarray(lengths)[pick] - 1
+        self.balance_max = initial_balance * 2
+        self.shares_max = np.asarray(shares_max, dtype=np.float64)[pick]
+
+        if continuous:
+            action_space = spaces.Box(low=-1, high=1, shape=(1,), dtype=np.float32)
+        else:
+            action_space = spaces.Discrete(3)
+        observation_space = spaces.Box(
+            low=np.array([0, 0, 0, 0, 0, 0, -1, -1]),
+            high=np.array([1, 1, 1, 1, 1, 1, 1, 1]),
+            shape=(OBSERVATION_SIZE,),
+            dtype=np.float32
+        )
+        super().__init__(n_envs, observation_space, action_space)
+
+        self.current_step = np.zeros(n_envs, dtype=np.int64)
+        self.balance = np.full(n_envs, float(initial_balance))
+        self.shares_held = np.zeros(n_envs)
+        self.net_worth = np.full(n_envs, float(initial_balance))
+        self._prev_net_worth = np.full(n_envs, float(initial_balance))
+        self._steps_taken = np.zeros(n_envs, dtype=np.int64)
+        self._returns = np.zeros((n_envs, REWARD_WINDOW - 1))
+        self._return_pos = np.zeros(n_envs, dtype=np.int64)
+        self._return_sum = np.zeros(n_envs)
+        self._return_sumsq = np.zeros(n_envs)
+        self._nonzero_returns = np.zeros(n_envs, dtype=np.int64)
+        self._actions = None
+        self.rewards = np.zeros(n_envs)  # Last rewards in float64 (step returns float32 for SB3)
+
+    def _reset_envs(self, mask):
+        """Reset the portfolios selected by the boolean ``mask``."""
+        if self.random_start:
+            high = np.maximum(1, self.max_steps[mask] - REWARD_WINDOW)
+            self.current_step[mask] = self._rng.integers(0, high)
+        else:
+            self.current_step[mask] = 0
+        self.balance[mask] = self.initial_balance
+        self.shares_held[mask] = 0.0
+        self.net_worth[mask] = self.initial_balance
+        self._prev_net_worth[mask] = self.initial_balance
+        self._steps_taken[mask] = 0
+        self._returns[mask] = 0.0
+        self._return_pos[mask] = 0
+        self._return_sum[mask] = 0.0
+        self._return_sumsq[mask] = 0.0
+        self._nonzero_returns[mask] = 0
+
+    def _observations(self):
+        obs = self._features[self._offsets + self.current_step]
+        obs[:, BALANCE_COL] = self.balance / self.balance_max
+        obs[:, SHARES_COL] = self.shares_held / self.shares_max
+        return obs
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self._rng = np.random.default_rng(self._seeds[0])
+            self._seeds = [None] * self.num_envs
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._observations()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions)
+
+    def step_wait(self):
+        price = self._prices[self._offsets + self.current_step]
+
+        # Execute actions for every portfolio at once
+        if self.continuous:
+            position = self._actions.reshape(self.num_envs, -1)[:, 0].astype(np.float64)
+            target_shares = (self.balance / price) * position
+            shares_diff = target_shares - self.shares_held
+            to_buy = np.where(shares_diff > 0, np.minimum(shares_diff, self.balance // price), 0.0)
+            to_sell = np.where(shares_diff < 0, np.minimum(-shares_diff, self.shares_held), 0.0)
+            self.balance += to_sell * price - to_buy * price
+            self.shares_held += to_buy - to_sell
+        else:
+            actions = self._actions.reshape(self.num_envs)
+            buy = actions == 1
+            sell = actions == 2
+            to_buy = np.where(buy, self.balance // price, 0.0)
+            self.balance -= to_buy * price
+            self.shares_held += to_buy
+            self.balance[sell] += self.shares_held[sell] * price[sell]
+            self.shares_held[sell] = 0.0
+
+        self.net_worth = self.balance + self.shares_held * price
+        self._steps_taken += 1
+        self._push_returns(self._steps_taken > 1)
+
+        # Reward: Sharpe ratio over the last REWARD_WINDOW net worths or scaled net worth change
+        count = self._returns.shape[1]
+        mean = self._return_sum / count
+        variance = self._return_sumsq / count - mean * mean
+        valid = (self._nonzero_returns > 0) & (variance > 0)
+        sharpe = np.where(valid, mean / np.sqrt(np.where(valid, variance, 1.0)) * np.sqrt(252), 0.0)
+        change = np.where(self._steps_taken == 1, 0.0, self.net_worth - self._prev_net_worth)
+        rewards = np.where(self._steps_taken > REWARD_WINDOW, sharpe, change / self.initial_balance * 100)
+        self._prev_net_worth = self.net_worth.copy()
+        self.rewards = rewards
+
+        self.current_step = np.minimum(self.current_step + 1, self.max_steps)
+        dones = self.current_step >= self.max_steps
+        obs = self._observations()
+        infos = [{} for _ in range(self.num_envs)]
+        if dones.any() and self.auto_reset:
+            for i in np.flatnonzero(dones):
+                infos[i] = {"terminal_observation": obs[i].copy(), "TimeLimit.truncated": False}
+            self._reset_envs(dones)
+            obs[dones] = self._observations()[dones]
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def _push_returns(self, mask):
+        """Append the latest return to each selected portfolio's ring buffer."""
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return
+        value = self.net_worth[rows] / self._prev_net_worth[rows] - 1
+        pos = self._return_pos[rows]
+        old = self._returns[rows, pos]
+        self._returns[rows, pos] = value
+        self._nonzero_returns[rows] += (value != 0).astype(np.int64) - (old != 0)
+        self._return_sum[rows] += value - old
+        self._return_sumsq[rows] += value * value - old * old
+        pos = (pos + 1) % self._returns.shape[1]
+        self._return_pos[rows] = pos
+        # Resync once per lap so floating-point drift cannot accumulate
+        lap = rows[pos == 0]
+        if len(lap):
+            self._return_sum[lap] = self._returns[lap].sum(axis=1)
+            self._return_sumsq[lap] = (self._returns[lap] ** 2).sum(axis=1)
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        value = getattr(self, attr_name)
+        return [value for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
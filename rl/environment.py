@@ -1,52 +1,77 @@
 import gymnasium as gym
 import numpy as np
-import pandas as pd
 from gymnasium import spaces
-from data.fetcher import fetch_historical_data
+from data.fetcher import fetch_bars
 from datetime import datetime, timedelta
-from ta.momentum import RSIIndicator
-from ta.trend import MACD
+from rl.feature_store import open_feature_set
+from rl.features import BALANCE_COL, MIN_ROWS, SHARES_COL, build_feature_matrix, clean_frame, compute_scales
+from utils.instrumentation import SampledTimer
+
+# Number of recent net worths the Sharpe reward looks at
+REWARD_WINDOW = 20
+
+# step() takes microseconds, so only every 128th call is timed
+_step_timer = SampledTimer("env.step", every=128)
 
 class StockTradingEnv(gym.Env):
-    def __init__(self, ticker, months=12, initial_balance=5000, continuous=False):
+    """
+    Single-ticker trading environment.
+    
+    Observations are precomputed into a float32 feature matrix at construction
+    and the Sharpe reward uses a fixed-size ring buffer of returns with running
+    sums, so ``step`` does no pandas work. Passing ``features`` (a FeatureSet
+    from rl.feature_store or its path) reads the matrix from memory-mapped
+    files instead of fetching and normalizing the bars.
+    """
+    def __init__(self, ticker, months=12, initial_balance=5000, continuous=False, data=None, random_start=False,
+                 features=None):
         super(StockTradingEnv, self).__init__()
         self.ticker = ticker
         self.months = months
         self.initial_balance = initial_balance
         self.continuous = continuous
+        self.random_start = random_start  # Start episodes at a random step (for vectorized training)
         self.current_step = 0
         self.balance = initial_balance
         self.shares_held = 0
         self.net_worth = initial_balance
         
-        # Fetch data
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=months * 30)
-        self.data = fetch_historical_data(ticker, start_date, end_date, interval="1d", context="rl")
-        if self.data.empty:
-            raise ValueError(f"No data fetched for {ticker}")
-        
-        # Add technical indicators
-        self.data['RSI'] = RSIIndicator(self.data['Close'], window=14).rsi()
-        macd = MACD(self.data['Close'], window_slow=26, window_fast=12, window_sign=9)
-        self.data['MACD'] = macd.macd()
-        self.data['MACD_Signal'] = macd.macd_signal()
-        
-        # Handle NaN values
-        self.data = self.data.bfill().ffill()
-        
-        # Drop initial rows with NaN indicators
-        self.data = self.data.dropna()
-        if len(self.data) < 20:
-            raise ValueError(f"Insufficient valid data for {ticker} after cleaning: {len(self.data)} rows")
-        
+        if features is not None:
+            # Memory-mapped observations from rl.feature_store: read-only pages shared
+            # by every env process instead of a per-process copy of the history
+            features = open_feature_set(features)
+            self.data = None
+            self._features, self._prices = features.series(ticker)
+            scales = features.scales(ticker, initial_balance)
+        else:
+            # Fetch data (or use the frame passed in by the caller); fetched bars are a
+            # read-only BarFrame shared with the data cache, not a private copy
+            if data is None:
+                end_date = datetime.now()
+                start_date = end_date - timedelta(days=months * 30)
+                data = fetch_bars(ticker, start_date, end_date, interval="1d", context="rl")
+            self.data = data
+            if self.data.empty:
+                raise ValueError(f"No data fetched for {ticker}")
+
+            # RSI/MACD come precomputed from the data layer
+            # Handle NaN values and drop initial rows with NaN indicators
+            self.data = clean_frame(self.data)
+            if len(self.data) < MIN_ROWS:
+                raise ValueError(f"Insufficient valid data for {ticker} after cleaning: {len(self.data)} rows")
+            scales = compute_scales(self.data, initial_balance)
+
+            # Precomputed observations and prices for the hot loop
+            self._features = build_feature_matrix(self.data, scales)
+            self._prices = np.asarray(self.data['Close'], dtype=np.float64).tolist()
+
         # Normalize data for observation
-        self.price_max = self.data['Close'].max()
-        self.ma20_max = self.data['MA20'].max()
-        self.ma50_max = self.data['MA50'].max()
-        self.balance_max = initial_balance * 2
-        self.shares_max = initial_balance / self.data['Close'].min()
-        self.macd_max = max(abs(self.data['MACD'].max()), abs(self.data['MACD_Signal'].max())) or 1
+        self.price_max = scales['price_max']
+        self.ma20_max = scales['ma20_max']
+        self.ma50_max = scales['ma50_max']
+        self.balance_max = scales['balance_max']
+        self.shares_max = scales['shares_max']
+        self.macd_max = scales['macd_max']
         
         # Action space
         if self.continuous:
@@ -62,25 +87,52 @@ class StockTradingEnv(gym.Env):
             dtype=np.float32
         )
         
-        self.max_steps = len(self.data) - 1
+        self.max_steps = len(self._features) - 1
         self.current_step = min(self.current_step, self.max_steps)
-        self.net_worths = []
+        self._reset_reward_state()
+    
+    def _reset_reward_state(self):
+        # Ring buffer of the last REWARD_WINDOW - 1 returns with running sums
+        self._returns = [0.0] * (REWARD_WINDOW - 1)
+        self._return_pos = 0
+        self._return_sum = 0.0
+        self._return_sumsq = 0.0
+        self._nonzero_returns = 0
+        self._steps_taken = 0
+        self._prev_net_worth = self.initial_balance
+    
+    def _push_return(self, value):
+        old = self._returns[self._return_pos]
+        self._returns[self._return_pos] = value
+        self._return_pos = (self._return_pos + 1) % len(self._returns)
+        self._nonzero_returns += (value != 0) - (old != 0)
+        if self._return_pos == 0:
+            # Resync once per lap so floating-point drift cannot accumulate
+            self._return_sum = sum(self._returns)
+            self._return_sumsq = sum(r * r for r in self._returns)
+        else:
+            self._return_sum += value - old
+            self._return_sumsq += value * value - old * old
     
-    def reset(self, seed=None):
+    def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         self.current_step = 0
+        if self.random_start:
+            # Leave at least one reward window of steps in the episode
+            self.current_step = int(self.np_random.integers(0, max(1, self.max_steps - REWARD_WINDOW)))
         self.balance = self.initial_balance
         self.shares_held = 0
         self.net_worth = self.initial_balance
-        self.net_worths = []
+        self._reset_reward_state()
         return self._get_observation(), {}
     
     def step(self, action):
-        current_price = self.data['Close'].iloc[self.current_step]
+        token = _step_timer.start()
+        current_price = float(self._prices[self.current_step])  # list item, or numpy scalar from a feature set
         
         # Execute action
         if self.continuous:
-            position = action[0]  # -1 (full sell) to 1 (full buy)
+            position = float(np.ravel(action)[0])  # -1 (full sell) to 1 (full buy)
             target_shares = (self.balance / current_price) * position
             shares_diff = target_shares - self.shares_held
             if shares_diff > 0:
@@ -108,34 +160,36 @@ class StockTradingEnv(gym.Env):
         
         # Update net worth
         self.net_worth = self.balance + self.shares_held * current_price
-        self.net_worths.append(self.net_worth)
+        self._steps_taken += 1
+        if self._steps_taken > 1:
+            self._push_return(self.net_worth / self._prev_net_worth - 1)
         
         # Move to next step
         self.current_step += 1
         done = self.current_step >= self.max_steps
         truncated = False
         
-        # Reward: Sharpe ratio or scaled net worth change
-        if len(self.net_worths) > 20:
-            returns = pd.Series(self.net_worths[-20:]).pct_change().dropna()
-            reward = np.mean(returns) / np.std(returns) * np.sqrt(252) if np.std(returns) > 0 else 0
+        # Reward: Sharpe ratio over the last REWARD_WINDOW net worths or scaled net worth change
+        if self._steps_taken > REWARD_WINDOW:
+            count = len(self._returns)
+            mean = self._return_sum / count
+            variance = self._return_sumsq / count - mean * mean
+            if self._nonzero_returns and variance > 0:
+                reward = mean / variance ** 0.5 * 252 ** 0.5
+            else:
+                reward = 0.0
         else:
-            prev_net_worth = self.net_worths[0] if self.current_step == 1 else self.net_worths[-2]
+            prev_net_worth = self.net_worth if self._steps_taken == 1 else self._prev_net_worth
             reward = (self.net_worth - prev_net_worth) / self.initial_balance * 100
+        self._prev_net_worth = self.net_worth
         
-        return self._get_observation(), reward, done, truncated, {}
+        observation = self._get_observation()
+        _step_timer.stop(token)
+        return observation, reward, done, truncated, {}
     
     def _get_observation(self):
-        obs = np.array([
-            self.data['Close'].iloc[self.current_step] / self.price_max,
-            self.data['MA20'].iloc[self.current_step] / self.ma20_max,
-            self.data['MA50'].iloc[self.current_step] / self.ma50_max,
-            self.balance / self.balance_max,
-            self.shares_held / self.shares_max,
-            self.data['RSI'].iloc[self.current_step] / 100,
-            self.data['MACD'].iloc[self.current_step] / self.macd_max,
-            self.data['MACD_Signal'].iloc[self.current_step] / self.macd_max
-        ], dtype=np.float32)
-        if not np.all(np.isfinite(obs)):
-            raise ValueError(f"Non-finite observation at step {self.current_step}: {obs}")
+        # Market features are precomputed (and checked finite) at construction
+        obs = self._features[self.current_step].copy()
+        obs[BALANCE_COL] = self.balance / self.balance_max
+        obs[SHARES_COL] = self.shares_held / self.shares_max
         return obs
\ No newline at end of file
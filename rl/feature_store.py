@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+from config.settings import FEATURE_STORE_DIR
+from data.barframe import BarFrame
+from data.fetcher import fetch_bars
+from rl.features import MIN_ROWS, OBSERVATION_SIZE, build_feature_matrix, clean_frame, compute_scales
+from utils.file_lock import file_lock
+
+# Columns of the features array (balance and shares are left at zero, environments fill them in)
+FEATURE_COLUMNS = ['price', 'MA20', 'MA50', 'balance', 'shares_held', 'RSI', 'MACD', 'MACD_Signal']
+RSI_COL = FEATURE_COLUMNS.index('RSI')
+# Arrays of a feature set, one .npy file each
+ARRAY_NAMES = ('features', 'prices', 'rsi', 'timestamps')
+# Rows normalized at a time while writing, bounding the float64 scratch memory
+BUILD_CHUNK_ROWS = 1_000_000
+# Seconds a writer waits for another one writing the same set
+WRITE_LOCK_TIMEOUT = 3600
+
+def _rows(data, start, stop):
+    return data.slice(start, stop) if isinstance(data, BarFrame) else data.iloc[start:stop]
+
+def _version_dir(path, version):
+    return os.path.join(path, f"v-{version}")
+
+def _current_version(path):
+    """Version ``meta.json`` points at."""
+    with open(os.path.join(path, 'meta.json')) as f:
+        return json.load(f)['version']
+
+def write_feature_set(path, datasets, chunk_rows=BUILD_CHUNK_ROWS):
+    """
+    Write normalized observation matrices for several tickers to ``path``.
+
+    Every ticker's rows are stored back to back in one float32 ``features``
+    array of shape (rows, OBSERVATION_SIZE), with the raw closes and RSI in
+    ``prices`` and ``rsi`` (float64), the bar times in ``timestamps`` (int64
+    ns) and the offsets and normalization scales in ``meta.json``. Rows are
+    written chunk by chunk into memory-mapped files, so the matrices never
+    need to fit in memory.
+
+    Each write goes to its own version directory, and ``meta.json``, which
+    names the current version, is replaced last in one rename: readers see
+    either the old set or the new one, never a mix. The version replaced is
+    kept, so sets opened (or pickled) before the rewrite keep working; only
+    older versions are removed. Writers of the same ``path`` take turns.
+
+    Args:
+        path (str): Output directory.
+        datasets (dict): Ticker -> price/indicator DataFrame or BarFrame.
+        chunk_rows (int): Rows normalized per chunk.
+
+    Returns:
+        FeatureSet: The written set, opened read-only.
+    """
+    datasets = {ticker: clean_frame(data) for ticker, data in datasets.items()}
+    for ticker, data in datasets.items():
+        if len(data) < MIN_ROWS:
+            raise ValueError(f"Insufficient valid data for {ticker}: {len(data)} rows")
+    os.makedirs(path, exist_ok=True)
+    # One writer at a time, so the cleanup never removes a version still being written
+    with file_lock(os.path.join(path, '.lock'), WRITE_LOCK_TIMEOUT):
+        meta_path = os.path.join(path, 'meta.json')
+        previous = _current_version(path) if os.path.exists(meta_path) else None
+        version = uuid.uuid4().hex[:12]
+        _write_version(_version_dir(path, version), version, datasets, chunk_rows)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump({'version': version}, f)
+        os.replace(meta_path + '.tmp', meta_path)
+        keep = [_version_dir(path, v) for v in (version, previous) if v]
+        for name in os.listdir(path):
+            if name.startswith('v-') and os.path.join(path, name) not in keep:
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+    return FeatureSet(path, version)
+
+def _write_version(directory, version, datasets, chunk_rows):
+    """Write the arrays and meta.json of one version of a set into ``directory``."""
+    total = sum(len(data) for data in datasets.values())
+    os.makedirs(directory)
+    arrays = {name: open_memmap(os.path.join(directory, f"{name}.npy"), mode='w+', dtype=dtype, shape=shape)
+              for name, dtype, shape in (('features', np.float32, (total, OBSERVATION_SIZE)),
+                                         ('prices', np.float64, (total,)),
+                                         ('rsi', np.float64, (total,)),
+                                         ('timestamps', np.int64, (total,)))}
+
+    series = []
+    offset = 0
+    for ticker, data in datasets.items():
+        length = len(data)
+        rows = slice(offset, offset + length)
+        # Price-derived scales; shares_max is per unit of initial balance
+        scales = {name: float(value) for name, value in compute_scales(data, 1.0).items()}
+        for start in range(0, length, chunk_rows):
+            part = _rows(data, start, start + chunk_rows)
+            arrays['features'][offset + start:offset + start + len(part)] = build_feature_matrix(part, scales)
+        arrays['prices'][rows] = np.asarray(data['Close'], dtype=np.float64)
+        arrays['rsi'][rows] = np.asarray(data['RSI'], dtype=np.float64)
+        index = pd.DatetimeIndex(data.index)
+        arrays['timestamps'][rows] = index.as_unit('ns').asi8
+        series.append({
+            'ticker': ticker, 'offset': offset, 'length': length, 'scales': scales,
+            'tz': None if index.tz is None else str(index.tz),
+            'start': index[0].isoformat(), 'end': index[-1].isoformat(),
+        })
+        offset += length
+
+    for array in arrays.values():
+        array.flush()
+    del arrays
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump({'version': version, 'columns': FEATURE_COLUMNS, 'rows': total, 'series': series}, f, indent=2)
+
+def build_feature_set(tickers, path, months=12, interval="1d", end_date=None):
+    """
+    Fetch tickers and write their feature matrices (see ``write_feature_set``).
+
+    Args:
+        tickers (list): Stock tickers.
+        path (str): Output directory.
+        months (int): History per ticker.
+        interval (str): Bar interval, e.g. "1d" or "1m".
+        end_date (datetime): End of the history (defaults to now).
+
+    Returns:
+        FeatureSet: The written set.
+    """
+    end_date = end_date or datetime.now()
+    start_date = end_date - timedelta(days=months * 30)
+    datasets = {}
+    for ticker in dict.fromkeys(tickers):
+        bars = fetch_bars(ticker, start_date, end_date, interval=interval, context="features")
+        if bars.empty:
+            raise ValueError(f"No data fetched for {ticker}")
+        datasets[ticker] = bars
+    return write_feature_set(path, datasets)
+
+class FeatureSet:
+    """
+    Read-only, memory-mapped view of a feature set written by ``write_feature_set``.
+
+    The arrays are opened with ``mmap_mode='r'``: pages are read on demand
+    and shared through the OS page cache by every process that opens the same
+    files. A FeatureSet pickles as its path and version, so environments in
+    subprocess pools reopen the same files instead of receiving a copy of the
+    data (or a newer version written in the meantime).
+    """
+
+    def __init__(self, path, version=None):
+        """
+        Args:
+            path (str): Directory of the set (see ``write_feature_set``).
+            version (str): Version to open; the current one when None.
+        """
+        self.path = path
+        while True:
+            current = version or _current_version(path)
+            directory = _version_dir(path, current)
+            try:
+                with open(os.path.join(directory, 'meta.json')) as f:
+                    meta = json.load(f)
+                # Plain ndarray views of the maps (they keep the maps open)
+                arrays = {name: np.asarray(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r'))
+                          for name in ARRAY_NAMES}
+                break
+            except FileNotFoundError:
+                if version is not None:
+                    raise FileNotFoundError(f"Version {version} of the feature set at {path} has been removed")
+                # Rewritten twice since meta.json was read: follow it again
+                if _current_version(path) == current:
+                    raise
+        self.features = arrays['features']
+        self.prices = arrays['prices']
+        self.rsi = arrays['rsi']
+        self.timestamps = arrays['timestamps']
+        self.version = meta['version']
+        self.columns = meta['columns']
+        self.entries = {entry['ticker']: entry for entry in meta['series']}
+        self.tickers = list(self.entries)
+
+    def __reduce__(self):
+        return (FeatureSet, (self.path, self.version))
+
+    def __len__(self):
+        return len(self.features)
+
+    def series(self, ticker):
+        """
+        Rows of one ticker.
+
+        Args:
+            ticker (str): Ticker in the set.
+
+        Returns:
+            tuple: (features (rows, OBSERVATION_SIZE) float32, closes float64), read-only views.
+        """
+        rows = self.rows(ticker)
+        return self.features[rows], self.prices[rows]
+
+    def rows(self, ticker):
+        """Slice of ``ticker``'s rows in the set's arrays."""
+        entry = self._entry(ticker)
+        return slice(entry['offset'], entry['offset'] + entry['length'])
+
+    def scales(self, ticker, initial_balance):
+        """Normalization scales of ``ticker`` as returned by ``compute_scales``."""
+        scales = dict(self._entry(ticker)['scales'])
+        scales['balance_max'] = initial_balance * 2
+        scales['shares_max'] = initial_balance * scales['shares_max']
+        return scales
+
+    def index(self, ticker):
+        """Bar times of ``ticker`` as a DatetimeIndex."""
+        entry = self._entry(ticker)
+        values = self.timestamps[self.rows(ticker)]
+        index = pd.DatetimeIndex(values.view('datetime64[ns]'))
+        return index if entry['tz'] is None else index.tz_localize('UTC').tz_convert(entry['tz'])
+
+    def _entry(self, ticker):
+        if ticker not in self.entries:
+            raise KeyError(f"{ticker} is not in the feature set at {self.path}")
+        return self.entries[ticker]
+
+def open_feature_set(features):
+    """Return ``features`` as a FeatureSet, opening it when given a path."""
+    return features if isinstance(features, FeatureSet) else FeatureSet(features)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write memory-mapped observation matrices for training.")
+    parser.add_argument("--tickers", nargs="+", default=["NVDA"], help="Tickers to include")
+    parser.add_argument("--months", type=int, default=12, help="History per ticker")
+    parser.add_argument("--interval", default="1d", help="Bar interval, e.g. 1d or 1m")
+    parser.add_argument("--output", default=None, help="Output directory (default: under FEATURE_STORE_DIR)")
+    args = parser.parse_args(argv)
+
+    path = args.output or os.path.join(FEATURE_STORE_DIR, f"{'_'.join(args.tickers)}_{args.interval}_{args.months}m")
+    features = build_feature_set(args.tickers, path, months=args.months, interval=args.interval)
+    print(f"Feature set: {len(features)} rows for {', '.join(features.tickers)} "
+          f"({features.features.nbytes / 1e6:.1f} MB) written to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import numpy as np
+from data.barframe import BarFrame
+
+# Observation layout: [price, MA20, MA50, balance, shares_held, RSI, MACD, MACD_Signal]
+OBSERVATION_SIZE = 8
+BALANCE_COL, SHARES_COL = 3, 4
+
+def clean_frame(data):
+    """
+    Fill and drop NaN rows the way the trading environments expect.
+
+    BarFrames from ``data.fetcher.fetch_bars`` have no missing values and are
+    returned as they are, so the shared bars are never copied.
+
+    Args:
+        data (pd.DataFrame or BarFrame): Price/indicator data.
+
+    Returns:
+        pd.DataFrame or BarFrame: Data without missing values.
+    """
+    if isinstance(data, BarFrame):
+        return data
+    return data.bfill().ffill().dropna()
+
+# Fewest cleaned rows an environment accepts
+MIN_ROWS = 20
+
+def compute_scales(data, initial_balance):
+    """
+    Normalization constants for the observation features.
+
+    Args:
+        data (pd.DataFrame or BarFrame): Cleaned price/indicator data.
+        initial_balance (float): Starting cash of the portfolio.
+
+    Returns:
+        dict: Divisors for price, moving averages, balance, shares and MACD.
+    """
+    column = lambda name: np.asarray(data[name], dtype=np.float64)
+    return {
+        'price_max': float(column('Close').max()),
+        'ma20_max': float(column('MA20').max()),
+        'ma50_max': float(column('MA50').max()),
+        'balance_max': initial_balance * 2,
+        'shares_max': initial_balance / float(column('Close').min()),
+        'macd_max': max(abs(float(column('MACD').max())), abs(float(column('MACD_Signal').max()))) or 1,
+    }
+
+def build_feature_matrix(data, scales):
+    """
+    Precompute normalized observations for every row as one contiguous array.
+
+    The balance and shares columns are left at zero; environments fill them in
+    from their portfolio state at each step.
+
+    Args:
+        data (pd.DataFrame or BarFrame): Cleaned price/indicator data.
+        scales (dict): Output of ``compute_scales``.
+
+    Returns:
+        np.ndarray: float32 matrix of shape (len(data), OBSERVATION_SIZE).
+    """
+    features = np.zeros((len(data), OBSERVATION_SIZE), dtype=np.float64)
+    features[:, 0] = np.asarray(data['Close'], dtype=np.float64) / scales['price_max']
+    features[:, 1] = np.asarray(data['MA20'], dtype=np.float64) / scales['ma20_max']
+    features[:, 2] = np.asarray(data['MA50'], dtype=np.float64) / scales['ma50_max']
+    features[:, 5] = np.asarray(data['RSI'], dtype=np.float64) / 100
+    features[:, 6] = np.asarray(data['MACD'], dtype=np.float64) / scales['macd_max']
+    features[:, 7] = np.asarray(data['MACD_Signal'], dtype=np.float64) / scales['macd_max']
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    bad_rows = np.flatnonzero(~np.isfinite(features).all(axis=1))
+    if len(bad_rows):
+        raise ValueError(f"Non-finite observation at step {bad_rows[0]}: {features[bad_rows[0]]}")
+    return features
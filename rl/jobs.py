@@ -0,0 +1,157 @@
+import multiprocessing as mp
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from utils import instrumentation
+
+def _publish(status, job_id, **fields):
+    """Merge ``fields`` into the shared status entry of a job."""
+    entry = dict(status.get(job_id, {}))
+    entry.update(fields)
+    status[job_id] = entry
+
+def _run_training(job_id, status, kwargs, train_func=None):
+    """Worker entry point: train one model and publish progress to ``status``."""
+    if train_func is None:
+        # Imported here so the Dash process does not need torch loaded to submit jobs
+        from rl.trainer import train_model as train_func
+
+    # Workers are reused across jobs; start each job's timings from zero
+    instrumentation.reset()
+    _publish(status, job_id, state="running", started=time.time())
+
+    def report(progress, eta):
+        _publish(status, job_id, progress=progress, eta=eta)
+
+    actions, net_worths, total_reward, sharpe_ratio, max_drawdown = train_func(progress_callback=report, **kwargs)
+    return {
+        'actions': [int(a.item()) if hasattr(a, 'item') else a for a in actions],
+        'net_worths': [float(n) for n in net_worths],
+        'total_reward': float(total_reward),
+        'sharpe_ratio': float(sharpe_ratio),
+        'max_drawdown': float(max_drawdown),
+        'timings': instrumentation.snapshot(),
+    }
+
+class TrainingJobManager:
+    """
+    Runs ``train_model`` in background worker processes.
+
+    Jobs go through a bounded queue to a fixed-size process pool, so Dash
+    callbacks return immediately and several users can train at once. Workers
+    publish progress/ETA into a ``multiprocessing.Manager`` dict that
+    ``status`` reads from the Dash process.
+    """
+
+    def __init__(self, max_workers=2, max_queued=8, max_finished=32, train_func=None):
+        """
+        Args:
+            max_workers (int): Training processes running at the same time.
+            max_queued (int): Jobs allowed to wait for a worker before
+                ``submit`` refuses new ones.
+            max_finished (int): Finished jobs kept for result lookups.
+            train_func: Module-level function with the signature of
+                ``rl.trainer.train_model`` run by the workers (defaults to it).
+        """
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.train_func = train_func
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._manager = None
+        self._status = None
+        self._executor = None
+
+    def _start(self):
+        # Started lazily so importing app.py (and Dash's reloader) spawns nothing
+        if self._executor is None:
+            context = mp.get_context("spawn")
+            self._manager = context.Manager()
+            self._status = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def submit(self, ticker, months=12, algo="ppo", total_timesteps=50000, save_path=None, **kwargs):
+        """
+        Queue a training job.
+
+        Args:
+            ticker (str): Stock ticker.
+            months (int): Data range in months.
+            algo (str): "ppo" or "sac".
+            total_timesteps (int): Training steps.
+            save_path (str): Model path (defaults to ``models/{algo}_{ticker}.zip``).
+            **kwargs: Extra ``train_model`` arguments (e.g. n_envs).
+
+        Returns:
+            str: Job id.
+
+        Raises:
+            RuntimeError: If the queue is full.
+        """
+        with self._lock:
+            self._start()
+            active = sum(1 for job in self._jobs.values() if not job['future'].done())
+            if active >= self.max_workers + self.max_queued:
+                raise RuntimeError(f"Training queue is full ({active} jobs pending)")
+
+            job_id = uuid.uuid4().hex[:12]
+            train_kwargs = dict(kwargs, ticker=ticker, months=months, algo=algo, total_timesteps=total_timesteps,
+                                save_path=save_path or f"models/{algo}_{ticker}.zip")
+            self._status[job_id] = {'state': 'queued', 'progress': 0, 'eta': None, 'submitted': time.time()}
+            future = self._executor.submit(_run_training, job_id, self._status, train_kwargs, self.train_func)
+            self._jobs[job_id] = {'future': future, 'kwargs': train_kwargs}
+            self._prune()
+            return job_id
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job['future'].done()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+            self._status.pop(job_id, None)
+
+    def status(self, job_id):
+        """
+        Current state of a job.
+
+        Args:
+            job_id (str): Id returned by ``submit``.
+
+        Returns:
+            dict: 'state' (queued, running, done, failed or unknown), 'progress',
+            'eta', plus 'result' when done or 'error' when failed.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return {'state': 'unknown', 'progress': 0, 'eta': None}
+            status = dict(self._status.get(job_id, {}))
+            future = job['future']
+            if future.done():
+                error = future.exception()
+                if error is not None:
+                    status.update(state='failed', error=str(error))
+                else:
+                    result = future.result()
+                    if not job.get('merged'):
+                        # Fold the worker's timings into this process's /metrics
+                        instrumentation.merge(result.get('timings', {}))
+                        job['merged'] = True
+                    status.update(state='done', progress=100, eta="00:00:00", result=result)
+            elif status.get('state') == 'queued':
+                queued = [j for j, other in self._jobs.items()
+                          if not other['future'].done() and self._status.get(j, {}).get('state') == 'queued']
+                status['position'] = queued.index(job_id) + 1 if job_id in queued else None
+            return status
+
+    def shutdown(self, wait=True):
+        """Stop the worker pool and the status manager."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=not wait)
+                self._manager.shutdown()
+                self._executor = None
+                self._manager = None
+                self._status = None
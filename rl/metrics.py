@@ -0,0 +1,201 @@
+import numpy as np
+
+# Trading days per year, used to annualize per-bar statistics
+PERIODS_PER_YEAR = 252
+
+METRIC_NAMES = [
+    'final_net_worth', 'total_return', 'annual_return', 'volatility', 'sharpe_ratio', 'sortino_ratio',
+    'calmar_ratio', 'max_drawdown', 'max_drawdown_duration', 'turnover', 'hit_rate',
+]
+
+def exposure_from_signals(signals):
+    """
+    Invested fraction implied by all-in/all-out signals.
+
+    Args:
+        signals (array-like): Actions per bar, 1 (buy), 2 (sell), 0 (hold);
+            shape (T,) or (runs, T).
+
+    Returns:
+        np.ndarray: 1.0 while holding shares, 0.0 while in cash, same shape.
+    """
+    signals = np.asarray(signals)
+    state = np.where(signals == 1, 1.0, np.where(signals == 2, 0.0, np.nan))
+    # Forward-fill the last buy/sell along time
+    index = np.where(np.isnan(state), 0, np.arange(state.shape[-1]))
+    index = np.maximum.accumulate(index, axis=-1)
+    filled = np.take_along_axis(state, index, axis=-1)
+    return np.nan_to_num(filled)
+
+def _ratio(numerator, denominator):
+    safe = np.where(denominator > 0, denominator, 1.0)
+    return np.where(denominator > 0, numerator / safe, 0.0)
+
+def _finish(sums, periods_per_year):
+    """Metrics from per-run sums (shared by the batch and streaming versions)."""
+    count = sums['count']
+    n = np.maximum(count, 1)
+    mean = sums['sum'] / n
+    variance = np.maximum(sums['sumsq'] / n - mean * mean, 0.0)
+    std = np.sqrt(variance)
+    downside = np.sqrt(sums['downside_sumsq'] / n)
+    total_return = _ratio(sums['final'], sums['initial']) - 1
+    growth = np.maximum(total_return + 1, 0.0)
+    annual_return = np.where(count > 0, growth ** (periods_per_year / n) - 1, 0.0)
+    # Constant returns: a variance that is only floating-point noise counts as zero
+    flat = variance <= 1e-12 * mean * mean
+    sharpe = np.where(flat, 0.0, _ratio(mean, std) * np.sqrt(periods_per_year))
+    values = {
+        'final_net_worth': sums['final'],
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'volatility': std * np.sqrt(periods_per_year),
+        'sharpe_ratio': sharpe,
+        'sortino_ratio': _ratio(mean, downside) * np.sqrt(periods_per_year),
+        'calmar_ratio': _ratio(annual_return, sums['max_drawdown']),
+        'max_drawdown': sums['max_drawdown'],
+        'max_drawdown_duration': sums['max_duration'],
+        'turnover': _ratio(sums['turnover'], n),
+        'hit_rate': _ratio(sums['wins'], sums['active']),
+    }
+    return values
+
+def compute_metrics(net_worths, exposure=None, periods_per_year=PERIODS_PER_YEAR):
+    """
+    Risk and performance metrics of one or many net worth series.
+
+    Everything is computed with NumPy along the time axis, so a (runs x time)
+    array (e.g. every combination of a sweep) is summarized in one call.
+
+    Args:
+        net_worths (array-like): Net worth per bar, shape (T,) or (runs, T).
+        exposure (array-like): Invested fraction per bar (same shape), used
+            for turnover; see ``exposure_from_signals``.
+        periods_per_year (int): Bars per year for annualization.
+
+    Returns:
+        dict: Metric name -> float for 1-D input or array of shape (runs,):
+        final_net_worth, total_return, annual_return, volatility,
+        sharpe_ratio, sortino_ratio, calmar_ratio, max_drawdown,
+        max_drawdown_duration (bars), turnover (mean absolute exposure change
+        per bar) and hit_rate (share of invested bars with a positive return).
+    """
+    values = np.asarray(net_worths, dtype=np.float64)
+    single = values.ndim == 1
+    values = np.atleast_2d(values)
+    runs, length = values.shape
+    if length == 0:
+        return {name: 0.0 if single else np.zeros(runs) for name in METRIC_NAMES}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = values[:, 1:] / values[:, :-1] - 1
+    valid = np.isfinite(returns)
+    returns = np.where(valid, returns, 0.0)
+
+    peak = np.maximum.accumulate(values, axis=1)
+    peak = np.where(peak == 0, 1.0, peak)
+    drawdown = (peak - values) / peak
+    # Longest stretch below a previous peak: bars since the last bar at a peak
+    steps = np.arange(length)
+    last_peak = np.maximum.accumulate(np.where(drawdown > 0, 0, steps), axis=1)
+
+    if exposure is None:
+        turnover = np.zeros(runs)
+    else:
+        exposure = np.atleast_2d(np.asarray(exposure, dtype=np.float64))
+        turnover = np.abs(np.diff(exposure, axis=1, prepend=0.0)).sum(axis=1)
+
+    count = valid.sum(axis=1)
+    mean = returns.sum(axis=1) / np.maximum(count, 1)
+    # Centered sum of squares (two-pass) for accuracy, stored as a raw sum for _finish
+    centered = (np.where(valid, returns - mean[:, None], 0.0) ** 2).sum(axis=1)
+    sums = {
+        'count': count,
+        'sum': returns.sum(axis=1),
+        'sumsq': centered + count * mean * mean,
+        'downside_sumsq': (np.minimum(returns, 0.0) ** 2).sum(axis=1),
+        'initial': values[:, 0],
+        'final': values[:, -1],
+        'max_drawdown': drawdown.max(axis=1),
+        'max_duration': (steps - last_peak).max(axis=1),
+        'turnover': turnover,
+        'wins': (returns > 0).sum(axis=1),
+        'active': (returns != 0).sum(axis=1),
+    }
+    metrics = _finish(sums, periods_per_year)
+    if single:
+        return {name: float(value[0]) for name, value in metrics.items()}
+    return metrics
+
+class RunningMetrics:
+    """
+    Streaming version of ``compute_metrics``, updated one bar at a time.
+
+    Keeps running sums, the peak and drawdown state, so each ``update`` is
+    O(1) per series and ``result`` can be read at any point during training
+    or a live replay. Works on a scalar net worth or on an array of net
+    worths (one per portfolio, e.g. from a batched environment).
+    """
+
+    def __init__(self, initial_net_worth, initial_exposure=0.0, periods_per_year=PERIODS_PER_YEAR):
+        """
+        Args:
+            initial_net_worth (float or array-like): First net worth of each series.
+            initial_exposure (float or array-like): Invested fraction at the first bar.
+            periods_per_year (int): Bars per year for annualization.
+        """
+        initial = np.asarray(initial_net_worth, dtype=np.float64)
+        self._single = initial.ndim == 0
+        initial = np.atleast_1d(initial).copy()
+        self.periods_per_year = periods_per_year
+        zeros = np.zeros_like(initial)
+        self._sums = {
+            'count': zeros.copy(), 'sum': zeros.copy(), 'sumsq': zeros.copy(), 'downside_sumsq': zeros.copy(),
+            'initial': initial, 'final': initial.copy(), 'max_drawdown': zeros.copy(),
+            'max_duration': zeros.copy(), 'turnover': zeros.copy(), 'wins': zeros.copy(), 'active': zeros.copy(),
+        }
+        self._peak = initial.copy()
+        self._duration = zeros.copy()
+        self._exposure = zeros + initial_exposure
+        self._sums['turnover'] = np.abs(self._exposure)
+
+    def update(self, net_worth, exposure=None):
+        """
+        Add the next bar.
+
+        Args:
+            net_worth (float or array-like): Net worth after the bar.
+            exposure (float or array-like): Invested fraction after the bar.
+        """
+        s = self._sums
+        value = np.atleast_1d(np.asarray(net_worth, dtype=np.float64))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ret = value / s['final'] - 1
+        valid = np.isfinite(ret)
+        ret = np.where(valid, ret, 0.0)
+        s['count'] += valid
+        s['sum'] += ret
+        s['sumsq'] += ret * ret
+        s['downside_sumsq'] += np.minimum(ret, 0.0) ** 2
+        s['wins'] += ret > 0
+        s['active'] += ret != 0
+        s['final'] = value
+
+        self._peak = np.maximum(self._peak, value)
+        peak = np.where(self._peak == 0, 1.0, self._peak)
+        drawdown = (peak - value) / peak
+        s['max_drawdown'] = np.maximum(s['max_drawdown'], drawdown)
+        self._duration = np.where(drawdown > 0, self._duration + 1, 0)
+        s['max_duration'] = np.maximum(s['max_duration'], self._duration)
+
+        if exposure is not None:
+            exposure = np.atleast_1d(np.asarray(exposure, dtype=np.float64))
+            s['turnover'] += np.abs(exposure - self._exposure)
+            self._exposure = exposure
+
+    def result(self):
+        """Current metrics, in the format of ``compute_metrics``."""
+        metrics = _finish(self._sums, self.periods_per_year)
+        if self._single:
+            return {name: float(value[0]) for name, value in metrics.items()}
+        return metrics
@@ -0,0 +1,167 @@
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+from datetime import datetime, timedelta
+from data.fetcher import fetch_many
+from utils.instrumentation import SampledTimer
+
+# Per-asset observation features, in order
+PORTFOLIO_FEATURES = ['price', 'MA20', 'MA50', 'RSI', 'MACD', 'MACD_Signal', 'return']
+PANEL_FIELDS = ['Close', 'MA20', 'MA50', 'RSI', 'MACD', 'MACD_Signal']
+
+_step_timer = SampledTimer("portfolio_env.step", every=128)
+
+def align_panel(panel, tickers=None):
+    """
+    Restrict a (ticker, field) panel to the dates every ticker has bars for.
+
+    Args:
+        panel (pd.DataFrame): Output of ``fetch_many``.
+        tickers (list): Tickers to keep, in order (defaults to all in the panel).
+
+    Returns:
+        tuple: (aligned panel, list of tickers).
+    """
+    available = list(dict.fromkeys(panel.columns.get_level_values(0)))
+    tickers = [t for t in (tickers or available) if t in available]
+    if not tickers:
+        raise ValueError("No tickers with data in the panel")
+    panel = panel.loc[:, (tickers, PANEL_FIELDS)]
+    return panel.dropna(), tickers
+
+def build_feature_tensor(panel, tickers):
+    """
+    Normalized per-asset features for every date as one contiguous array.
+
+    Prices and moving averages are divided by each asset's maximum close,
+    RSI by 100, MACD/signal by each asset's largest absolute MACD value, and
+    the last feature is the one-bar return.
+
+    Args:
+        panel (pd.DataFrame): Aligned panel from ``align_panel``.
+        tickers (list): Asset order.
+
+    Returns:
+        np.ndarray: float32 array of shape (dates, assets, len(PORTFOLIO_FEATURES)).
+    """
+    fields = {field: panel.xs(field, level=1, axis=1)[tickers].to_numpy(dtype=np.float64) for field in PANEL_FIELDS}
+    close = fields['Close']
+    price_max = close.max(axis=0)
+    macd_max = np.maximum(np.abs(fields['MACD']).max(axis=0), np.abs(fields['MACD_Signal']).max(axis=0))
+    macd_max = np.where(macd_max > 0, macd_max, 1.0)
+    returns = np.zeros_like(close)
+    returns[1:] = close[1:] / close[:-1] - 1
+    features = np.stack([
+        close / price_max,
+        fields['MA20'] / price_max,
+        fields['MA50'] / price_max,
+        fields['RSI'] / 100,
+        fields['MACD'] / macd_max,
+        fields['MACD_Signal'] / macd_max,
+        returns,
+    ], axis=-1)
+    features = np.ascontiguousarray(features, dtype=np.float32)
+    bad_rows = np.flatnonzero(~np.isfinite(features).all(axis=(1, 2)))
+    if len(bad_rows):
+        raise ValueError(f"Non-finite observation at step {bad_rows[0]}")
+    return features
+
+class PortfolioEnv(gym.Env):
+    """
+    Allocation environment over N tickers with cash and transaction costs.
+
+    Each action holds one score per asset plus one for cash; the softmax of
+    the scores is the target portfolio weights. Rebalancing costs
+    ``transaction_cost`` times the traded value, and the reward is the log
+    return of the portfolio over the next bar. Observations are the flattened
+    per-asset feature tensor of the current bar followed by the current
+    weights, all precomputed or computed with NumPy over the asset axis, so
+    ``step`` has no per-asset Python code.
+    """
+    def __init__(self, tickers, months=12, initial_balance=100000, transaction_cost=0.001, data=None,
+                 random_start=False):
+        """
+        Args:
+            tickers (list): Tickers to allocate across.
+            months (int): History fetched when ``data`` is not given.
+            initial_balance (float): Starting cash.
+            transaction_cost (float): Cost per unit of traded value (0.001 = 10 bps).
+            data (pd.DataFrame): (ticker, field) panel as returned by ``fetch_many``.
+            random_start (bool): Start episodes at a random step.
+        """
+        super(PortfolioEnv, self).__init__()
+        self.initial_balance = initial_balance
+        self.transaction_cost = transaction_cost
+        self.random_start = random_start
+
+        if data is None:
+            end_date = datetime.now()
+            start_date = end_date - timedelta(days=months * 30)
+            data = fetch_many(tickers, start_date, end_date, interval="1d", context="rl")
+        if data.empty:
+            raise ValueError(f"No data fetched for {', '.join(tickers)}")
+        self.data, self.tickers = align_panel(data, tickers)
+        if len(self.data) < 20:
+            raise ValueError(f"Insufficient aligned data: {len(self.data)} rows")
+
+        self.n_assets = len(self.tickers)
+        features = build_feature_tensor(self.data, self.tickers)
+        self._features = features.reshape(len(features), -1)
+        self._prices = self.data.xs('Close', level=1, axis=1)[self.tickers].to_numpy(dtype=np.float64)
+        self.max_steps = len(self.data) - 1
+
+        self.action_space = spaces.Box(low=-1, high=1, shape=(self.n_assets + 1,), dtype=np.float32)
+        n_obs = self._features.shape[1] + self.n_assets + 1
+        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(n_obs,), dtype=np.float32)
+        self._reset_portfolio()
+
+    def _reset_portfolio(self):
+        self.current_step = 0
+        self.cash = float(self.initial_balance)
+        self.shares = np.zeros(self.n_assets)
+        self.net_worth = float(self.initial_balance)
+        self.weights = np.zeros(self.n_assets + 1)
+        self.weights[-1] = 1.0
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        self._reset_portfolio()
+        if self.random_start:
+            self.current_step = int(self.np_random.integers(0, max(1, self.max_steps - 20)))
+        return self._get_observation(), {}
+
+    def target_weights(self, action):
+        """Softmax of the action scores: asset weights followed by the cash weight."""
+        scores = np.asarray(action, dtype=np.float64).reshape(-1) * 5.0
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+    def step(self, action):
+        token = _step_timer.start()
+        prices = self._prices[self.current_step]
+        value = self.cash + self.shares @ prices
+
+        # Rebalance to the target weights, paying costs out of the portfolio
+        weights = self.target_weights(action)
+        current = self.shares * prices
+        cost = self.transaction_cost * np.abs(weights[:-1] * value - current).sum()
+        value_after = value - cost
+        self.shares = weights[:-1] * value_after / prices
+        self.cash = weights[-1] * value_after
+
+        # Move to the next bar and mark to market
+        self.current_step += 1
+        prices = self._prices[self.current_step]
+        holdings = self.shares * prices
+        self.net_worth = self.cash + holdings.sum()
+        self.weights[:-1] = holdings / self.net_worth
+        self.weights[-1] = self.cash / self.net_worth
+        reward = float(np.log(self.net_worth / value))
+
+        done = self.current_step >= self.max_steps
+        observation = self._get_observation()
+        _step_timer.stop(token)
+        return observation, reward, done, False, {'net_worth': self.net_worth, 'cost': cost}
+
+    def _get_observation(self):
+        return np.concatenate([self._features[self.current_step], self.weights.astype(np.float32)])
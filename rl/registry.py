@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import cachetools
+from config.settings import MODELS_DIR
+from utils.file_lock import file_lock
+
+# Hyperparameters recorded from a trained model when present
+HYPERPARAM_NAMES = [
+    'learning_rate', 'n_steps', 'batch_size', 'n_epochs', 'gamma', 'gae_lambda', 'ent_coef',
+    'buffer_size', 'tau', 'n_envs',
+]
+
+def resolve_model_path(path):
+    """Return the file Stable-Baselines3 reads for ``path`` (it appends .zip when missing)."""
+    if not os.path.exists(path) and os.path.exists(path + ".zip"):
+        return path + ".zip"
+    return path
+
+def file_hash(path):
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def model_hyperparams(model):
+    """Numeric hyperparameters of a Stable-Baselines3 model."""
+    params = {}
+    for name in HYPERPARAM_NAMES:
+        value = getattr(model, name, None)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            params[name] = value
+    return params
+
+def _policy_nbytes(model):
+    """Memory held by a loaded model's policy parameters."""
+    return sum(p.numel() * p.element_size() for p in model.policy.parameters()) or 1
+
+class ModelRegistry:
+    """
+    Index of trained models plus an in-memory cache of loaded policies.
+
+    The index is a JSON file next to the models recording, per model, the file
+    path and SHA-256, ticker, algorithm, hyperparameters, training window and
+    evaluation metrics, so models can be listed without scanning the
+    filesystem. Loaded models are kept in an LRU cache bounded by the size of
+    their parameters; a model file that changes on disk is reloaded.
+    """
+
+    def __init__(self, root=MODELS_DIR, max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            root (str): Directory holding registry.json.
+            max_bytes (int): Parameter memory allowed for cached policies.
+        """
+        self.root = root
+        self.index_path = os.path.join(root, "registry.json")
+        self._loaded = cachetools.LRUCache(maxsize=max_bytes, getsizeof=_policy_nbytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _index_lock(self, timeout=10):
+        # Training workers run in separate processes, so guard the index with an OS file lock
+        os.makedirs(self.root, exist_ok=True)
+        return file_lock(self.index_path + ".lock", timeout)
+
+    def _read(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except ValueError as e:
+            print(f"Registry: ignoring unreadable index {self.index_path}: {e}")
+            return []
+
+    def _write(self, entries):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def register(self, model_path, ticker, algo, hyperparams=None, window=None, metrics=None):
+        """
+        Record a saved model, replacing any earlier entry for the same file.
+
+        Args:
+            model_path (str): Path the model was saved to.
+            ticker (str): Ticker the model was evaluated on.
+            algo (str): "ppo" or "sac".
+            hyperparams (dict): Training hyperparameters.
+            window (dict): Training data window (e.g. start, end, months, tickers).
+            metrics (dict): Evaluation metrics.
+
+        Returns:
+            str: Model id.
+        """
+        path = resolve_model_path(model_path)
+        entry = {
+            'id': uuid.uuid4().hex[:12],
+            'path': path,
+            'sha256': file_hash(path),
+            'ticker': ticker,
+            'algo': algo,
+            'hyperparams': hyperparams or {},
+            'window': window or {},
+            'metrics': metrics or {},
+            'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._index_lock():
+            entries = [e for e in self._read() if os.path.abspath(e['path']) != os.path.abspath(path)]
+            entries.append(entry)
+            self._write(entries)
+        return entry['id']
+
+    def list_models(self, ticker=None, algo=None):
+        """
+        Registered models, newest first.
+
+        Args:
+            ticker (str): Only models for this ticker.
+            algo (str): Only models trained with this algorithm.
+
+        Returns:
+            list: Registry entries (dicts).
+        """
+        entries = [
+            e for e in self._read()
+            if (ticker is None or e['ticker'] == ticker) and (algo is None or e['algo'] == algo)
+        ]
+        return sorted(entries, key=lambda e: e['created'], reverse=True)
+
+    def get(self, model_id):
+        """Registry entry for ``model_id`` or None."""
+        return next((e for e in self._read() if e['id'] == model_id), None)
+
+    def remove(self, model_id):
+        """Drop a model from the index (the file is left alone)."""
+        with self._index_lock():
+            self._write([e for e in self._read() if e['id'] != model_id])
+
+    def load(self, model_path, algo="ppo"):
+        """
+        Load a model, reusing the cached policy while the file is unchanged.
+
+        Args:
+            model_path (str): Path to the trained model.
+            algo (str): Algorithm used ("ppo" or "sac").
+
+        Returns:
+            BaseAlgorithm: Loaded model.
+        """
+        if algo == "ppo":
+            from stable_baselines3 import PPO as model_class
+        elif algo == "sac":
+            from stable_baselines3 import SAC as model_class
+        else:
+            raise ValueError(f"Unsupported algorithm: {algo}")
+
+        path = resolve_model_path(model_path)
+        stat = os.stat(path)
+        key = (os.path.abspath(path), algo, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            model = self._loaded.get(key)
+            if model is not None:
+                self.hits += 1
+                return model
+            self.misses += 1
+        model = model_class.load(path)
+        with self._lock:
+            try:
+                self._loaded[key] = model
+            except ValueError:
+                print(f"Registry: {path} is larger than the policy cache, not caching it")
+        return model
+
+    def cache_info(self):
+        """
+        Return policy cache statistics.
+
+        Returns:
+            dict: Hits, misses, cached models and the bytes they hold.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "models": len(self._loaded), "bytes": self._loaded.currsize}
+
+    def clear_cache(self):
+        """Drop every cached policy and reset the counters."""
+        with self._lock:
+            self._loaded.clear()
+            self.hits = 0
+            self.misses = 0
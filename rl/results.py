@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from config.settings import RESULTS_DB_PATH
+from rl.metrics import METRIC_NAMES, compute_metrics
+
+# Metrics ranked with lower values first in leaderboards
+LOWER_IS_BETTER = {'max_drawdown', 'max_drawdown_duration', 'volatility', 'turnover'}
+
+_METRIC_COLUMNS = ", ".join(f"{name} REAL" for name in METRIC_NAMES)
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    params TEXT NOT NULL,
+    start_date TEXT,
+    end_date TEXT,
+    months INTEGER,
+    bars INTEGER NOT NULL,
+    {_METRIC_COLUMNS},
+    net_worths BLOB NOT NULL,
+    actions BLOB
+);
+CREATE INDEX IF NOT EXISTS runs_ticker ON runs (ticker, strategy, created);
+CREATE INDEX IF NOT EXISTS runs_strategy ON runs (strategy, created);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created);
+"""
+# Columns returned by ``runs``/``leaderboard`` (the arrays are read with ``curve``)
+SUMMARY_COLUMNS = ['id', 'created', 'ticker', 'strategy', 'params', 'start_date', 'end_date', 'months', 'bars'] \
+    + METRIC_NAMES
+
+def _date(value):
+    return None if value is None else str(pd.Timestamp(value).date())
+
+class ResultsStore:
+    """
+    Append-only store of backtest and evaluation runs in one SQLite file.
+
+    Each run is one row holding its metadata (ticker, strategy, parameters,
+    data window), every metric of ``rl.metrics`` as its own column and the
+    full net worth and action arrays as float64/float32 blobs. Indexes on
+    ticker, strategy and creation time keep filtered listings and
+    leaderboards fast without reading the arrays. SQLite in WAL mode lets the
+    app and background workers append while others read.
+    """
+
+    def __init__(self, path=RESULTS_DB_PATH):
+        """
+        Args:
+            path (str): SQLite database file (created on first use).
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        # One short-lived connection per call: callbacks run on many threads
+        return sqlite3.connect(self.path, timeout=10)
+
+    def record(self, ticker, strategy, net_worths, actions=None, params=None, start_date=None, end_date=None,
+               months=None, metrics=None, exposure=None):
+        """
+        Append a run.
+
+        Args:
+            ticker (str): Ticker the run traded (comma-joined for portfolios).
+            strategy (str): Strategy name, e.g. "RSI", "PPO".
+            net_worths (array-like): Net worth per bar.
+            actions (array-like): Action per bar (optional).
+            params (dict): Strategy parameters, stored as JSON.
+            start_date: First bar of the data window.
+            end_date: Last bar of the data window.
+            months (int): Requested history in months.
+            metrics (dict): Metrics to store; missing ones are computed from
+                ``net_worths`` with ``compute_metrics``.
+            exposure (array-like): Invested fraction per bar for the computed turnover.
+
+        Returns:
+            int: Run id.
+        """
+        net_worths = np.asarray(net_worths, dtype=np.float64)
+        values = compute_metrics(net_worths, exposure=exposure)
+        values.update({name: float(value) for name, value in (metrics or {}).items() if name in METRIC_NAMES})
+        row = {
+            'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'ticker': ticker,
+            'strategy': strategy,
+            'params': json.dumps(params or {}, sort_keys=True),
+            'start_date': _date(start_date),
+            'end_date': _date(end_date),
+            'months': months,
+            'bars': len(net_worths),
+            **values,
+            'net_worths': net_worths.tobytes(),
+            'actions': None if actions is None else np.asarray(actions, dtype=np.float32).tobytes(),
+        }
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(f"INSERT INTO runs ({columns}) VALUES ({placeholders})", list(row.values()))
+            return cursor.lastrowid
+
+    def _where(self, ticker, strategy, since, until):
+        clauses, args = [], []
+        for column, op, value in (('ticker', '=', ticker), ('strategy', '=', strategy),
+                                  ('created', '>=', since), ('created', '<=', until)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                args.append(str(value))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), args
+
+    def _query(self, sql, args):
+        with closing(self._connect()) as conn:
+            frame = pd.read_sql_query(sql, conn, params=args)
+        frame['params'] = frame['params'].map(json.loads)
+        return frame
+
+    def runs(self, ticker=None, strategy=None, since=None, until=None, limit=None):
+        """
+        Run summaries (metadata and metrics), newest first.
+
+        Args:
+            ticker (str): Only runs on this ticker.
+            strategy (str): Only runs of this strategy.
+            since (str): Earliest creation time, "YYYY-MM-DD[ HH:MM:SS]".
+            until (str): Latest creation time.
+            limit (int): Maximum number of runs.
+
+        Returns:
+            pd.DataFrame: One row per run with SUMMARY_COLUMNS.
+        """
+        where, args = self._where(ticker, strategy, since, until)
+        sql = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM runs{where} ORDER BY created DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        return self._query(sql, args)
+
+    def leaderboard(self, metric='sharpe_ratio', ticker=None, strategy=None, since=None, limit=10):
+        """
+        Best runs by ``metric``.
+
+        Args:
+            metric (str): Metric to rank by (one of METRIC_NAMES).
+            ticker (str): Only runs on this ticker.
+            strategy (str): Only runs of this strategy.
+            since (str): Earliest creation time.
+            limit (int): Number of runs.
+
+        Returns:
+            pd.DataFrame: Top runs with SUMMARY_COLUMNS.
+        """
+        if metric not in METRIC_NAMES:
+            raise ValueError(f"Unknown metric: {metric}")
+        order = "ASC" if metric in LOWER_IS_BETTER else "DESC"
+        where, args = self._where(ticker, strategy, since, None)
+        sql = (f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM runs{where} "
+               f"ORDER BY {metric} {order}, created DESC LIMIT ?")
+        return self._query(sql, args + [int(limit)])
+
+    def curve(self, run_id):
+        """
+        Arrays of one run.
+
+        Args:
+            run_id (int): Id returned by ``record``.
+
+        Returns:
+            dict: net_worths (float64 array) and actions (float32 array or
+            None), or None for an unknown id.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT net_worths, actions FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'net_worths': np.frombuffer(row[0], dtype=np.float64),
+            'actions': None if row[1] is None else np.frombuffer(row[1], dtype=np.float32),
+        }
@@ -1,12 +1,37 @@
+import numpy as np
 import plotly.graph_objs as go
+from config.settings import CHART_MAX_POINTS
+from components.downsample import chart_indices
 
-def create_rl_chart(actions, net_worths, data, ticker, indicators):
+def _marker_positions(actions, action, limit, max_points):
+    """Positions of ``action`` among the first ``limit`` actions, thinned to ``max_points``."""
+    positions = np.flatnonzero(np.asarray(actions[:limit]) == action)
+    if len(positions) > max_points:
+        positions = positions[np.linspace(0, len(positions) - 1, max_points).astype(np.int64)]
+    return positions
+
+def create_rl_chart(actions, net_worths, data, ticker, indicators, x_range=None, max_points=CHART_MAX_POINTS):
     """
     Create a chart showing stock price, net worth, actions, and indicators.
+
+    Long series are downsampled to about ``max_points`` per trace (full detail
+    inside ``x_range`` when given) and trade markers are thinned to the same budget.
     """
     try:
         fig = go.Figure()
 
+        net_worths = np.asarray(net_worths, dtype=np.float64)
+        n_steps = min(len(net_worths), len(data))
+        net_worth_column = np.full(len(data), np.nan)
+        net_worth_column[:n_steps] = net_worths[:n_steps]
+        columns = ["Close", "Net Worth"] + (["RSI"] if "RSI" in indicators else []) + (
+            ["MACD", "MACD_Signal"] if "MACD" in indicators else [])
+        frame = data[[c for c in columns if c in data]].assign(**{"Net Worth": net_worth_column})
+        rows = chart_indices(frame, columns, x_range, max_points)
+        full_index = data.index
+        data = data.iloc[rows]
+        net_worth_rows = rows[rows < n_steps]
+
         # Add Close price
         fig.add_trace(go.Scatter(
             x=data.index,
@@ -18,8 +43,8 @@ def create_rl_chart(actions, net_worths, data, ticker, indicators):
 
         # Add Net Worth
         fig.add_trace(go.Scatter(
-            x=data.index[:len(net_worths)],
-            y=net_worths,
+            x=full_index[net_worth_rows],
+            y=net_worths[net_worth_rows],
             mode="lines",
             name="Net Worth",
             line=dict(color="orange", dash="dash"),
@@ -27,18 +52,18 @@ def create_rl_chart(actions, net_worths, data, ticker, indicators):
         ))
 
         # Add Buy/Sell markers
-        buy_indices = [i for i, a in enumerate(actions) if a == 1]
-        sell_indices = [i for i, a in enumerate(actions) if a == 2]
+        buy_indices = _marker_positions(actions, 1, n_steps, max_points)
+        sell_indices = _marker_positions(actions, 2, n_steps, max_points)
         fig.add_trace(go.Scatter(
-            x=[data.index[i] for i in buy_indices],
-            y=[net_worths[i] for i in buy_indices],
+            x=full_index[buy_indices],
+            y=net_worths[buy_indices],
             mode="markers",
             name="Buy",
             marker=dict(symbol="triangle-up", size=10, color="red")
         ))
         fig.add_trace(go.Scatter(
-            x=[data.index[i] for i in sell_indices],
-            y=[net_worths[i] for i in sell_indices],
+            x=full_index[sell_indices],
+            y=net_worths[sell_indices],
             mode="markers",
             name="Sell",
             marker=dict(symbol="triangle-down", size=10, color="green")
@@ -0,0 +1,157 @@
+import argparse
+import itertools
+import multiprocessing as mp
+import os
+from datetime import datetime, timedelta
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from ta.momentum import RSIIndicator
+from data.fetcher import fetch_historical_data
+from data.indicators import RSI_WINDOW
+from rl.backtest import simulate_signals
+from rl.metrics import compute_metrics, exposure_from_signals
+
+# Default RSI grid: the thresholds and window hard-coded in rsi_strategy plus neighbours
+DEFAULT_GRID = {
+    'window': [14],
+    'lower': [20, 25, 30, 35],
+    'upper': [65, 70, 75, 80],
+}
+
+# Threshold pairs per task; their backtests are summarized as one (pairs x time) batch
+PAIRS_PER_TASK = 8
+
+# Per-process view of the shared arrays: ticker -> (SharedMemory, 2 x n array of close, RSI)
+_shared = {}
+
+def _attach(blocks):
+    """Pool initializer: map every ticker's shared close/RSI block into this process."""
+    for ticker, (name, length) in blocks.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _shared[ticker] = (shm, np.ndarray((2, length), dtype=np.float64, buffer=shm.buf))
+
+def _run_combinations(task):
+    """Backtest (lower, upper) threshold pairs for one ticker and RSI window on shared data."""
+    ticker, window, pairs, initial_balance = task
+    closes, rsi = _shared[ticker][1]
+    if window != RSI_WINDOW:
+        # The data layer only keeps the default window, other windows start cold
+        rsi = RSIIndicator(pd.Series(closes), window=window).rsi().to_numpy()
+    lower = np.array([p[0] for p in pairs], dtype=np.float64)[:, None]
+    upper = np.array([p[1] for p in pairs], dtype=np.float64)[:, None]
+    signals = np.where(rsi < lower, 1, np.where(rsi > upper, 2, 0)).astype(np.int8)
+    net_worths = np.vstack([simulate_signals(closes, row, initial_balance) for row in signals])
+    metrics = compute_metrics(net_worths, exposure=exposure_from_signals(signals))
+    return [
+        {
+            'ticker': ticker,
+            'window': window,
+            'lower': low,
+            'upper': high,
+            'sharpe_ratio': float(metrics['sharpe_ratio'][i]),
+            'sortino_ratio': float(metrics['sortino_ratio'][i]),
+            'calmar_ratio': float(metrics['calmar_ratio'][i]),
+            'max_drawdown': float(metrics['max_drawdown'][i]),
+            'hit_rate': float(metrics['hit_rate'][i]),
+            'turnover': float(metrics['turnover'][i]),
+            'final_net_worth': float(metrics['final_net_worth'][i]),
+        }
+        for i, (low, high) in enumerate(pairs)
+    ]
+
+def run_sweep(tickers, param_grid=None, months=12, processes=None, initial_balance=10000):
+    """
+    Backtest the RSI strategy over a parameter grid for several tickers.
+
+    Each ticker is fetched once and its closes (plus the precomputed RSI) are
+    placed in shared memory, so worker processes read the same pages instead
+    of receiving copies.
+
+    Args:
+        tickers (list): Stock tickers.
+        param_grid (dict): Lists of values for 'window', 'lower' and 'upper'.
+        months (int): Data range in months.
+        processes (int): Worker processes (defaults to the CPU count).
+        initial_balance (float): Starting cash per backtest.
+
+    Returns:
+        pd.DataFrame: One row per combination, ranked by Sharpe ratio.
+    """
+    grid = dict(DEFAULT_GRID, **(param_grid or {}))
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=months * 30)
+
+    segments = {}
+    blocks = {}
+    try:
+        for ticker in tickers:
+            data = fetch_historical_data(ticker, start_date, end_date, interval="1d", context="backtest")
+            if data.empty:
+                print(f"Sweep: skipping {ticker}, no data")
+                continue
+            block = data[['Close', 'RSI']].to_numpy(dtype=np.float64).T
+            shm = shared_memory.SharedMemory(create=True, size=block.nbytes)
+            np.ndarray(block.shape, dtype=np.float64, buffer=shm.buf)[:] = block
+            segments[ticker] = shm
+            blocks[ticker] = (shm.name, block.shape[1])
+
+        pairs = [(lower, upper) for lower, upper in itertools.product(grid['lower'], grid['upper']) if lower < upper]
+        tasks = [
+            (ticker, window, pairs[i:i + PAIRS_PER_TASK], initial_balance)
+            for ticker in blocks
+            for window in grid['window']
+            for i in range(0, len(pairs), PAIRS_PER_TASK)
+        ]
+        if not tasks:
+            return pd.DataFrame()
+
+        processes = processes or os.cpu_count() or 1
+        if processes == 1:
+            _attach(blocks)
+            rows = [row for task in tasks for row in _run_combinations(task)]
+        else:
+            chunksize = max(1, len(tasks) // (processes * 4))
+            with mp.Pool(processes, initializer=_attach, initargs=(blocks,)) as pool:
+                rows = [row for task_rows in pool.imap_unordered(_run_combinations, tasks, chunksize=chunksize)
+                        for row in task_rows]
+    finally:
+        for ticker in list(_shared):
+            _shared.pop(ticker)[0].close()
+        for shm in segments.values():
+            shm.close()
+            shm.unlink()
+
+    results = pd.DataFrame(rows).sort_values('sharpe_ratio', ascending=False).reset_index(drop=True)
+    results.index += 1
+    results.index.name = 'rank'
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep RSI strategy parameters across tickers.")
+    parser.add_argument("--tickers", nargs="+", default=["NVDA"], help="Tickers to backtest")
+    parser.add_argument("--months", type=int, default=12, help="Data range in months")
+    parser.add_argument("--window", nargs="+", type=int, default=DEFAULT_GRID['window'], help="RSI windows")
+    parser.add_argument("--lower", nargs="+", type=float, default=DEFAULT_GRID['lower'], help="Buy thresholds")
+    parser.add_argument("--upper", nargs="+", type=float, default=DEFAULT_GRID['upper'], help="Sell thresholds")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--top", type=int, default=20, help="Rows to print")
+    parser.add_argument("--output", default=None, help="Optional CSV path for the full table")
+    args = parser.parse_args(argv)
+
+    results = run_sweep(
+        args.tickers,
+        {'window': args.window, 'lower': args.lower, 'upper': args.upper},
+        months=args.months,
+        processes=args.processes,
+    )
+    if results.empty:
+        print("Sweep: no results")
+        return
+    print(results.head(args.top).to_string())
+    if args.output:
+        results.to_csv(args.output)
+        print(f"Sweep results saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,25 @@
 import time
 import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from functools import partial
+from data.fetcher import fetch_historical_data, fetch_many
 from rl.environment import StockTradingEnv
+from rl.batched_env import BatchedTradingEnv
+from rl.feature_store import FeatureSet
+from rl.portfolio_env import PortfolioEnv
+from rl.metrics import compute_metrics
 from rl.models import create_ppo_model, create_sac_model
-from stable_baselines3 import PPO
+from rl.registry import ModelRegistry, model_hyperparams
+from utils.instrumentation import span, timed
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
 import os
 from tqdm import tqdm # Ensure tqdm is imported
 from stable_baselines3.common.callbacks import BaseCallback # Ensure BaseCallback is imported
 
+# Index of trained models and cache of loaded policies shared by train/evaluate
+_registry = ModelRegistry()
+
 def calculate_metrics(net_worths):
     """
     Calculate performance metrics for the trading strategy.
@@ -19,28 +32,9 @@ def calculate_metrics(net_worths):
     """
     if len(net_worths) < 2:
         return 0, 0 # Not enough data
-    net_worths = np.array(net_worths) # Ensure numpy array for calculations
-    returns = np.diff(net_worths) / net_worths[:-1]
-    
-    # Handle potential division by zero or NaN if returns are constant or net_worths are zero
-    returns = returns[~np.isnan(returns) & ~np.isinf(returns)] # Filter out NaNs/Infs
-    if len(returns) == 0:
-        return 0, 0
-
-    std_dev = np.std(returns)
-    if std_dev == 0:
-        sharpe_ratio = 0
-    else:
-        sharpe_ratio = np.mean(returns) / std_dev * np.sqrt(252) # Annualized Sharpe
-
-    # Calculate Max Drawdown
-    peak = np.maximum.accumulate(net_worths)
-    # Ensure peak is not zero to avoid division by zero
-    peak[peak == 0] = 1 # Replace 0 peaks with 1 to avoid division error, drawdown will be 0 anyway
-    drawdown = (peak - net_worths) / peak
-    max_drawdown = np.max(drawdown)
-
-    return sharpe_ratio, max_drawdown
+    # Shared with the backtests; see rl.metrics for Sortino, Calmar, turnover, etc.
+    metrics = compute_metrics(net_worths)
+    return metrics['sharpe_ratio'], metrics['max_drawdown']
 
 # Global variables to track progress and ETA for the web UI
 training_progress = 0
@@ -49,11 +43,20 @@ training_eta = None # Estimated time remaining as string "HH:MM:SS" or None
 
 # Custom callback integrating tqdm for terminal and updating global vars for web UI
 class TqdmCallback(BaseCallback):
-    def __init__(self, total_timesteps, verbose=0):
+    def __init__(self, total_timesteps, verbose=0, progress_callback=None):
         super(TqdmCallback, self).__init__(verbose)
         self.pbar = None
         self.total_timesteps = total_timesteps
         self.last_timestep = 0
+        # Optional hook called as progress_callback(progress, eta) when either changes,
+        # used to publish progress outside this process (see rl.jobs)
+        self.progress_callback = progress_callback
+        self._last_reported = None
+
+    def _report(self):
+        if self.progress_callback is not None and (training_progress, training_eta) != self._last_reported:
+            self._last_reported = (training_progress, training_eta)
+            self.progress_callback(training_progress, training_eta)
 
     def _on_training_start(self):
         global training_start_time, training_progress, training_eta
@@ -63,11 +66,13 @@ class TqdmCallback(BaseCallback):
         # Initialize tqdm progress bar for the terminal
         self.pbar = tqdm(total=self.total_timesteps, desc="Training Progress", unit="step")
         self.last_timestep = 0
+        self._report()
 
     def _on_step(self) -> bool:
         global training_progress, training_eta, training_start_time
         
-        current_steps = self.num_timesteps
+        # num_timesteps counts steps of every env in a vectorized pool
+        current_steps = min(self.num_timesteps, self.total_timesteps)
         # Update tqdm progress bar
         update_amount = current_steps - self.last_timestep
         if update_amount > 0: # Only update if steps increased
@@ -98,6 +103,7 @@ class TqdmCallback(BaseCallback):
             elif training_start_time is not None:
                  training_eta = "Calculating..."
                  self.pbar.set_description(f"Training Progress (ETA: {training_eta})")
+            self._report()
 
         return True # Continue training
 
@@ -114,13 +120,74 @@ class TqdmCallback(BaseCallback):
         # Update global state for web UI
         training_progress = 100
         training_eta = "00:00:00" # Training finished
+        self._report()
         print("\nTrainer: Training finished.") # Add newline after tqdm
 
 
-def train_model(ticker, months=12, total_timesteps=100000, save_path="models/ppo_model", algo="ppo"):
-    # ... (rest of train_model function remains the same, using TqdmCallback) ...
+def make_vec_env(datasets, n_envs, continuous=False, vec_env="dummy", random_start=True):
+    """
+    Build a pool of StockTradingEnv instances for vectorized rollouts.
+    
+    Args:
+        datasets (dict): Ticker -> prepared data frame; envs cycle over the tickers.
+            A FeatureSet (rl.feature_store) can be passed instead: every env
+            then maps the same read-only files rather than holding its own
+            copy of the history.
+        n_envs (int): Number of environments.
+        continuous (bool): Continuous action space (SAC).
+        vec_env (str): "dummy" (in-process), "subproc" (one process per env) or
+            "batched" (one BatchedTradingEnv stepping all portfolios as arrays).
+        random_start (bool): Start episodes at random offsets so envs on the
+            same ticker do not collect identical rollouts.
+    
+    Returns:
+        VecEnv: Vectorized environment.
+    """
+    if isinstance(datasets, FeatureSet):
+        if vec_env == "batched":
+            return BatchedTradingEnv(datasets, n_envs, continuous=continuous, random_start=random_start)
+        # The set pickles as its path, so subprocess envs reopen the maps
+        tickers = datasets.tickers
+        factories = [
+            partial(StockTradingEnv, tickers[i % len(tickers)], continuous=continuous, features=datasets,
+                    random_start=random_start)
+            for i in range(n_envs)
+        ]
+    elif vec_env == "batched":
+        return BatchedTradingEnv(list(datasets.values()), n_envs, continuous=continuous, random_start=random_start)
+    else:
+        tickers = list(datasets)
+        factories = [
+            partial(StockTradingEnv, tickers[i % len(tickers)], continuous=continuous,
+                    data=datasets[tickers[i % len(tickers)]], random_start=random_start)
+            for i in range(n_envs)
+        ]
+    if vec_env == "subproc":
+        return SubprocVecEnv(factories)
+    if vec_env == "dummy":
+        return DummyVecEnv(factories)
+    raise ValueError(f"Unsupported vec_env: {vec_env}")
+
+
+@timed("train_model")
+def train_model(ticker, months=12, total_timesteps=100000, save_path="models/ppo_model", algo="ppo",
+                n_envs=1, vec_env="dummy", tickers=None, progress_callback=None):
     """
     Train a model with progress tracking (tqdm for terminal, globals for web UI).
+    
+    Args:
+        ticker (str): Stock ticker used for evaluation (and training by default).
+        months (int): Data range in months.
+        total_timesteps (int): Training steps summed over all environments.
+        save_path (str): Where to save the trained model.
+        algo (str): "ppo" or "sac".
+        n_envs (int): Number of environments collecting rollouts in parallel.
+        vec_env (str): "dummy", "subproc" or "batched" pool when ``n_envs > 1``.
+        tickers (list): Tickers to spread over the pool (defaults to ``[ticker]``).
+        progress_callback: Optional ``(progress, eta)`` hook, see TqdmCallback.
+    
+    Returns:
+        tuple: Actions, net worths, total reward, Sharpe ratio, max drawdown.
     """
     global training_progress, training_start_time, training_eta # Ensure globals are accessible
     # Reset global state at the start of training attempt
@@ -129,32 +196,55 @@ def train_model(ticker, months=12, total_timesteps=100000, save_path="models/ppo
     training_eta = None
     print(f"Trainer: Initializing training for {ticker} ({algo.upper()})...")
 
+    # Fetch each ticker once; every env in the pool shares these frames
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=months * 30)
+    datasets = {}
+    for name in dict.fromkeys([ticker] + list(tickers or [])):
+        data = fetch_historical_data(name, start_date, end_date, interval="1d", context="rl")
+        if data.empty:
+            raise ValueError(f"No data fetched for {name}")
+        datasets[name] = data
+    if not tickers:
+        train_datasets = {ticker: datasets[ticker]}
+    else:
+        train_datasets = {name: datasets[name] for name in tickers}
+
     # Create environment
-    env = StockTradingEnv(ticker, months=months, continuous=(algo == "sac"))
+    env = StockTradingEnv(ticker, months=months, continuous=(algo == "sac"), data=datasets[ticker])
+    if n_envs > 1 or tickers:
+        train_env = make_vec_env(train_datasets, n_envs, continuous=(algo == "sac"), vec_env=vec_env)
+    else:
+        train_env = env
 
     # Create model
     if algo == "ppo":
-        model = create_ppo_model(env)
+        # Keep the rollout size per update roughly constant regardless of pool size
+        model = create_ppo_model(train_env, n_steps=max(64, 4096 // n_envs))
     elif algo == "sac":
         # Ensure SAC is imported if used
         from stable_baselines3 import SAC 
-        model = create_sac_model(env) # Assumes create_sac_model exists
+        model = create_sac_model(train_env) # Assumes create_sac_model exists
     else:
         raise ValueError(f"Unsupported algorithm: {algo}")
 
     # Create the callback instance
-    tqdm_callback = TqdmCallback(total_timesteps=total_timesteps)
+    tqdm_callback = TqdmCallback(total_timesteps=total_timesteps, progress_callback=progress_callback)
 
     print(f"Trainer: Starting model.learn for {total_timesteps} timesteps...")
     try:
         # Pass the callback to the learn method
-        model.learn(total_timesteps=total_timesteps, callback=tqdm_callback, log_interval=1000) # Adjust log_interval
+        with span("model.learn"):
+            model.learn(total_timesteps=total_timesteps, callback=tqdm_callback, log_interval=1000) # Adjust log_interval
     except Exception as e:
         print(f"\nError during model.learn: {e}")
         # Ensure tqdm bar is closed on error
         if tqdm_callback.pbar:
             tqdm_callback.pbar.close()
         raise # Re-raise the exception
+    finally:
+        if train_env is not env:
+            train_env.close()
     # Note: _on_training_end in the callback handles final state updates
 
     # Save model
@@ -164,33 +254,151 @@ def train_model(ticker, months=12, total_timesteps=100000, save_path="models/ppo
 
     # Evaluate
     print(f"Trainer: Starting evaluation...")
-    obs, _ = env.reset()
-    total_reward = 0
-    actions = []
-    net_worths = []
-
-    while True:
-        action, _ = model.predict(obs, deterministic=True)
-        if isinstance(action, np.ndarray):
-             action = action.item()
-
-        obs, reward, done, truncated, info = env.step(action)
-        total_reward += reward
-        actions.append(action)
-        net_worths.append(env.net_worth)
-
-        if done or truncated:
-            print(f"Trainer: Evaluation loop finished. Done={done}, Truncated={truncated}")
-            break
+    actions, net_worths, total_reward = rollout_policy(model, [datasets[ticker]], continuous=(algo == "sac"))[0]
+    print(f"Trainer: Evaluation loop finished after {len(actions)} steps")
 
     sharpe_ratio, max_drawdown = calculate_metrics(net_worths)
     print(f"Trainer: Evaluation complete. Sharpe={sharpe_ratio:.2f}, Drawdown={max_drawdown:.2%}")
 
+    index = datasets[ticker].index
+    model_id = _registry.register(
+        save_path, ticker, algo,
+        hyperparams=dict(model_hyperparams(model), total_timesteps=total_timesteps, vec_env=vec_env),
+        window={'start': str(index[0].date()), 'end': str(index[-1].date()), 'months': months,
+                'tickers': list(train_datasets)},
+        metrics={'sharpe_ratio': float(sharpe_ratio), 'max_drawdown': float(max_drawdown),
+                 'total_reward': float(total_reward), 'final_net_worth': float(net_worths[-1])},
+    )
+    print(f"Trainer: Registered model {model_id}")
+
     # Final state already set by callback's _on_training_end
     print(f"Trainer: Training function finished.")
     return actions, net_worths, total_reward, sharpe_ratio, max_drawdown
 
 
+@timed("train_portfolio_model")
+def train_portfolio_model(tickers, months=12, total_timesteps=100000, save_path="models/portfolio_ppo",
+                          transaction_cost=0.001, n_envs=1, progress_callback=None):
+    """
+    Train a PPO allocation policy across several tickers with PortfolioEnv.
+    
+    Args:
+        tickers (list): Tickers in the portfolio.
+        months (int): Data range in months.
+        total_timesteps (int): Training steps summed over all environments.
+        save_path (str): Where to save the trained model.
+        transaction_cost (float): Cost per unit of traded value.
+        n_envs (int): Environments collecting rollouts (random episode starts).
+        progress_callback: Optional ``(progress, eta)`` hook, see TqdmCallback.
+    
+    Returns:
+        tuple: Net worths of a deterministic evaluation episode, Sharpe ratio, max drawdown.
+    """
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=months * 30)
+    panel = fetch_many(tickers, start_date, end_date, interval="1d", context="rl")
+    env = PortfolioEnv(tickers, initial_balance=5000, transaction_cost=transaction_cost, data=panel)
+    train_env = DummyVecEnv([
+        partial(PortfolioEnv, tickers, initial_balance=5000, transaction_cost=transaction_cost, data=panel,
+                random_start=True)
+        for _ in range(n_envs)
+    ])
+    model = create_ppo_model(train_env, n_steps=max(64, 4096 // n_envs))
+    with span("model.learn"):
+        model.learn(total_timesteps=total_timesteps,
+                    callback=TqdmCallback(total_timesteps=total_timesteps, progress_callback=progress_callback))
+    train_env.close()
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    model.save(save_path)
+
+    obs, _ = env.reset()
+    net_worths = [env.net_worth]
+    done = False
+    while not done:
+        with span("model.predict"):
+            action, _ = model.predict(obs, deterministic=True)
+        obs, _, done, _, _ = env.step(action)
+        net_worths.append(env.net_worth)
+    sharpe_ratio, max_drawdown = calculate_metrics(net_worths)
+    print(f"Trainer: Portfolio of {len(env.tickers)} tickers evaluated. Sharpe={sharpe_ratio:.2f}, "
+          f"Drawdown={max_drawdown:.2%}")
+
+    index = env.data.index
+    _registry.register(
+        save_path, ",".join(env.tickers), "ppo",
+        hyperparams=dict(model_hyperparams(model), total_timesteps=total_timesteps,
+                         transaction_cost=transaction_cost, env="portfolio"),
+        window={'start': str(index[0].date()), 'end': str(index[-1].date()), 'months': months,
+                'tickers': env.tickers},
+        metrics={'sharpe_ratio': float(sharpe_ratio), 'max_drawdown': float(max_drawdown),
+                 'final_net_worth': float(net_worths[-1])},
+    )
+    return net_worths, sharpe_ratio, max_drawdown
+
+
+@timed("rollout_policy")
+def rollout_policy(model, datasets, continuous=False, initial_balance=5000, scales=None):
+    """
+    Run a trained policy deterministically over several price series at once.
+
+    Each step of a series depends on the portfolio (balance, shares held) left
+    by the previous decision, so a single series cannot be batched over time.
+    Instead every series gets its own portfolio in one BatchedTradingEnv and
+    all of them advance in lockstep, with one ``model.predict`` call (one
+    forward pass) per bar for the whole batch.
+
+    Args:
+        model: Trained Stable-Baselines3 model.
+        datasets (list): Price/indicator frames, one per series.
+        continuous (bool): Continuous action space (SAC).
+        initial_balance (float): Starting cash of every portfolio.
+        scales (list): Normalization scales per dataset (see BatchedTradingEnv);
+            pass the training window's for out-of-sample evaluation.
+
+    Returns:
+        list: One (actions, net worths, total reward) tuple per dataset.
+    """
+    env = BatchedTradingEnv(datasets, len(datasets), initial_balance=initial_balance,
+                            continuous=continuous, auto_reset=False, scales=scales)
+    obs = env.reset()
+    lengths = env.max_steps
+    horizon = int(lengths.max())
+    actions = np.zeros((len(datasets), horizon), dtype=np.float32 if continuous else np.int64)
+    net_worths = np.zeros((len(datasets), horizon))
+    total_rewards = np.zeros(len(datasets))
+
+    for t in range(horizon):
+        with span("model.predict"):
+            action, _ = model.predict(obs, deterministic=True)
+        obs, _, _, _ = env.step(action)
+        # Finished series stay parked on their last bar; ignore what they do
+        active = t < lengths
+        actions[:, t] = np.reshape(action, (len(datasets), -1))[:, 0]
+        net_worths[:, t] = env.net_worth
+        total_rewards += np.where(active, env.rewards, 0.0)
+    env.close()
+
+    return [
+        (actions[i, :lengths[i]].tolist(), net_worths[i, :lengths[i]].tolist(), float(total_rewards[i]))
+        for i in range(len(datasets))
+    ]
+
+
+def load_model(model_path, algo="ppo"):
+    """
+    Load a saved model through the registry's policy cache.
+
+    Args:
+        model_path (str): Path to the trained model.
+        algo (str): Algorithm used ("ppo" or "sac").
+
+    Returns:
+        BaseAlgorithm: Loaded model.
+    """
+    return _registry.load(model_path, algo)
+
+
+@timed("evaluate_model")
 def evaluate_model(ticker, months=12, model_path="models/ppo_model", algo="ppo"):
     """
     Evaluate a trained model.
@@ -204,34 +412,66 @@ def evaluate_model(ticker, months=12, model_path="models/ppo_model", algo="ppo")
     Returns:
         tuple: Actions, net worths, total reward, Sharpe ratio, max drawdown.
     """
-    env = StockTradingEnv(ticker, months=months, continuous=(algo == "sac"))
-    if algo == "ppo":
-        model = PPO.load(model_path)
-    elif algo == "sac":
-        from stable_baselines3 import SAC
-        model = SAC.load(model_path)
-    else:
-        raise ValueError(f"Unsupported algorithm: {algo}")
-    
-    obs, _ = env.reset()
-    total_reward = 0
-    actions = []
-    net_worths = []
-    
-    while True:
-        action, _ = model.predict(obs, deterministic=True)
-        if isinstance(action, np.ndarray):
-             action = action.item()
-        obs, reward, done, truncated, _ = env.step(action)
-        total_reward += reward
-        actions.append(action)
-        net_worths.append(env.net_worth)
-        if done or truncated:
-            break
-    print(f"Starting evaluation with obs shape: {obs.shape}")
-    
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=months * 30)
+    data = fetch_historical_data(ticker, start_date, end_date, interval="1d", context="rl")
+    if data.empty:
+        raise ValueError(f"No data fetched for {ticker}")
+    model = load_model(model_path, algo)
 
+    actions, net_worths, total_reward = rollout_policy(model, [data], continuous=(algo == "sac"))[0]
     print(f"Total Reward: {total_reward}, Actions Taken: {len(actions)}, Net Worths Recorded: {len(net_worths)}")
     
     sharpe_ratio, max_drawdown = calculate_metrics(net_worths)
-    return actions, net_worths, total_reward, sharpe_ratio, max_drawdown
\ No newline at end of file
+    return actions, net_worths, total_reward, sharpe_ratio, max_drawdown
+
+
+@timed("evaluate_model_batch")
+def evaluate_model_batch(tickers, windows=(12,), model_path="models/ppo_model", algo="ppo"):
+    """
+    Score one trained model over many tickers and date windows in a single batched sweep.
+
+    Args:
+        tickers (list): Stock tickers.
+        windows (list): Date windows, each either a number of months back from
+            today or a (start_date, end_date) tuple.
+        model_path (str): Path to the trained model.
+        algo (str): Algorithm used ("ppo" or "sac").
+
+    Returns:
+        pd.DataFrame: One row per (ticker, window) with steps, final net worth,
+        total reward, Sharpe ratio and max drawdown.
+    """
+    end_date = datetime.now()
+    series, datasets = [], []
+    for window in windows:
+        if isinstance(window, tuple):
+            start, end = window
+        else:
+            start, end = end_date - timedelta(days=window * 30), end_date
+        for ticker in tickers:
+            data = fetch_historical_data(ticker, start, end, interval="1d", context="rl")
+            if len(data) < 20:
+                print(f"Evaluation: skipping {ticker} ({start:%Y-%m-%d} to {end:%Y-%m-%d}), not enough data")
+                continue
+            series.append((ticker, start, end))
+            datasets.append(data)
+    if not datasets:
+        return pd.DataFrame()
+
+    model = load_model(model_path, algo)
+    rows = []
+    for (ticker, start, end), (actions, net_worths, total_reward) in zip(
+            series, rollout_policy(model, datasets, continuous=(algo == "sac"))):
+        sharpe_ratio, max_drawdown = calculate_metrics(net_worths)
+        rows.append({
+            'ticker': ticker,
+            'start': start,
+            'end': end,
+            'steps': len(actions),
+            'final_net_worth': net_worths[-1],
+            'total_reward': total_reward,
+            'sharpe_ratio': sharpe_ratio,
+            'max_drawdown': max_drawdown,
+        })
+    return pd.DataFrame(rows)
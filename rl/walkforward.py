@@ -0,0 +1,236 @@
+import argparse
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from data.fetcher import fetch_historical_data
+from rl.features import MIN_ROWS, clean_frame, compute_scales
+
+# Columns the trading environments read
+FOLD_COLUMNS = ['Close', 'MA20', 'MA50', 'RSI', 'MACD', 'MACD_Signal']
+
+# Per-process view of the shared history: (SharedMemory, index, columns array)
+_shared = {}
+
+def make_folds(n_rows, train_size, test_size, step=None, expanding=False):
+    """
+    Split ``n_rows`` bars into rolling train/test folds.
+
+    Each test window directly follows its train window; windows advance by
+    ``step`` bars (the test size by default, so test windows do not overlap).
+
+    Args:
+        n_rows (int): Number of bars.
+        train_size (int): Bars per training window.
+        test_size (int): Bars per out-of-sample window.
+        step (int): Bars between consecutive folds.
+        expanding (bool): Keep every train window starting at bar 0.
+
+    Returns:
+        list: (train_start, train_end, test_start, test_end) row positions, ends exclusive.
+
+    Raises:
+        ValueError: If a window is shorter than an environment accepts.
+    """
+    if min(train_size, test_size) < MIN_ROWS:
+        raise ValueError(f"train_size and test_size must be at least {MIN_ROWS} bars "
+                         f"(got {train_size} and {test_size})")
+    step = step or test_size
+    folds = []
+    start = 0
+    while start + train_size + test_size <= n_rows:
+        train_end = start + train_size
+        folds.append((0 if expanding else start, train_end, train_end, train_end + test_size))
+        start += step
+    return folds
+
+def _attach(name, length, tz):
+    """Pool initializer: map the shared history (timestamps in row 0) into this process."""
+    shm = shared_memory.SharedMemory(name=name)
+    block = np.ndarray((len(FOLD_COLUMNS) + 1, length), dtype=np.float64, buffer=shm.buf)
+    index = pd.DatetimeIndex(block[0].view(np.int64))
+    if tz is not None:
+        index = index.tz_localize("UTC").tz_convert(tz)
+    _shared['history'] = (shm, index, block[1:])
+
+def _fold_frame(start, end):
+    """Bars [start, end) of the shared history as a DataFrame (no copy of the values)."""
+    _, index, values = _shared['history']
+    return pd.DataFrame(values[:, start:end].T, index=index[start:end], columns=FOLD_COLUMNS)
+
+def _run_chain(task):
+    """
+    Train and test a contiguous run of folds in one process.
+
+    The first fold starts from a fresh policy (or ``warm_start_path``); every
+    following fold continues training the previous fold's policy on its own
+    train window.
+    """
+    # Imported here so the pool can start before torch is loaded in the parent
+    from rl.environment import StockTradingEnv
+    from rl.models import create_ppo_model, create_sac_model
+    from rl.trainer import calculate_metrics, load_model, rollout_policy
+
+    folds, ticker, algo, timesteps, initial_balance, save_dir, warm_start_path = task
+    continuous = algo == "sac"
+    model = None if warm_start_path is None else load_model(warm_start_path, algo)
+    rows = []
+    for fold, (train_start, train_end, test_start, test_end) in folds:
+        train = _fold_frame(train_start, train_end)
+        test = _fold_frame(test_start, test_end)
+        env = StockTradingEnv(ticker, continuous=continuous, data=train, initial_balance=initial_balance,
+                              random_start=True)
+        warm = model is not None
+        if model is None:
+            if algo == "ppo":
+                model = create_ppo_model(env, n_steps=max(128, min(4096, timesteps)))
+            else:
+                model = create_sac_model(env)
+        else:
+            model.set_env(env)
+        model.learn(total_timesteps=timesteps, reset_num_timesteps=not warm)
+        if save_dir:
+            model.save(os.path.join(save_dir, f"{ticker}_fold{fold}"))
+
+        # Scale the test bars like the train bars: the test window's own range would leak its future
+        scales = compute_scales(clean_frame(train), initial_balance)
+        _, net_worths, total_reward = rollout_policy(model, [test], continuous=continuous,
+                                                     initial_balance=initial_balance, scales=[scales])[0]
+        sharpe_ratio, max_drawdown = calculate_metrics(net_worths)
+        closes = test['Close'].to_numpy()
+        rows.append({
+            'fold': fold,
+            'train_start': train.index[0].date(),
+            'train_end': train.index[-1].date(),
+            'test_start': test.index[0].date(),
+            'test_end': test.index[-1].date(),
+            'warm_start': warm,
+            'sharpe_ratio': float(sharpe_ratio),
+            'max_drawdown': float(max_drawdown),
+            'total_return': float(net_worths[-1] / initial_balance - 1),
+            'buy_hold_return': float(closes[-1] / closes[0] - 1),
+            'total_reward': float(total_reward),
+        })
+    return rows
+
+def summarize_folds(results):
+    """
+    Aggregate out-of-sample metrics over folds.
+
+    Args:
+        results (pd.DataFrame): Output of ``run_walk_forward``.
+
+    Returns:
+        dict: Fold count, mean/median/std of Sharpe ratio and return, worst
+        drawdown and the share of folds beating buy-and-hold.
+    """
+    if results.empty:
+        return {'folds': 0}
+    return {
+        'folds': len(results),
+        'sharpe_mean': float(results['sharpe_ratio'].mean()),
+        'sharpe_median': float(results['sharpe_ratio'].median()),
+        'sharpe_std': float(results['sharpe_ratio'].std(ddof=0)),
+        'return_mean': float(results['total_return'].mean()),
+        'return_std': float(results['total_return'].std(ddof=0)),
+        'max_drawdown_worst': float(results['max_drawdown'].max()),
+        'beats_buy_hold': float((results['total_return'] > results['buy_hold_return']).mean()),
+    }
+
+def run_walk_forward(ticker, months=60, train_size=252, test_size=63, step=None, expanding=False, algo="ppo",
+                     timesteps=20000, processes=None, initial_balance=5000, save_dir=None, warm_start_path=None):
+    """
+    Walk-forward training and out-of-sample evaluation of an RL policy.
+
+    The history is fetched once and placed in shared memory. Folds are split
+    into contiguous chains, one per worker process; within a chain each fold
+    warm-starts from the previous fold's policy, so chains run in parallel
+    while most folds still build on earlier training.
+
+    Args:
+        ticker (str): Stock ticker.
+        months (int): History to split into folds.
+        train_size (int): Bars per training window.
+        test_size (int): Bars per out-of-sample window.
+        step (int): Bars between folds (defaults to ``test_size``).
+        expanding (bool): Grow the train window from the start of the history.
+        algo (str): "ppo" or "sac".
+        timesteps (int): Training steps per fold.
+        processes (int): Worker processes (defaults to the CPU count).
+        initial_balance (float): Starting cash of every test portfolio.
+        save_dir (str): Optional directory for each fold's model.
+        warm_start_path (str): Optional model the first fold of every chain starts from.
+
+    Returns:
+        pd.DataFrame: One row of out-of-sample metrics per fold.
+    """
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=months * 30)
+    data = fetch_historical_data(ticker, start_date, end_date, interval="1d", context="rl")
+    if data.empty:
+        raise ValueError(f"No data fetched for {ticker}")
+    data = clean_frame(data[FOLD_COLUMNS])
+    folds = list(enumerate(make_folds(len(data), train_size, test_size, step, expanding)))
+    if not folds:
+        raise ValueError(f"{len(data)} bars are too few for {train_size} train + {test_size} test bars")
+    if save_dir:
+        os.makedirs(save_dir, exist_ok=True)
+
+    block = np.vstack([data.index.as_unit("ns").asi8.view(np.float64), data.to_numpy(dtype=np.float64).T])
+    shm = shared_memory.SharedMemory(create=True, size=block.nbytes)
+    try:
+        np.ndarray(block.shape, dtype=np.float64, buffer=shm.buf)[:] = block
+        processes = max(1, min(processes or os.cpu_count() or 1, len(folds)))
+        chains = np.array_split(np.arange(len(folds)), processes)
+        tasks = [
+            ([folds[i] for i in chain], ticker, algo, timesteps, initial_balance, save_dir, warm_start_path)
+            for chain in chains
+        ]
+        shared = (shm.name, block.shape[1], None if data.index.tz is None else str(data.index.tz))
+        if processes == 1:
+            _attach(*shared)
+            rows = _run_chain(tasks[0])
+        else:
+            # Spawned workers, like the training job pool: torch does not survive fork reliably
+            with ProcessPoolExecutor(processes, mp_context=mp.get_context("spawn"), initializer=_attach,
+                                     initargs=shared) as pool:
+                rows = [row for chain_rows in pool.map(_run_chain, tasks) for row in chain_rows]
+    finally:
+        if 'history' in _shared:
+            _shared.pop('history')[0].close()
+        shm.close()
+        shm.unlink()
+    return pd.DataFrame(rows).sort_values('fold').reset_index(drop=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward RL training with out-of-sample evaluation.")
+    parser.add_argument("--ticker", default="NVDA", help="Ticker to train on")
+    parser.add_argument("--months", type=int, default=60, help="History to split into folds")
+    parser.add_argument("--train-size", type=int, default=252, help="Bars per training window")
+    parser.add_argument("--test-size", type=int, default=63, help="Bars per test window")
+    parser.add_argument("--step", type=int, default=None, help="Bars between folds (default: test size)")
+    parser.add_argument("--expanding", action="store_true", help="Expanding instead of rolling train windows")
+    parser.add_argument("--algo", choices=["ppo", "sac"], default="ppo", help="RL algorithm")
+    parser.add_argument("--timesteps", type=int, default=20000, help="Training steps per fold")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--save-dir", default=None, help="Directory for each fold's model")
+    parser.add_argument("--output", default=None, help="Optional CSV path for the per-fold table")
+    args = parser.parse_args(argv)
+
+    results = run_walk_forward(
+        args.ticker, months=args.months, train_size=args.train_size, test_size=args.test_size, step=args.step,
+        expanding=args.expanding, algo=args.algo, timesteps=args.timesteps, processes=args.processes,
+        save_dir=args.save_dir,
+    )
+    print(results.to_string(index=False))
+    for name, value in summarize_folds(results).items():
+        print(f"{name}: {value:.4f}" if isinstance(value, float) else f"{name}: {value}")
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"Walk-forward results saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from data.indicators import add_indicators
+import rl.backtest as backtest
+import rl.sweep as sweep
+from rl.results import ResultsStore
+from rl.metrics import RunningMetrics, compute_metrics, exposure_from_signals
+from rl.trainer import calculate_metrics
+
+def make_data(n=600, seed=1):
+    closes = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.03, n)))
+    return add_indicators(pd.DataFrame({"Close": closes})).dropna()
+
+class TestBacktest(unittest.TestCase):
+    def test_vectorized_matches_per_row(self):
+        data = make_data()
+        with mock.patch.object(backtest, "fetch_historical_data", lambda *args, **kwargs: data.copy()):
+            per_row = backtest.backtest_strategy("NVDA", 12, backtest.rsi_strategy)
+            vectorized = backtest.backtest_strategy("NVDA", 12, backtest.rsi_signals, vectorized=True)
+        self.assertEqual(per_row["actions"], vectorized["actions"])
+        np.testing.assert_allclose(per_row["net_worths"], vectorized["net_worths"])
+        self.assertAlmostEqual(per_row["sharpe_ratio"], vectorized["sharpe_ratio"])
+
+    def test_simulate_without_signals_keeps_cash(self):
+        net_worths = backtest.simulate_signals([10.0, 11.0, 12.0], [0, 0, 0], initial_balance=500)
+        np.testing.assert_array_equal(net_worths, [500.0, 500.0, 500.0])
+
+class TestSweep(unittest.TestCase):
+    def test_sweep_ranks_grid_across_processes(self):
+        datasets = {"NVDA": make_data(seed=1), "AAPL": make_data(seed=2)}
+        fetch = lambda ticker, *args, **kwargs: datasets[ticker].copy()
+        grid = {"window": [14], "lower": [25, 30], "upper": [70, 75]}
+        with mock.patch.object(sweep, "fetch_historical_data", fetch):
+            results = sweep.run_sweep(["NVDA", "AAPL"], grid, processes=2)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(results["sharpe_ratio"].is_monotonic_decreasing)
+
+        # The default 30/70 combination matches a plain vectorized backtest
+        row = results[(results.ticker == "NVDA") & (results.lower == 30) & (results.upper == 70)].iloc[0]
+        with mock.patch.object(backtest, "fetch_historical_data", fetch):
+            expected = backtest.backtest_strategy("NVDA", 12, backtest.rsi_signals, vectorized=True)
+        self.assertAlmostEqual(row["final_net_worth"], expected["final_net_worth"])
+
+class TestMetrics(unittest.TestCase):
+    def test_drawdown_is_peak_based(self):
+        metrics = compute_metrics([100.0, 120.0, 90.0, 130.0, 60.0, 70.0])
+        self.assertAlmostEqual(metrics["max_drawdown"], 70 / 130)
+        self.assertEqual(metrics["max_drawdown_duration"], 2)
+        self.assertAlmostEqual(metrics["hit_rate"], 3 / 5)
+        # A path ending at its peak has no drawdown (max - min would report one)
+        result = backtest.summarize_backtest([100.0, 90.0, 80.0, 150.0], [1, 0, 0, 2])
+        self.assertAlmostEqual(result["max_drawdown"], 0.2)
+
+    def test_sharpe_matches_plain_numpy(self):
+        net_worths = 1000 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, 500)))
+        returns = np.diff(net_worths) / net_worths[:-1]
+        sharpe, drawdown = calculate_metrics(net_worths.tolist())
+        self.assertAlmostEqual(sharpe, returns.mean() / returns.std() * np.sqrt(252))
+        peak = np.maximum.accumulate(net_worths)
+        self.assertAlmostEqual(drawdown, ((peak - net_worths) / peak).max())
+        downside = np.sqrt((np.minimum(returns, 0) ** 2).mean())
+        self.assertAlmostEqual(compute_metrics(net_worths)["sortino_ratio"], returns.mean() / downside * np.sqrt(252))
+        self.assertEqual(calculate_metrics([1000.0] * 10), (0.0, 0.0))
+
+    def test_batch_and_streaming_match_single_runs(self):
+        rng = np.random.default_rng(1)
+        net_worths = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, (4, 300)), axis=1))
+        signals = rng.integers(0, 3, (4, 300))
+        exposure = exposure_from_signals(signals)
+        batch = compute_metrics(net_worths, exposure=exposure)
+        running = RunningMetrics(net_worths[:, 0], initial_exposure=exposure[:, 0])
+        for t in range(1, net_worths.shape[1]):
+            running.update(net_worths[:, t], exposure[:, t])
+        streamed = running.result()
+        for i in range(4):
+            single = compute_metrics(net_worths[i], exposure=exposure[i])
+            for name, value in single.items():
+                self.assertAlmostEqual(batch[name][i], value, places=9, msg=name)
+                self.assertAlmostEqual(streamed[name][i], value, places=9, msg=name)
+
+    def test_exposure_from_signals(self):
+        np.testing.assert_array_equal(exposure_from_signals([0, 1, 0, 0, 2, 0, 1]), [0, 1, 1, 1, 0, 0, 1])
+
+class TestResultsStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = ResultsStore(os.path.join(self.root, "results.db"))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_record_query_and_leaderboard(self):
+        data = make_data()
+        actions = backtest.rsi_signals(data)
+        net_worths = backtest.simulate_signals(data["Close"].to_numpy(), actions)
+        result = backtest.summarize_backtest(net_worths, actions)
+        run_id = self.store.record("NVDA", "RSI", net_worths, actions, params={"lower": 30, "upper": 70},
+                                   start_date=data.index[0], end_date=data.index[-1], months=12, metrics=result)
+        rising = np.linspace(100, 150, 50)
+        self.store.record("NVDA", "PPO", rising)
+        self.store.record("AAPL", "RSI", rising[::-1])
+
+        curve = self.store.curve(run_id)
+        np.testing.assert_array_equal(curve["net_worths"], net_worths)
+        np.testing.assert_array_equal(curve["actions"], actions)
+        self.assertIsNone(self.store.curve(run_id + 100))
+
+        runs = self.store.runs(ticker="NVDA")
+        self.assertEqual(list(runs["strategy"]), ["PPO", "RSI"])
+        rsi = runs.iloc[1]
+        self.assertEqual(rsi["params"], {"lower": 30, "upper": 70})
+        self.assertAlmostEqual(rsi["sharpe_ratio"], result["sharpe_ratio"])
+        self.assertAlmostEqual(rsi["turnover"], result["turnover"])
+        self.assertEqual(len(self.store.runs(strategy="RSI")), 2)
+
+        board = self.store.leaderboard("sharpe_ratio")
+        self.assertEqual(board["strategy"].iloc[0], "PPO")
+        self.assertEqual(self.store.leaderboard("max_drawdown", limit=1)["strategy"].iloc[0], "PPO")
+        with self.assertRaises(ValueError):
+            self.store.leaderboard("net_worths")
+
+if __name__ == '__main__':
+    unittest.main()
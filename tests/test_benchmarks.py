@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from benchmarks import run as benchmarks
+
+class TestBenchmarks(unittest.TestCase):
+    def test_small_run_reports_every_benchmark(self):
+        with mock.patch.object(benchmarks, "ENV_STEPS", 500):
+            report = benchmarks.run_benchmarks([400], repeat=1)
+        names = {name.split("@")[0] for name in report["results"]}
+        self.assertEqual(names, {"fetch_cold", "fetch_warm", "fetch_hot", "add_indicators", "env_build", "env_step",
+                                 "backtest_vectorized", "backtest_rsi_strategy", "calculate_metrics",
+                                 "create_rl_chart", "create_stock_chart"})
+        self.assertEqual(report["results"]["env_build@400"]["rows"], 400)
+
+    def test_regression_against_baseline_fails_the_run(self):
+        baseline = {"results": {"env_step@1000": {"seconds": 1.0}, "fetch_hot@1000": {"seconds": 1.0}}}
+        current = {"meta": {}, "results": {"env_step@1000": {"seconds": 1.2, "rows": 1},
+                                           "fetch_hot@1000": {"seconds": 1.5, "rows": 1}}}
+        regressions, missing = benchmarks.compare(current, baseline, tolerance=0.25)
+        self.assertEqual([r[0] for r in regressions], ["fetch_hot@1000"])
+        self.assertEqual(missing, [])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            with open(path, "w") as f:
+                json.dump(baseline, f)
+            with mock.patch.object(benchmarks, "run_benchmarks", lambda *args: current):
+                code = benchmarks.main(["--sizes", "1000", "--output", os.path.join(tmp, "out.json"),
+                                        "--baseline", path])
+        self.assertEqual(code, 1)
+
+    def test_benchmarks_missing_from_baseline_fail_the_run(self):
+        baseline = {"results": {"env_step@1000": {"seconds": 1.0}}}
+        current = {"meta": {}, "results": {"env_step@1000": {"seconds": 1.0, "rows": 1},
+                                           "create_rl_chart@1000000": {"seconds": 2.0, "rows": 1}}}
+        self.assertEqual(benchmarks.compare(current, baseline), ([], ["create_rl_chart@1000000"]))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            with open(path, "w") as f:
+                json.dump(baseline, f)
+            with mock.patch.object(benchmarks, "run_benchmarks", lambda *args: current):
+                code = benchmarks.main(["--output", os.path.join(tmp, "out.json"), "--baseline", path])
+        self.assertEqual(code, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+from components.downsample import chart_indices, lttb_indices, minmax_indices, visible_range
+from components.figure_cache import FigureCache
+from data import fetcher
+from data.providers import SyntheticProvider
+from rl.rl_visualizer import create_rl_chart
+
+def _bars(n):
+    index = pd.date_range("2023-01-02 09:30", periods=n, freq="min", tz="America/New_York")
+    close = 100 + np.cumsum(np.random.default_rng(0).standard_normal(n))
+    return pd.DataFrame({"Close": close, "RSI": np.linspace(0, 100, n)}, index=index)
+
+class TestDownsampling(unittest.TestCase):
+    def test_lttb_keeps_endpoints_and_bound(self):
+        data = _bars(10_000)
+        kept = lttb_indices(data.index, data["Close"], 500)
+        self.assertLessEqual(len(kept), 500)
+        self.assertEqual(kept[0], 0)
+        self.assertEqual(kept[-1], len(data) - 1)
+        self.assertTrue(np.all(np.diff(kept) > 0))
+
+    def test_minmax_keeps_extremes(self):
+        y = np.zeros(10_000)
+        y[1234], y[8765] = 50.0, -50.0
+        kept = minmax_indices(y, 100)
+        self.assertLessEqual(len(kept), 102)
+        self.assertIn(1234, kept)
+        self.assertIn(8765, kept)
+
+    def test_short_series_untouched(self):
+        data = _bars(100)
+        np.testing.assert_array_equal(chart_indices(data, ["Close"], max_points=2000), np.arange(100))
+
+    def test_zoomed_window_gets_full_detail(self):
+        data = _bars(50_000)
+        x_range = (data.index[20_000].tz_localize(None), data.index[20_999].tz_localize(None))
+        rows = chart_indices(data, ["Close"], x_range, max_points=2000)
+        inside = rows[(rows >= 20_000) & (rows <= 20_999)]
+        self.assertEqual(len(inside), 1000)
+        self.assertLess(len(rows), 2000)
+        self.assertIn(0, rows)
+        self.assertIn(len(data) - 1, rows)
+
+    def test_visible_range(self):
+        self.assertIsNone(visible_range(None))
+        self.assertIsNone(visible_range({"xaxis.autorange": True}))
+        self.assertIsNone(visible_range({"dragmode": "pan"}))
+        start, end = visible_range({"xaxis.range[0]": "2023-01-02 10:00", "xaxis.range[1]": "2023-01-03"})
+        self.assertEqual(start, pd.Timestamp("2023-01-02 10:00"))
+        self.assertEqual(end, pd.Timestamp("2023-01-03"))
+        self.assertEqual(visible_range({"xaxis.range": ["2023-01-02", "2023-01-05"]})[1], pd.Timestamp("2023-01-05"))
+
+    def test_rl_chart_is_bounded(self):
+        data = _bars(100_000)
+        data["MACD"] = data["MACD_Signal"] = 0.0
+        net_worths = np.linspace(5000, 6000, len(data) - 1)
+        actions = np.random.default_rng(1).integers(0, 3, len(data)).tolist()
+        fig = create_rl_chart(actions, net_worths, data, "TEST", ["RSI", "MACD"], max_points=1000)
+        self.assertEqual(len(fig.data), 7)
+        for trace in fig.data:
+            self.assertLessEqual(len(trace.x), 1000)
+        markers = {trace.name: trace for trace in fig.data}
+        self.assertLessEqual(len(markers["Buy"].x), 1000)
+        self.assertEqual(markers["Net Worth"].y[-1], net_worths[-1])
+
+class TestFigureCache(unittest.TestCase):
+    def test_hit_returns_serialized_figure(self):
+        cache = FigureCache()
+        fig = go.Figure(go.Scatter(x=[1, 2, 3], y=[4.0, 5.0, 6.0], name="Close"))
+        self.assertIsNone(cache.get(("NVDA", 12)))
+        cache.put(("NVDA", 12), fig)
+        # A hit neither parses nor encodes: it is the dict converted once by put
+        with mock.patch("components.figure_cache.json.loads", side_effect=AssertionError("parsed on hit")), \
+             mock.patch.object(go.Figure, "to_json", side_effect=AssertionError("encoded on hit")):
+            cached = cache.get(("NVDA", 12))
+            self.assertIs(cache.get(("NVDA", 12)), cached)
+        self.assertEqual(cached["data"][0]["y"], [4.0, 5.0, 6.0])
+        self.assertEqual(go.Figure(cached).data[0].name, "Close")
+        self.assertEqual(cache.info()["hits"], 2)
+        self.assertEqual(cache.info()["misses"], 1)
+        self.assertEqual(cache.info()["bytes"], len(fig.to_json()))
+
+    def test_memory_bound_evicts_oldest(self):
+        fig = go.Figure(go.Scatter(y=np.arange(1000.0)))
+        size = len(fig.to_json())
+        cache = FigureCache(max_bytes=int(size * 2.5))
+        for key in range(3):
+            cache.put(key, fig)
+        self.assertIsNone(cache.get(0))
+        self.assertIsNotNone(cache.get(2))
+        self.assertLessEqual(cache.info()["bytes"], size * 2.5)
+
+    def test_generation_changes_when_bars_land(self):
+        root = tempfile.mkdtemp()
+        previous = fetcher.set_provider(SyntheticProvider(), store_dir=root)
+        try:
+            before = fetcher.data_generation("NVDA", "1d")
+            fetcher.fetch_historical_data("NVDA", datetime(2023, 1, 1), datetime(2023, 6, 1))
+            after = fetcher.data_generation("NVDA", "1d")
+            self.assertNotEqual(before, after)
+            # Served from memory: nothing new landed
+            fetcher.fetch_historical_data("NVDA", datetime(2023, 1, 1), datetime(2023, 6, 1))
+            self.assertEqual(fetcher.data_generation("NVDA", "1d"), after)
+            self.assertEqual(fetcher.data_generation("AAPL", "1d"), before)
+        finally:
+            fetcher.set_provider(previous)
+            shutil.rmtree(root)
+
+if __name__ == "__main__":
+    unittest.main()
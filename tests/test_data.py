@@ -0,0 +1,296 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from data import fetcher
+from data.barframe import BAR_COLUMNS, BarFrame
+from data.cache import snap_range
+from data.indicators import INDICATOR_COLUMNS, IndicatorState, add_indicators
+from data.providers import ReplayProvider, SyntheticProvider
+from data.store import BarStore
+from utils import helpers
+
+def make_bars(start, end):
+    index = pd.bdate_range(pd.Timestamp(start).normalize(), pd.Timestamp(end), inclusive="left", tz="America/New_York")
+    close = 100 + np.arange(len(index), dtype=float)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": np.full(len(index), 1000)}, index=index)
+
+class TestBarStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def download(self, ticker, start, end, interval):
+        self.calls.append((start, end))
+        return make_bars(start, end)
+
+    def test_only_missing_ranges_are_downloaded(self):
+        end = datetime(2024, 6, 3)
+        store = BarStore(self.root)
+        first = store.load("NVDA", end - timedelta(days=90), end, "1d", self.download)
+        self.assertFalse(first.empty)
+        self.assertEqual(len(self.calls), 1)
+
+        # A fresh store instance (cold restart) serves the same range from disk
+        again = BarStore(self.root).load("NVDA", end - timedelta(days=60), end, "1d", self.download)
+        self.assertEqual(len(self.calls), 1)
+        self.assertTrue(again.index.isin(first.index).all())
+
+        # A wider request only downloads the missing head (plus indicator warm-up)
+        wide = BarStore(self.root).load("NVDA", end - timedelta(days=365), end, "1d", self.download)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.calls[-1][1], self.calls[0][0])
+        self.assertFalse(wide[["MA50", "MACD_Signal"]].isna().any().any())
+
+    def test_failed_download_serves_stored_bars(self):
+        store = BarStore(self.root)
+        stored = store.load("NVDA", datetime(2024, 1, 2), datetime(2024, 5, 1), "1d", self.download)
+
+        def offline(*args):
+            raise ConnectionError("offline")
+
+        data = store.load("NVDA", datetime(2024, 1, 2), datetime(2024, 6, 3), "1d", offline)
+        self.assertEqual(len(data), len(stored))
+        # The missing tail was not marked as covered, so it is downloaded once back online
+        calls = len(self.calls)
+        self.assertGreater(len(store.load("NVDA", datetime(2024, 1, 2), datetime(2024, 6, 3), "1d",
+                                          self.download)), len(stored))
+        self.assertEqual(len(self.calls), calls + 1)
+
+    def test_appended_bars_update_indicators_incrementally(self):
+        store = BarStore(self.root)
+        store.load("NVDA", datetime(2024, 1, 2), datetime(2024, 5, 1), "1d", self.download)
+        store.load("NVDA", datetime(2024, 1, 2), datetime(2024, 6, 3), "1d", self.download)
+        data = pd.read_parquet(os.path.join(self.root, "1d", "NVDA.parquet"))
+        expected = add_indicators(data[["Close"]].copy())
+        np.testing.assert_allclose(data[INDICATOR_COLUMNS].values, expected[INDICATOR_COLUMNS].values, rtol=1e-9)
+
+class TestBarFrame(unittest.TestCase):
+    def test_compact_read_only_views(self):
+        data = add_indicators(make_bars(datetime(2023, 1, 1), datetime(2024, 1, 1)))
+        data["Dividends"] = 0.0
+        bars = BarFrame.from_frame(data)
+        self.assertEqual(bars.columns, BAR_COLUMNS)
+        self.assertEqual(len(bars), len(data.dropna()))
+        self.assertEqual(bars["Close"].dtype, np.float32)
+        self.assertEqual(bars["Volume"].dtype, np.float64)
+        self.assertLess(bars.nbytes * 2, data.memory_usage().sum())
+        with self.assertRaises(ValueError):
+            bars["Close"][0] = 0.0
+
+        window = bars.between(datetime(2023, 6, 1), datetime(2023, 7, 1))
+        self.assertEqual(len(window), 22)
+        self.assertTrue(np.shares_memory(window["Close"], bars["Close"]))
+        np.testing.assert_array_equal(window.timestamps, data.loc["2023-06"].index.asi8)
+        frame = window.to_frame()
+        pd.testing.assert_frame_equal(frame, data.loc["2023-06", BAR_COLUMNS].astype("float64"), rtol=1e-6,
+                                      check_freq=False)
+
+    def test_fetch_bars_shares_the_cached_frame(self):
+        root = tempfile.mkdtemp()
+        previous = fetcher.set_provider(SyntheticProvider(), store_dir=root)
+        try:
+            wide = fetcher.fetch_bars("NVDA", datetime(2023, 1, 1), datetime(2023, 12, 1))
+            narrow = fetcher.fetch_bars("NVDA", datetime(2023, 6, 1), datetime(2023, 9, 1))
+            self.assertTrue(np.shares_memory(wide["Close"], narrow["Close"]))
+            panel = fetcher.fetch_historical_data("NVDA", datetime(2023, 6, 1), datetime(2023, 9, 1))
+            self.assertEqual(len(panel), len(narrow))
+            self.assertNotIn("Dividends", panel)
+        finally:
+            fetcher.set_provider(previous)
+            shutil.rmtree(root)
+
+class TestIndicatorState(unittest.TestCase):
+    def test_resumed_updates_match_full_recompute(self):
+        closes = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.02, 300)))
+        expected = add_indicators(pd.DataFrame({"Close": closes}))[INDICATOR_COLUMNS].values
+        state = IndicatorState.from_dict(IndicatorState.from_closes(closes[:200]).to_dict())
+        resumed = np.array([state.update(c) for c in closes[200:]])
+        np.testing.assert_allclose(resumed, expected[200:], rtol=1e-9)
+
+class TestRangeCache(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.downloads = 0
+        fetcher.clear_fetch_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        fetcher.clear_fetch_cache()
+
+    def download(self, ticker, start, end, interval):
+        self.downloads += 1
+        return make_bars(start, end)
+
+    def test_snap_range_is_stable_within_a_day(self):
+        a = snap_range(datetime(2024, 6, 8, 9, 30) - timedelta(days=90), datetime(2024, 6, 8, 9, 30))
+        b = snap_range(datetime(2024, 6, 8, 15, 1) - timedelta(days=90), datetime(2024, 6, 8, 15, 1))
+        self.assertEqual(a, b)
+        self.assertLess(a[0].weekday(), 5)
+
+    def test_narrower_windows_share_one_download(self):
+        end = datetime.now()
+        with mock.patch.object(fetcher, "_store", BarStore(self.root)), \
+             mock.patch.object(fetcher, "_download", self.download):
+            wide = fetcher.fetch_historical_data("NVDA", end - timedelta(days=360), end, context="chart")
+            for months in (6, 3):
+                start = datetime.now() - timedelta(days=months * 30)
+                narrow = fetcher.fetch_historical_data("NVDA", start, datetime.now(), context="rl")
+                self.assertLess(len(narrow), len(wide))
+        self.assertEqual(self.downloads, 1)
+        info = fetcher.fetch_cache_info()
+        self.assertEqual((info["hits"], info["misses"]), (2, 1))
+
+class TestFetchMany(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.attempts = {}
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+        fetcher.clear_fetch_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        fetcher.clear_fetch_cache()
+
+    def download(self, ticker, start, end, interval):
+        with self.lock:
+            self.attempts[ticker] = self.attempts.get(ticker, 0) + 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(0.05)
+            if ticker == "MSFT" and self.attempts[ticker] == 1:
+                raise ConnectionError("connection reset")
+            if ticker == "FAKE":
+                return pd.DataFrame()
+            bars = make_bars(start, end)
+            return bars.iloc[::2] if ticker == "AAPL" else bars
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def test_panel_aligns_tickers_under_concurrency_limit(self):
+        end = datetime(2024, 6, 3)
+        with mock.patch.object(fetcher, "_store", BarStore(self.root)), \
+             mock.patch.object(fetcher, "_download", self.download):
+            panel = fetcher.fetch_many(["NVDA", "AAPL", "MSFT", "FAKE", "NVDA"], end - timedelta(days=360), end,
+                                       max_workers=2, retries=1, backoff=0)
+        self.assertEqual(list(panel.columns.unique(level=0)), ["NVDA", "AAPL", "MSFT"])
+        self.assertEqual(panel.columns.names, ["Ticker", "Field"])
+        self.assertEqual(self.peak, 2)
+        self.assertEqual(self.attempts, {"NVDA": 1, "AAPL": 1, "MSFT": 2, "FAKE": 2})
+        # Rows are the union of all timestamps; AAPL has gaps where it has no bars
+        self.assertEqual(len(panel), panel["NVDA"]["Close"].notna().sum())
+        self.assertTrue(panel["AAPL"]["Close"].isna().any())
+        pd.testing.assert_series_equal(panel["MSFT"]["Close"], panel["NVDA"]["Close"], check_names=False)
+
+class TestProviders(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_synthetic_bars_do_not_depend_on_the_window(self):
+        provider = SyntheticProvider(seed=3)
+        year = provider.history("NVDA", datetime(2023, 1, 1), datetime(2024, 1, 1))
+        month = provider.history("NVDA", datetime(2023, 6, 1), datetime(2023, 7, 1))
+        self.assertEqual(len(month), 22)
+        pd.testing.assert_frame_equal(year.loc[month.index], month)
+        self.assertFalse(year["Close"].equals(provider.history("AAPL", datetime(2023, 1, 1), datetime(2024, 1, 1))["Close"]))
+        # Intraday bars end each session on the daily close
+        minutes = provider.history("NVDA", datetime(2023, 6, 1), datetime(2023, 6, 3), "1m")
+        self.assertEqual(len(minutes), 2 * 390)
+        self.assertAlmostEqual(minutes["Close"].iloc[-1], month.loc["2023-06-02", "Close"])
+
+    def test_fetch_through_replay_provider(self):
+        bars = SyntheticProvider().history("NVDA", datetime(2022, 1, 1), datetime(2024, 1, 1))
+        replay = ReplayProvider(os.path.join(self.root, "replay"))
+        replay.record("NVDA", bars)
+        previous = fetcher.set_provider(replay, store_dir=os.path.join(self.root, "bars"))
+        try:
+            data = fetcher.fetch_historical_data("NVDA", datetime(2023, 3, 1), datetime(2023, 9, 1))
+            self.assertIs(fetcher.get_provider(), replay)
+        finally:
+            fetcher.set_provider(previous)
+        self.assertEqual(data.index[0], bars.index[bars.index >= "2023-03-01"][0])
+        pd.testing.assert_series_equal(data["Close"], bars["Close"].loc[data.index])
+        self.assertTrue(set(INDICATOR_COLUMNS) <= set(data.columns))
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.previous = fetcher.set_provider(SyntheticProvider(), store_dir=os.path.join(self.root, "bars"))
+
+    def tearDown(self):
+        fetcher.set_provider(self.previous)
+        shutil.rmtree(self.root)
+
+    def test_chunked_formats_match_one_frame(self):
+        chunks = list(helpers.iter_export_frames(["NVDA", "AAPL", "UNKNOWN"], 12, chunk_rows=100))
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+        full = pd.concat(chunks, ignore_index=True)
+        self.assertEqual(list(full.columns), helpers.EXPORT_COLUMNS)
+        self.assertEqual(list(full["Ticker"].unique()), ["NVDA", "AAPL"])
+
+        csv = b"".join(helpers.iter_export_bytes(["NVDA", "AAPL"], 12, "csv", chunk_rows=100)).decode()
+        # Each export refreshes today's bar, which may move moving averages in the last bits
+        pd.testing.assert_frame_equal(pd.read_csv(io.StringIO(csv)), pd.read_csv(io.StringIO(full.to_csv(index=False))))
+
+        path = os.path.join(self.root, "export.parquet")
+        self.assertEqual(helpers.write_export(["NVDA", "AAPL"], 12, path, "parquet", chunk_rows=100), len(full))
+        self.assertEqual(helpers.pq.ParquetFile(path).num_row_groups, len(chunks))
+        pd.testing.assert_frame_equal(pd.read_parquet(path), full, check_dtype=False)
+
+        stream = b"".join(helpers.iter_export_bytes(["NVDA", "AAPL"], 12, "arrow", chunk_rows=100))
+        table = helpers.pa.ipc.open_stream(stream).read_all()
+        self.assertEqual(table.num_rows, len(full))
+
+    def test_export_keeps_provider_values(self):
+        def download(ticker, start, end, interval):
+            bars = make_bars(start, end)
+            # Neither value survives a float32 round trip
+            bars["Open"] = 123.45
+            bars["Volume"] = 234567891  # > 2 ** 24
+            return bars
+
+        path = os.path.join(self.root, "export.csv")
+        with mock.patch.object(fetcher, "_download", download):
+            # Warm the float32 cache first: exports must not be served from it
+            self.assertFalse(fetcher.fetch_bars("NVDA", datetime.now() - timedelta(days=360), datetime.now()).empty)
+            rows = helpers.write_export(["NVDA"], 12, path, "csv")
+        data = pd.read_csv(path)
+        self.assertEqual(len(data), rows)
+        self.assertGreater(rows, 200)
+        self.assertTrue((data["Volume"] == 234567891).all())
+        self.assertTrue((data["Open"] == 123.45).all())
+
+    def test_export_route(self):
+        import flask
+        server = flask.Flask(__name__)
+        helpers.install_export_routes(server)
+        client = server.test_client()
+        response = client.get("/export?tickers=NVDA&months=6&format=csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("attachment", response.headers["Content-Disposition"])
+        self.assertTrue(response.get_data(as_text=True).startswith("Ticker,Date,Open"))
+        response = client.get("/export?tickers=NVDA&months=6&format=parquet")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(response.get_data()), 0)
+        response.close()
+        self.assertEqual(client.get("/export?tickers=NVDA&format=xlsx").status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
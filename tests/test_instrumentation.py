@@ -0,0 +1,68 @@
+import json
+import unittest
+import flask
+from utils import instrumentation
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.reset()
+
+    def test_spans_aggregate_into_histograms(self):
+        @instrumentation.timed("work")
+        def work(seconds):
+            instrumentation.record("inner", seconds)
+            return seconds
+
+        for seconds in (0.001, 0.002, 0.004, 0.2):
+            work(seconds)
+        timer = instrumentation.SampledTimer("hot", every=10)
+        for _ in range(100):
+            timer.stop(timer.start())
+
+        data = instrumentation.snapshot()
+        self.assertEqual(data["work"]["count"], 4)
+        self.assertEqual(data["hot"]["count"], 10)
+        self.assertAlmostEqual(data["inner"]["sum"], 0.207)
+        self.assertEqual(data["inner"]["p50"], 0.0025)
+        self.assertEqual(data["inner"]["p99"], 0.2)
+
+        # Snapshots from worker processes add up
+        instrumentation.merge({"inner": data["inner"]})
+        self.assertEqual(instrumentation.snapshot()["inner"]["count"], 8)
+        text = instrumentation.render_prometheus()
+        self.assertIn('stock_inner_seconds_bucket{le="+Inf"} 8', text)
+        self.assertIn("stock_work_seconds_count 4", text)
+
+    def test_metrics_routes_and_single_request_profile(self):
+        server = flask.Flask(__name__)
+
+        @server.route("/_dash-update-component", methods=["POST"])
+        def callback():
+            with instrumentation.span("callback.chart"):
+                with instrumentation.span("fetch_historical_data"):
+                    sum(range(1000))
+            return "{}"
+
+        instrumentation.install_metrics_routes(server, profiling=True)
+        client = server.test_client()
+        client.post("/_dash-update-component", json={"output": "stock-chart.figure"})
+        self.assertIsNone(json.loads(client.get("/metrics/profile").data))
+
+        client.get("/metrics/profile?arm=1")
+        client.post("/_dash-update-component", json={"output": "stock-chart.figure"})
+        report = json.loads(client.get("/metrics/profile").data)
+        self.assertEqual(report["label"], "stock-chart.figure")
+        self.assertEqual([(s["name"], s["depth"]) for s in report["spans"]],
+                         [("callback.chart", 0), ("fetch_historical_data", 1)])
+        self.assertIn("cumulative", report["profile"])
+
+        metrics = json.loads(client.get("/metrics?format=json").data)
+        self.assertEqual(metrics["dash.request"]["count"], 2)
+        self.assertEqual(metrics["callback.chart"]["count"], 2)
+        self.assertIn("stock_dash_request_seconds_count 2", client.get("/metrics").data.decode())
+
+if __name__ == '__main__':
+    unittest.main()
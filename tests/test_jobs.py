@@ -0,0 +1,69 @@
+import time
+import unittest
+from rl.jobs import TrainingJobManager
+
+def stub_train(ticker, months, algo, total_timesteps, save_path, progress_callback=None, hold=0, **kwargs):
+    # Stands in for train_model in the spawned workers (must be importable there)
+    progress_callback(50, "00:00:01")
+    time.sleep(hold)
+    if ticker == "FAIL":
+        raise ValueError(f"No data fetched for {ticker}")
+    return [0, 1, 2], [10000.0, 10100.0, 10050.0], 0.5, 1.2, -0.01
+
+def wait_for(manager, job_id, states, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = manager.status(job_id)
+        if status["state"] in states:
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} never reached {states}: {manager.status(job_id)}")
+
+class TestTrainingJobManager(unittest.TestCase):
+    def setUp(self):
+        self.manager = TrainingJobManager(max_workers=1, max_queued=1, train_func=stub_train)
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_submit_and_status(self):
+        job_id = self.manager.submit("NVDA", months=6, total_timesteps=100)
+        status = wait_for(self.manager, job_id, ("done", "failed"))
+        self.assertEqual(status["state"], "done")
+        self.assertEqual(status["progress"], 100)
+        self.assertEqual(status["result"]["net_worths"], [10000.0, 10100.0, 10050.0])
+        self.assertEqual(status["result"]["actions"], [0, 1, 2])
+        self.assertAlmostEqual(status["result"]["sharpe_ratio"], 1.2)
+        self.assertEqual(self.manager.status("missing")["state"], "unknown")
+
+    def test_progress_is_published_through_manager_dict(self):
+        job_id = self.manager.submit("NVDA", total_timesteps=100, hold=2)
+        status = wait_for(self.manager, job_id, ("running",))
+        deadline = time.time() + 10
+        while status.get("progress") != 50 and time.time() < deadline:
+            time.sleep(0.05)
+            status = self.manager.status(job_id)
+        self.assertEqual(status["progress"], 50)
+        self.assertEqual(status["eta"], "00:00:01")
+        self.assertEqual(self.manager._status[job_id]["progress"], 50)
+        self.assertEqual(wait_for(self.manager, job_id, ("done",))["state"], "done")
+
+    def test_full_queue_rejects_jobs(self):
+        running = self.manager.submit("NVDA", total_timesteps=100, hold=1)
+        queued = self.manager.submit("AAPL", total_timesteps=100)
+        self.assertEqual(self.manager.status(queued)["state"], "queued")
+        with self.assertRaises(RuntimeError):
+            self.manager.submit("MSFT", total_timesteps=100)
+        wait_for(self.manager, queued, ("done",))
+        self.assertEqual(self.manager.status(running)["state"], "done")
+        self.manager.submit("MSFT", total_timesteps=100)
+
+    def test_failed_job_reports_error(self):
+        job_id = self.manager.submit("FAIL", total_timesteps=100)
+        status = wait_for(self.manager, job_id, ("done", "failed"))
+        self.assertEqual(status["state"], "failed")
+        self.assertEqual(status["error"], "No data fetched for FAIL")
+        self.assertNotIn("result", status)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from data import fetcher
+from data.indicators import add_indicators
+from data.live import LiveHub, completed_bars
+from data.providers import SyntheticProvider
+from components.plots import create_live_chart, live_extend_data
+
+class TestLiveHub(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.provider = SyntheticProvider(seed=3)
+        self.previous = fetcher.set_provider(self.provider, store_dir=self.root)
+        self.now = pd.Timestamp("2024-03-06 10:00:30")
+        self.downloads = []
+
+        def download(*args):
+            self.downloads.append(args)
+            return self.provider.history(*args)
+        self.hub = LiveHub(interval="1m", clock=lambda: self.now, poll_seconds=0, history_days=3, download=download)
+
+    def tearDown(self):
+        fetcher.set_provider(self.previous)
+        shutil.rmtree(self.root)
+
+    def test_only_completed_bars(self):
+        bars = self.provider.history("NVDA", "2024-03-06", "2024-03-07", "1m")
+        done = completed_bars(bars, self.now, pd.Timedelta(minutes=1))
+        self.assertEqual(done.index[-1].tz_localize(None), pd.Timestamp("2024-03-06 09:59"))
+
+    def test_incremental_indicators_match_full_recompute(self):
+        data = self.hub.updates("NVDA")
+        self.assertEqual(data.index[-1].tz_localize(None), pd.Timestamp("2024-03-06 09:59"))
+        cursor = data.index[-1].isoformat()
+
+        self.now = pd.Timestamp("2024-03-06 10:45:10")
+        rows = self.hub.updates("NVDA", cursor)
+        self.assertEqual(len(rows), 45)
+        self.assertEqual(len(self.downloads), 1)
+        self.assertTrue(rows.index[0] > data.index[-1])
+
+        # Same values as recomputing the indicators over the whole history
+        full = self.provider.history("NVDA", "2024-03-01", "2024-03-06 10:45", "1m")
+        expected = add_indicators(full.copy()).loc[rows.index]
+        for column in ["MA20", "MA50", "RSI", "MACD", "MACD_Signal"]:
+            np.testing.assert_allclose(rows[column], expected[column], rtol=1e-6)
+
+        # Nothing new: empty update
+        self.assertTrue(self.hub.updates("NVDA", rows.index[-1].isoformat()).empty)
+
+    def test_streamed_indicators_continue_the_full_history(self):
+        # Hourly bars: the 3-day seed window alone is too short to warm up MA50/RSI/MACD
+        fetcher.fetch_historical_data("NVDA", "2024-01-02", self.now, interval="1h", exact=True)
+        hub = LiveHub(interval="1h", clock=lambda: self.now, poll_seconds=0, history_days=3)
+        cursor = hub.updates("NVDA").index[-1].isoformat()
+        self.now = pd.Timestamp("2024-03-08 16:00")
+        rows = hub.updates("NVDA", cursor)
+        self.assertEqual(len(rows), 20)
+
+        full = self.provider.history("NVDA", "2023-11-01", "2024-03-08 16:00", "1h")
+        expected = add_indicators(full.copy()).loc[rows.index]
+        for column in ["MA20", "MA50", "RSI", "MACD", "MACD_Signal"]:
+            np.testing.assert_allclose(rows[column], expected[column], rtol=1e-6)
+
+    def test_polls_are_throttled(self):
+        self.hub.poll_seconds = 3600
+        self.hub.updates("NVDA")
+        self.now = pd.Timestamp("2024-03-06 11:00")
+        self.hub.updates("NVDA")
+        self.assertEqual(self.downloads, [])
+
+    def test_extend_data_matches_figure_traces(self):
+        data = self.hub.updates("NVDA")
+        fig = create_live_chart(data, "NVDA", ["RSI", "MACD"], window=100)
+        self.assertEqual(len(fig.data), 4)
+        self.assertEqual(len(fig.data[0].x), 100)
+        update, traces, max_points = live_extend_data(data.iloc[-3:], ["RSI", "MACD"], window=100)
+        self.assertEqual(traces, [0, 1, 2, 3])
+        self.assertEqual(max_points, 100)
+        self.assertEqual(update["x"][0], list(fig.data[0].x[-3:]))
+        self.assertEqual(update["y"][0], list(fig.data[0].y[-3:]))
+
+if __name__ == "__main__":
+    unittest.main()
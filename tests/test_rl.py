@@ -1,8 +1,45 @@
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
 import unittest
+from unittest import mock
 import numpy as np
+import pandas as pd
+from data import fetcher
+from data.indicators import add_indicators
+from data.providers import SyntheticProvider
 from rl.environment import StockTradingEnv
+from rl.batched_env import BatchedTradingEnv
+from rl.backtest import backtest_features, backtest_strategy, rsi_signals
+from rl.feature_store import FeatureSet, write_feature_set
+from rl.features import compute_scales
+from rl.portfolio_env import PortfolioEnv
+import rl.walkforward as walkforward
+from rl.models import create_ppo_model
+from rl.registry import ModelRegistry, file_hash
+import rl.trainer as trainer
+from utils.file_lock import file_lock
+
+def make_data(n=300, seed=0):
+    closes = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.02, n)))
+    index = pd.bdate_range("2020-01-01", periods=n)
+    return add_indicators(pd.DataFrame({"Close": closes}, index=index)).dropna()
 
 class TestRLComponents(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Serve generated bars instead of downloading them
+        cls.store_dir = tempfile.mkdtemp()
+        cls.previous_provider = fetcher.set_provider(SyntheticProvider(seed=0), store_dir=cls.store_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        fetcher.set_provider(cls.previous_provider)
+        shutil.rmtree(cls.store_dir)
+
     def test_environment(self):
         env = StockTradingEnv(ticker="NVDA", months=3)
         obs, _ = env.reset()
@@ -21,5 +58,310 @@ class TestRLComponents(unittest.TestCase):
         self.assertIsInstance(done, bool)
         self.assertIsInstance(truncated, bool)
 
+    def test_environment_reward_matches_rolling_sharpe(self):
+        env = StockTradingEnv(ticker="NVDA", data=make_data())
+        env.reset()
+        rng = np.random.default_rng(1)
+        net_worths = []
+        done = False
+        while not done:
+            _, reward, done, _, _ = env.step(int(rng.integers(0, 3)))
+            net_worths.append(env.net_worth)
+            if len(net_worths) > 20:
+                returns = pd.Series(net_worths[-20:]).pct_change().dropna()
+                expected = np.mean(returns) / np.std(returns) * np.sqrt(252) if np.std(returns) > 0 else 0
+                self.assertAlmostEqual(reward, expected, places=6)
+        self.assertEqual(len(net_worths), env.max_steps)
+
+    def test_batched_env_mirrors_single_envs(self):
+        datasets = [make_data(seed=0), make_data(n=250, seed=1)]
+        batched = BatchedTradingEnv(datasets, 4)
+        envs = [StockTradingEnv(ticker="NVDA", data=datasets[i % 2]) for i in range(4)]
+        obs = batched.reset()
+        np.testing.assert_array_equal(obs, np.stack([env.reset()[0] for env in envs]))
+        rng = np.random.default_rng(2)
+        for _ in range(300):
+            actions = rng.integers(0, 3, 4)
+            obs, rewards, dones, infos = batched.step(actions)
+            for i, env in enumerate(envs):
+                expected_obs, reward, done, _, _ = env.step(int(actions[i]))
+                self.assertAlmostEqual(rewards[i], reward, places=3)
+                self.assertEqual(dones[i], done)
+                if done:
+                    np.testing.assert_array_equal(infos[i]["terminal_observation"], expected_obs)
+                    env.reset()
+                else:
+                    np.testing.assert_array_equal(obs[i], expected_obs)
+
+    def test_train_model_with_env_pool(self):
+        datasets = {"NVDA": make_data(seed=0), "AAPL": make_data(seed=1)}
+        fetch = lambda ticker, *args, **kwargs: datasets[ticker].copy()
+        with tempfile.TemporaryDirectory() as tmp, \
+             mock.patch.object(trainer, "fetch_historical_data", fetch), \
+             mock.patch.object(trainer, "_registry", ModelRegistry(tmp)):
+            actions, net_worths, _, _, _ = trainer.train_model(
+                "NVDA", total_timesteps=256, save_path=os.path.join(tmp, "ppo_NVDA"),
+                n_envs=2, tickers=["NVDA", "AAPL"])
+            (entry,) = trainer._registry.list_models(ticker="NVDA")
+        self.assertEqual(len(actions), len(datasets["NVDA"]) - 1)
+        self.assertEqual(len(net_worths), len(actions))
+        self.assertEqual(trainer.training_progress, 100)
+        self.assertEqual(entry["path"], os.path.join(tmp, "ppo_NVDA.zip"))
+        self.assertEqual(entry["window"]["tickers"], ["NVDA", "AAPL"])
+        self.assertEqual(entry["hyperparams"]["n_steps"], 2048)
+
+    def test_registry_caches_loaded_policies(self):
+        model = create_ppo_model(StockTradingEnv(ticker="NVDA", data=make_data()), n_steps=64)
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = ModelRegistry(tmp)
+            path = os.path.join(tmp, "ppo_NVDA")
+            model.save(path)
+            model_id = registry.register(path, "NVDA", "ppo", metrics={"sharpe_ratio": 1.0})
+            self.assertEqual(registry.get(model_id)["sha256"], file_hash(path + ".zip"))
+            self.assertEqual([m["id"] for m in ModelRegistry(tmp).list_models(algo="ppo")], [model_id])
+
+            first = registry.load(path, "ppo")
+            self.assertIs(registry.load(path + ".zip", "ppo"), first)
+            # Saving over the file invalidates the cached policy
+            os.utime(path + ".zip", ns=(0, 0))
+            self.assertIsNot(registry.load(path, "ppo"), first)
+            self.assertEqual((registry.cache_info()["hits"], registry.cache_info()["misses"]), (1, 2))
+
+    def test_registry_lock_is_not_stolen_from_a_live_writer(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = ModelRegistry(tmp)
+            code = ("import sys, time\nfrom utils.file_lock import file_lock\n"
+                    f"with file_lock({registry.index_path + '.lock'!r}):\n"
+                    "    print('locked', flush=True)\n    time.sleep(60)\n")
+            holder = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True,
+                                      cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            try:
+                self.assertEqual(holder.stdout.readline().strip(), "locked")
+                with self.assertRaises(TimeoutError):
+                    with registry._index_lock(timeout=0.2):
+                        pass
+            finally:
+                # A crashed holder releases the lock with its process
+                holder.kill()
+                holder.wait()
+                holder.stdout.close()
+            with open(os.path.join(tmp, "ppo_NVDA.zip"), "wb") as f:
+                f.write(b"model")
+            registry.register(os.path.join(tmp, "ppo_NVDA"), "NVDA", "ppo")
+            self.assertEqual(len(registry.list_models()), 1)
+
+    def test_rollout_policy_matches_sequential_evaluation(self):
+        datasets = [make_data(seed=0), make_data(n=250, seed=1)]
+        model = create_ppo_model(StockTradingEnv(ticker="NVDA", data=datasets[0]), n_steps=64)
+        results = trainer.rollout_policy(model, datasets)
+        for data, (actions, net_worths, total_reward) in zip(datasets, results):
+            env = StockTradingEnv(ticker="NVDA", data=data)
+            obs, _ = env.reset()
+            expected_actions, expected_net_worths, expected_reward = [], [], 0
+            done = False
+            while not done:
+                action, _ = model.predict(obs, deterministic=True)
+                obs, reward, done, _, _ = env.step(action.item())
+                expected_actions.append(action.item())
+                expected_net_worths.append(env.net_worth)
+                expected_reward += reward
+            self.assertEqual(actions, expected_actions)
+            np.testing.assert_allclose(net_worths, expected_net_worths)
+            self.assertAlmostEqual(total_reward, expected_reward, places=6)
+
+    def test_evaluate_model_batch_matches_evaluate_model(self):
+        datasets = {"NVDA": make_data(seed=0), "AAPL": make_data(n=250, seed=1), "TINY": make_data(n=40)[:10]}
+        # The window length picks how many of the latest bars are served
+        fetch = lambda ticker, start, end, **kwargs: datasets[ticker].iloc[-(end - start).days // 2:].copy()
+        model = create_ppo_model(StockTradingEnv(ticker="NVDA", data=datasets["NVDA"]), n_steps=64)
+        with tempfile.TemporaryDirectory() as tmp, \
+             mock.patch.object(trainer, "fetch_historical_data", fetch), \
+             mock.patch.object(trainer, "_registry", ModelRegistry(tmp)):
+            path = os.path.join(tmp, "ppo_NVDA")
+            model.save(path)
+            batch = trainer.evaluate_model_batch(["NVDA", "AAPL", "TINY"], windows=(12, 6), model_path=path)
+            self.assertEqual(list(zip(batch["ticker"], (batch["end"] - batch["start"]).dt.days)),
+                             [("NVDA", 360), ("AAPL", 360), ("NVDA", 180), ("AAPL", 180)])
+            for (_, row), months in zip(batch.iterrows(), (12, 12, 6, 6)):
+                actions, net_worths, total_reward, sharpe_ratio, max_drawdown = trainer.evaluate_model(
+                    row["ticker"], months, model_path=path)
+                self.assertEqual(row["steps"], len(actions))
+                self.assertAlmostEqual(row["final_net_worth"], net_worths[-1])
+                self.assertAlmostEqual(row["total_reward"], total_reward, places=6)
+                self.assertAlmostEqual(row["sharpe_ratio"], sharpe_ratio, places=6)
+                self.assertAlmostEqual(row["max_drawdown"], max_drawdown, places=6)
+            self.assertTrue(trainer.evaluate_model_batch(["TINY"], model_path=path).empty)
+
+def make_panel(n_assets, n=300):
+    return pd.concat({f"T{i}": make_data(n, seed=i) for i in range(n_assets)}, axis=1, names=["Ticker", "Field"])
+
+class TestPortfolioEnv(unittest.TestCase):
+    def test_check_env(self):
+        from stable_baselines3.common.env_checker import check_env
+        env = PortfolioEnv(["T0", "T1", "T2"], data=make_panel(3))
+        check_env(env, warn=False)
+        obs, _ = env.reset()
+        self.assertEqual(obs.shape, (3 * 7 + 4,))
+
+    def test_rebalance_returns_and_costs(self):
+        panel = make_panel(4)
+        tickers = ["T0", "T1", "T2", "T3"]
+        env = PortfolioEnv(tickers, data=panel, transaction_cost=0.0)
+        env.reset()
+        action = np.array([0.5, -0.2, 0.1, 0.9, -0.4])
+        weights = env.target_weights(action)
+        self.assertAlmostEqual(weights.sum(), 1.0)
+
+        # Without costs the value follows the weighted asset returns
+        prices = env._prices
+        _, reward, _, _, info = env.step(action)
+        expected = env.initial_balance * (weights[-1] + (weights[:-1] * prices[1] / prices[0]).sum())
+        self.assertAlmostEqual(info["net_worth"], expected, places=6)
+        self.assertAlmostEqual(reward, np.log(expected / env.initial_balance), places=9)
+        np.testing.assert_allclose(env.weights[:-1] * env.net_worth, env.shares * prices[1])
+
+        # Costs are charged on the traded value
+        costly = PortfolioEnv(tickers, data=panel, transaction_cost=0.01)
+        costly.reset()
+        _, _, _, _, info = costly.step(action)
+        self.assertAlmostEqual(info["cost"], 0.01 * costly.initial_balance * weights[:-1].sum())
+
+    def test_scales_to_many_assets(self):
+        env = PortfolioEnv([f"T{i}" for i in range(60)], data=make_panel(60))
+        env.reset(seed=0)
+        done = False
+        while not done:
+            obs, reward, done, _, _ = env.step(env.action_space.sample())
+            self.assertTrue(np.isfinite(reward))
+        self.assertAlmostEqual(env.weights.sum(), 1.0)
+        self.assertEqual(obs.shape, env.observation_space.shape)
+
+    def test_train_portfolio_model(self):
+        panel = make_panel(3)
+        with tempfile.TemporaryDirectory() as tmp, \
+             mock.patch.object(trainer, "fetch_many", lambda *args, **kwargs: panel.copy()), \
+             mock.patch.object(trainer, "_registry", ModelRegistry(tmp)):
+            net_worths, sharpe_ratio, max_drawdown = trainer.train_portfolio_model(
+                ["T0", "T1", "T2"], total_timesteps=64, save_path=os.path.join(tmp, "portfolio_ppo"), n_envs=2)
+            (entry,) = trainer._registry.list_models()
+        self.assertEqual(len(net_worths), len(panel))
+        self.assertEqual(net_worths[0], 5000)
+        self.assertEqual((sharpe_ratio, max_drawdown), trainer.calculate_metrics(net_worths))
+        self.assertEqual(entry["ticker"], "T0,T1,T2")
+        self.assertEqual(entry["window"]["tickers"], ["T0", "T1", "T2"])
+        self.assertEqual(entry["hyperparams"]["env"], "portfolio")
+        self.assertEqual(entry["metrics"]["final_net_worth"], net_worths[-1])
+
+class TestWalkForward(unittest.TestCase):
+    def test_make_folds(self):
+        self.assertEqual(walkforward.make_folds(100, 50, 20),
+                         [(0, 50, 50, 70), (20, 70, 70, 90)])
+        self.assertEqual(walkforward.make_folds(100, 50, 20, step=10, expanding=True)[-1], (0, 80, 80, 100))
+        self.assertEqual(walkforward.make_folds(60, 50, 20), [])
+        with self.assertRaisesRegex(ValueError, "at least 20"):
+            walkforward.make_folds(100, 50, 10)
+
+    def test_test_window_is_scaled_without_its_future(self):
+        data = make_data(300)
+        train, test = data.iloc[:100], data.iloc[100:160]
+        changed = test.copy()
+        changed.iloc[40:, :] *= 3
+        scales = [compute_scales(train, 5000)]
+
+        def observations(window, scales):
+            env = BatchedTradingEnv([window], 1, auto_reset=False, scales=scales)
+            obs = [env.reset()[0]]
+            for _ in range(39):
+                obs.append(env.step(np.zeros(1, dtype=np.int64))[0][0])
+            return np.array(obs)
+
+        np.testing.assert_array_equal(observations(test, scales), observations(changed, scales))
+        # Scaled by its own range, the window's later prices leak into its first observations
+        self.assertFalse(np.array_equal(observations(test, None), observations(changed, None)))
+
+    def test_folds_run_in_parallel_chains_with_warm_start(self):
+        data = make_data(300)
+        with mock.patch.object(walkforward, "fetch_historical_data", lambda *args, **kwargs: data.copy()):
+            results = walkforward.run_walk_forward("NVDA", train_size=100, test_size=30, timesteps=128,
+                                                   processes=2)
+        self.assertEqual(list(results["fold"]), [0, 1, 2, 3, 4])
+        # Two chains of folds; each fold after the first in its chain continues the previous policy
+        self.assertEqual(list(results["warm_start"]), [False, True, True, False, True])
+        self.assertTrue((results["test_start"] > results["train_end"]).all())
+        self.assertTrue(np.isfinite(results["sharpe_ratio"]).all())
+        summary = walkforward.summarize_folds(results)
+        self.assertEqual(summary["folds"], 5)
+        self.assertAlmostEqual(summary["sharpe_mean"], results["sharpe_ratio"].mean())
+
+class TestFeatureStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.datasets = {"NVDA": make_data(seed=0), "AAPL": make_data(n=200, seed=1)}
+        self.features = write_feature_set(self.root, self.datasets, chunk_rows=64)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_mapped_env_matches_frame_env(self):
+        self.assertEqual(len(self.features), 300 + 200 - 2 * 49)
+        self.assertFalse(self.features.features.flags.writeable)
+        # Pickles as its path and version (subprocess envs reopen the maps), not as the arrays
+        self.assertLess(len(pickle.dumps(self.features)), 500)
+        self.assertEqual(pickle.loads(pickle.dumps(self.features)).tickers, ["NVDA", "AAPL"])
+        np.testing.assert_array_equal(self.features.index("AAPL"), self.datasets["AAPL"].index.as_unit("ns"))
+
+        actions = np.random.default_rng(3).integers(0, 3, 200)
+        for ticker, data in self.datasets.items():
+            mapped = StockTradingEnv(ticker, features=self.root)
+            frame = StockTradingEnv(ticker, data=data)
+            np.testing.assert_array_equal(mapped.reset()[0], frame.reset()[0])
+            for action in actions[:len(data) - 60]:
+                obs, reward, _, _, _ = mapped.step(action)
+                expected_obs, expected_reward, _, _, _ = frame.step(action)
+                np.testing.assert_allclose(obs, expected_obs, rtol=1e-6)
+                self.assertAlmostEqual(reward, expected_reward)
+
+        batched = BatchedTradingEnv(self.features, 2)
+        reference = BatchedTradingEnv(list(self.datasets.values()), 2)
+        np.testing.assert_allclose(batched.reset(), reference.reset(), rtol=1e-6)
+
+    def test_backtest_from_features(self):
+        data = self.datasets["NVDA"]
+        with mock.patch("rl.backtest.fetch_historical_data", lambda *args, **kwargs: data.copy()):
+            expected = backtest_strategy("NVDA", 12, rsi_signals, vectorized=True)
+        result = backtest_features(FeatureSet(self.root), "NVDA")
+        self.assertEqual(result["actions"], expected["actions"])
+        np.testing.assert_allclose(result["net_worths"], expected["net_worths"])
+        np.testing.assert_array_equal(self.features.rsi[self.features.rows("NVDA")], data["RSI"])
+
+    def test_rewrite_swaps_in_a_complete_set(self):
+        old = self.features
+        new = write_feature_set(self.root, {"MSFT": make_data(seed=2)})
+        self.assertNotEqual(new.version, old.version)
+        self.assertEqual(FeatureSet(self.root).tickers, ["MSFT"])
+        # The replaced version stays on disk for readers that opened it before the swap
+        self.assertEqual(sorted(name for name in os.listdir(self.root) if name.startswith("v-")),
+                         sorted([f"v-{old.version}", f"v-{new.version}"]))
+        np.testing.assert_array_equal(old.series("AAPL")[1], self.datasets["AAPL"]["Close"])
+        # A pickled set (e.g. sent to a subprocess env) reopens its own version, not the new one
+        reopened = pickle.loads(pickle.dumps(old))
+        self.assertEqual((reopened.version, reopened.tickers), (old.version, ["NVDA", "AAPL"]))
+        np.testing.assert_array_equal(reopened.series("NVDA")[0], old.series("NVDA")[0])
+
+        newest = write_feature_set(self.root, {"AMD": make_data(seed=3)})
+        self.assertEqual(sorted(name for name in os.listdir(self.root) if name.startswith("v-")),
+                         sorted([f"v-{new.version}", f"v-{newest.version}"]))
+        # Maps opened before the oldest version was removed keep reading it
+        np.testing.assert_array_equal(old.series("AAPL")[1], self.datasets["AAPL"]["Close"])
+        with self.assertRaisesRegex(FileNotFoundError, "has been removed"):
+            FeatureSet(self.root, old.version)
+
+    def test_writers_take_turns(self):
+        with file_lock(os.path.join(self.root, ".lock")):
+            with mock.patch("rl.feature_store.WRITE_LOCK_TIMEOUT", 0.2):
+                with self.assertRaises(TimeoutError):
+                    write_feature_set(self.root, {"MSFT": make_data(seed=2)})
+        self.assertEqual(FeatureSet(self.root).version, self.features.version)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
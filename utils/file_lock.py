@@ -0,0 +1,54 @@
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+def _try_lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def file_lock(path, timeout=10):
+    """
+    Hold an exclusive lock on ``path`` (created if missing) across processes and threads.
+
+    The lock is taken by the OS on the open file, so it is released when the
+    holder exits or crashes and a live holder can never lose it. The file is
+    left in place: removing it would let two processes lock different files
+    under the same name.
+
+    Args:
+        path (str): Lock file.
+        timeout (float): Seconds to wait for the lock.
+
+    Raises:
+        TimeoutError: If the lock is still held by someone else after ``timeout``.
+    """
+    deadline = time.time() + timeout
+    with open(path, "a+") as f:
+        while True:
+            try:
+                _try_lock(f)
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise TimeoutError(f"Timed out after {timeout}s waiting for lock {path}")
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            _unlock(f)
@@ -1,33 +1,188 @@
+import io
+import os
+import tempfile
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from datetime import datetime, timedelta
 from data.fetcher import fetch_historical_data
-from config.settings import TICKERS
+from config.settings import EXPORT_CHUNK_ROWS, TICKERS
+from utils.instrumentation import timed
+
+EXPORT_COLUMNS = ['Ticker', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'MA20', 'MA50']
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', '.arrows'),
+}
+
+def export_filename(fmt="csv"):
+    """Timestamped download name for an export in ``fmt``."""
+    return f"stock_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}{EXPORT_FORMATS[fmt][1]}"
+
+def iter_export_frames(selected_stocks, months, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Yield export rows ticker by ticker in chunks of at most ``chunk_rows``.
+
+    Only one ticker's bars are loaded at a time, so memory stays flat however
+    many tickers are exported.
+
+    Args:
+        selected_stocks (list): List of stock tickers.
+        months (int): Number of months for the time range.
+        chunk_rows (int): Rows per chunk.
+
+    Yields:
+        pd.DataFrame: Chunks with the EXPORT_COLUMNS.
+    """
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=months * 30)
+    interval = "1m" if months <= 1 else "1d"
+    for ticker in dict.fromkeys(t for t in selected_stocks if t in TICKERS):
+        data = fetch_historical_data(ticker, start_date, end_date, interval=interval, context="csv", exact=True)
+        for start in range(0, len(data), chunk_rows):
+            chunk = data.iloc[start:start + chunk_rows]
+            # Same dtypes for every ticker so all chunks share one Arrow schema
+            chunk = chunk[EXPORT_COLUMNS[2:]].astype('float64').rename_axis('Date').reset_index()
+            chunk.insert(0, 'Ticker', ticker)
+            yield chunk
+
+def iter_export_bytes(selected_stocks, months, fmt="csv", chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Encode an export incrementally for a chunked HTTP response.
+
+    Args:
+        selected_stocks (list): List of stock tickers.
+        months (int): Number of months for the time range.
+        fmt (str): "csv" or "arrow" (Arrow IPC stream); Parquet needs a
+            seekable file, see ``write_export``.
+        chunk_rows (int): Rows per chunk.
+
+    Yields:
+        bytes: Consecutive pieces of the file.
+    """
+    if fmt == "csv":
+        header = True
+        for chunk in iter_export_frames(selected_stocks, months, chunk_rows):
+            yield chunk.to_csv(index=False, header=header).encode()
+            header = False
+        return
+    if fmt != "arrow":
+        raise ValueError(f"Unsupported streaming format: {fmt}")
+    sink = io.BytesIO()
+    writer = None
+    for chunk in iter_export_frames(selected_stocks, months, chunk_rows):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            schema = table.schema
+            writer = pa.ipc.new_stream(sink, schema)
+        writer.write_table(table.cast(schema))
+        yield _drain(sink)
+    if writer is not None:
+        writer.close()
+        yield _drain(sink)
+
+def _drain(sink):
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+@timed("write_export")
+def write_export(selected_stocks, months, path, fmt="csv", chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Write an export to ``path`` chunk by chunk.
+
+    Args:
+        selected_stocks (list): List of stock tickers.
+        months (int): Number of months for the time range.
+        path (str): Output file.
+        fmt (str): "csv", "parquet" (one row group per chunk) or "arrow".
+        chunk_rows (int): Rows per chunk.
+
+    Returns:
+        int: Rows written.
+    """
+    rows = 0
+    if fmt == "parquet":
+        writer = None
+        try:
+            for chunk in iter_export_frames(selected_stocks, months, chunk_rows):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pq.ParquetWriter(path, schema)
+                writer.write_table(table.cast(schema))
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            # Nothing to export: still leave a valid (empty) file
+            pq.write_table(pa.Table.from_pandas(pd.DataFrame(columns=EXPORT_COLUMNS), preserve_index=False), path)
+        return rows
+    with open(path, "wb") as f:
+        for piece in iter_export_bytes(selected_stocks, months, fmt, chunk_rows):
+            f.write(piece)
+    if fmt == "csv":
+        with open(path) as f:
+            rows = max(0, sum(1 for _ in f) - 1)
+    return rows
 
 def generate_csv_download(selected_stocks, months):
     """
     Generate a CSV file with stock data for download.
-    
+
+    The CSV is encoded ticker by ticker instead of from one concatenated
+    frame, but ``dcc.Download`` still needs the whole content in the callback
+    response; large exports should use the streaming /export route instead.
+
     Args:
         selected_stocks (list): List of stock tickers.
         months (int): Number of months for the time range.
-    
+
     Returns:
         dict: Dash download data.
     """
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=months * 30)
-    interval = "1m" if months <= 1 else "1d"
-    
-    all_data = []
-    for ticker in selected_stocks:
-        if ticker in TICKERS:
-            data = fetch_historical_data(ticker, start_date, end_date, interval=interval, context="csv")
-            if not data.empty:
-                data = data.reset_index()
-                data['Ticker'] = ticker
-                all_data.append(data[['Ticker', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'MA20', 'MA50']])
-    
-    if all_data:
-        df = pd.concat(all_data, ignore_index=True)
-        return dict(content=df.to_csv(index=False), filename=f"stock_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-    return None
\ No newline at end of file
+    content = b"".join(iter_export_bytes(selected_stocks, months, "csv")).decode()
+    if content:
+        return dict(content=content, filename=export_filename("csv"))
+    return None
+
+def install_export_routes(server):
+    """
+    Serve exports from the Flask server without building them in a callback.
+
+    Route:
+        /export?tickers=NVDA,AAPL&months=12&format=csv|arrow|parquet
+        CSV and Arrow are sent as chunked responses while they are encoded;
+        Parquet is written to a temporary file (one row group per chunk) that
+        is streamed and then deleted.
+
+    Args:
+        server (flask.Flask): Server of the Dash app (``app.server``).
+    """
+    from flask import Response, request, send_file, stream_with_context
+
+    @server.route("/export")
+    def export():
+        tickers = [t for t in request.args.get("tickers", "").split(",") if t]
+        months = request.args.get("months", 12, type=int)
+        fmt = request.args.get("format", "csv")
+        if fmt not in EXPORT_FORMATS:
+            return Response(f"Unsupported format: {fmt}", status=400)
+        mimetype = EXPORT_FORMATS[fmt][0]
+        filename = export_filename(fmt)
+        if fmt == "parquet":
+            fd, path = tempfile.mkstemp(suffix=".parquet")
+            os.close(fd)
+            try:
+                write_export(tickers, months, path, fmt)
+                response = send_file(path, mimetype=mimetype, as_attachment=True, download_name=filename)
+            except Exception:
+                os.remove(path)
+                raise
+            response.call_on_close(lambda: os.remove(path))
+            return response
+        return Response(stream_with_context(iter_export_bytes(tickers, months, fmt)), mimetype=mimetype,
+                        headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -0,0 +1,285 @@
+import bisect
+import cProfile
+import functools
+import io
+import json
+import math
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds (the last bucket is unbounded)
+BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+           0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, math.inf)
+
+class Histogram:
+    """Count, sum, min/max and fixed-bucket counts of recorded durations."""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (capped at the observed max)."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'min': self.min if self.count else 0.0,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': self.counts[:],
+        }
+
+    def merge(self, data):
+        """Add a ``to_dict`` snapshot (e.g. from a worker process) into this histogram."""
+        self.counts = [a + b for a, b in zip(self.counts, data['buckets'])]
+        self.count += data['count']
+        self.total += data['sum']
+        if data['count']:
+            self.min = min(self.min, data['min'])
+            self.max = max(self.max, data['max'])
+
+_histograms = {}
+_lock = threading.Lock()
+# Spans of the request being profiled, per thread: list of (name, start, seconds, depth)
+_local = threading.local()
+
+def record(name, seconds):
+    """
+    Add one duration to the histogram ``name``.
+
+    Args:
+        name (str): Metric name (e.g. "fetch_historical_data").
+        seconds (float): Duration.
+    """
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.record(seconds)
+
+@contextmanager
+def span(name):
+    """Time the enclosed block into the histogram ``name``."""
+    trace = getattr(_local, 'trace', None)
+    depth = getattr(_local, 'depth', 0)
+    _local.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _local.depth = depth
+        record(name, seconds)
+        if trace is not None:
+            trace.append((name, start, seconds, depth))
+
+def timed(name=None):
+    """Decorator timing every call of a function (named after it by default)."""
+    def decorator(func):
+        metric = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(metric):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class SampledTimer:
+    """
+    Times one call in ``every`` for hot paths where timing each call would cost
+    more than the call itself (e.g. an env step of a few microseconds).
+
+    Usage::
+
+        token = timer.start()
+        ...
+        timer.stop(token)
+    """
+
+    def __init__(self, name, every=128):
+        self.name = name
+        self.every = every
+        self._calls = 0
+
+    def start(self):
+        self._calls += 1
+        if self._calls >= self.every:
+            self._calls = 0
+            return time.perf_counter()
+        return None
+
+    def stop(self, token):
+        if token is not None:
+            record(self.name, time.perf_counter() - token)
+
+def snapshot():
+    """
+    Current histograms.
+
+    Returns:
+        dict: Metric name -> count, sum, mean, min, max, p50/p90/p99 and bucket counts.
+    """
+    with _lock:
+        return {name: histogram.to_dict() for name, histogram in sorted(_histograms.items())}
+
+def merge(data):
+    """Add a ``snapshot()`` taken in another process to the local histograms."""
+    with _lock:
+        for name, values in data.items():
+            _histograms.setdefault(name, Histogram()).merge(values)
+
+def reset():
+    """Drop all recorded histograms."""
+    with _lock:
+        _histograms.clear()
+
+def render_prometheus(data=None):
+    """
+    Format histograms in the Prometheus text exposition format.
+
+    Args:
+        data (dict): A ``snapshot()`` (defaults to the current one).
+
+    Returns:
+        str: One ``*_seconds`` histogram per metric.
+    """
+    lines = []
+    for name, values in (data if data is not None else snapshot()).items():
+        metric = "stock_" + "".join(c if c.isalnum() else "_" for c in name) + "_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, count in zip(BUCKETS, values['buckets']):
+            cumulative += count
+            le = "+Inf" if math.isinf(bound) else repr(bound)
+            lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"{metric}_sum {values['sum']}")
+        lines.append(f"{metric}_count {values['count']}")
+    return "\n".join(lines) + "\n"
+
+class ProfileCapture:
+    """
+    Opt-in cProfile capture of a single request.
+
+    ``arm()`` marks the next request to be profiled; ``start``/``stop`` wrap
+    that request and keep a report with the top functions by cumulative time
+    plus the spans it went through, so one slow callback can be broken down
+    without profiling the whole server.
+    """
+
+    def __init__(self, limit=40):
+        self.limit = limit
+        self.report = None
+        self._armed = False
+        self._lock = threading.Lock()
+
+    def arm(self):
+        with self._lock:
+            self._armed = True
+
+    def start(self):
+        """Begin profiling if armed; returns a token for ``stop`` or None."""
+        with self._lock:
+            if not self._armed:
+                return None
+            self._armed = False
+        _local.trace = []
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler, time.perf_counter()
+
+    def stop(self, token, label=""):
+        if token is None:
+            return
+        profiler, start = token
+        profiler.disable()
+        trace, _local.trace = _local.trace, None
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(self.limit)
+        self.report = {
+            'label': label,
+            'seconds': time.perf_counter() - start,
+            'spans': [
+                {'name': name, 'offset': offset - start, 'seconds': seconds, 'depth': depth}
+                for name, offset, seconds, depth in sorted(trace, key=lambda s: s[1])
+            ],
+            'profile': out.getvalue(),
+        }
+
+def install_metrics_routes(server, profiling=False):
+    """
+    Expose the histograms (and optionally request profiling) on a Flask server.
+
+    Every Dash callback request is also timed end to end as "dash.request",
+    which includes the JSON serialization of the returned figures.
+
+    Routes:
+        /metrics: Prometheus text format (``?format=json`` for JSON).
+        /metrics/profile (profiling only): ``?arm=1`` profiles the next Dash
+            callback request; without arguments returns the last report.
+
+    Args:
+        server (flask.Flask): Server of the Dash app (``app.server``).
+        profiling (bool): Enable the profile capture routes and hooks.
+    """
+    from flask import Response, g, request
+
+    @server.route("/metrics")
+    def metrics():
+        if request.args.get("format") == "json":
+            return Response(json.dumps(snapshot(), indent=2), mimetype="application/json")
+        return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    capture = ProfileCapture() if profiling else None
+    if profiling:
+        @server.route("/metrics/profile")
+        def profile():
+            if request.args.get("arm"):
+                capture.arm()
+                return Response(json.dumps({'armed': True}), mimetype="application/json")
+            return Response(json.dumps(capture.report, indent=2), mimetype="application/json")
+
+    @server.before_request
+    def start_request_timer():
+        if request.path.startswith("/_dash-update-component"):
+            g.request_start = time.perf_counter()
+            if capture is not None:
+                g.profile_token = capture.start()
+
+    @server.after_request
+    def stop_request_timer(response):
+        start = g.pop("request_start", None)
+        if start is None:
+            return response
+        token = g.pop("profile_token", None)
+        if token is not None:
+            body = request.get_json(silent=True) or {}
+            capture.stop(token, label=str(body.get("output", request.path)))
+        record("dash.request", time.perf_counter() - start)
+        return response